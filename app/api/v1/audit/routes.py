@@ -5,9 +5,13 @@ Provides endpoint to view all user actions with auto-cleanup after 30 days
 
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
+from uuid import UUID
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from app.db.models import RESPONSE_MODEL_CONFIG, EpochMillis
 from app.services.audit_service import AuditLogger
 from app.api.v1.users_admin.auth_routes import require_admin
 
@@ -20,6 +24,8 @@ router = APIRouter(prefix="/audit", tags=["audit"])
 
 class AuditLogResponse(BaseModel):
     """Single audit log response"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str
     actor_id: str
     actor_name: str
@@ -34,14 +40,16 @@ class AuditLogResponse(BaseModel):
     after_data: Optional[Dict[str, Any]] = None
     changes: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
-    timestamp: datetime
+    timestamp: EpochMillis
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
-    expires_at: Optional[datetime] = None
+    expires_at: Optional[EpochMillis] = None
 
 
 class AuditLogListResponse(BaseModel):
     """List of audit logs with pagination"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     logs: List[AuditLogResponse]
     total: int
     limit: int
@@ -62,6 +70,8 @@ async def get_all_audit_logs(
     action: Optional[str] = Query(None, description="Filter by action (CREATE, UPDATE, DELETE, etc.)"),
     start_date: Optional[datetime] = Query(None, description="Filter logs after this date (ISO format)"),
     end_date: Optional[datetime] = Query(None, description="Filter logs before this date (ISO format)"),
+    after_ts: Optional[datetime] = Query(None, description="Keyset cursor: timestamp of the last log already seen"),
+    after_id: Optional[UUID] = Query(None, description="Keyset cursor: id of the last log already seen"),
     current_user: dict = Depends(require_admin)
 ):
     """
@@ -76,24 +86,35 @@ async def get_all_audit_logs(
     - **action**: Filter by action type (CREATE, UPDATE, DELETE, STATUS_CHANGE, MEMBER_ADDED, MEMBER_REMOVED)
     - **start_date**: Show logs after this date
     - **end_date**: Show logs before this date
+    - **after_ts** / **after_id**: Continue after the last log of the previous page
+      (keyset pagination; offset is ignored, deep pages stay fast)
     
     Returns logs sorted by timestamp (newest first) with full user information.
     Logs automatically expire after 30 days.
     """
     
-    try:
-        # Get logs with filters
-        logs = await AuditLogger.get_all_logs(
-            limit=limit,
-            offset=offset,
-            actor_id=actor_id,
-            project_id=project_id,
-            entity_type=entity_type,
-            action=action,
-            start_date=start_date,
-            end_date=end_date
+    if (after_ts is None) != (after_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_ts and after_id must be supplied together"
         )
-        
+    
+    # Logs (with their before/after JSONB) are read from a cursor and written out one
+    # at a time, so a 1000-row page is never held in memory as a whole
+    logs = AuditLogger.iter_logs(
+        limit=limit,
+        offset=offset,
+        actor_id=actor_id,
+        project_id=project_id,
+        entity_type=entity_type,
+        action=action,
+        start_date=start_date,
+        end_date=end_date,
+        after_ts=after_ts,
+        after_id=str(after_id) if after_id is not None else None
+    )
+    
+    try:
         # Get total count with same filters
         total = await AuditLogger.count_logs(
             actor_id=actor_id,
@@ -103,23 +124,31 @@ async def get_all_audit_logs(
             start_date=start_date,
             end_date=end_date
         )
-        
-        # Convert to response objects
-        log_responses = [AuditLogResponse(**log) for log in logs]
-        
-        return AuditLogListResponse(
-            logs=log_responses,
-            total=total or 0,
-            limit=limit,
-            offset=offset
-        )
+        # Run the page query and read its first row before any bytes are sent, so query
+        # errors still become a 500 instead of a truncated 200 body
+        first_log = await anext(logs, None)
         
     except Exception as e:
+        await logs.aclose()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch audit logs: {str(e)}"
         )
 
+    async def stream_logs():
+        try:
+            header = orjson.dumps({"total": total or 0, "limit": limit, "offset": offset})
+            yield header[:-1] + b',"logs":['
+            if first_log is not None:
+                yield AuditLogResponse.model_construct(**first_log).model_dump_json().encode()
+                async for log in logs:
+                    yield b",\n" + AuditLogResponse.model_construct(**log).model_dump_json().encode()
+            yield b"]}"
+        finally:
+            await logs.aclose()
+
+    return StreamingResponse(stream_logs(), media_type="application/json")
+
 
 @router.post("/cleanup")
 async def cleanup_old_audit_logs(
@@ -14,15 +14,19 @@ Flow:
 8) PATCH  /inspections/images/{image_id}/assessment   -> cập nhật assessment (manual override)
 """
 
+import asyncio
 import os
 import uuid
 import shutil
+import struct
 import zipfile
 import mimetypes
 from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+import orjson
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -30,8 +34,8 @@ from ultralytics import YOLO
 import torch
 
 import sqlalchemy as sa
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.db.database import (
@@ -43,14 +47,33 @@ from app.db.database import (
     users_table,
     windfarms_table,
 )
-from app.db.models import InspectionStatus, ImageStatus
+from app.db import prepared_queries
+from app.db.models import InspectionStatus, InspectionStatusValue, ImageStatus
 from app.utilities.permissions import check_turbine_access
+from app.utilities.bbox_codec import pack_bounding_boxes
+from app.utilities.ids import uuid7
+from app.utilities.request_body import json_body, json_body_openapi
 from app.api.v1.users_admin.auth_routes import require_user
-from app.core.config import get_inspection_storage_path, TEMP_UPLOAD_DIR
+from app.core.config import ensure_dir, get_inspection_storage_path, TEMP_UPLOAD_DIR_STR
 
 
 router = APIRouter(prefix="/inspections", tags=["inspections"])
 
+# Column order of the records passed to COPY in create_inspection_from_zip_path
+IMAGE_COPY_COLUMNS = [
+    "id", "inspection_id", "blade", "surface", "position_pct", "position_meter",
+    "file_name", "file_path", "file_size", "captured_at", "status", "checked_flag", "created_at",
+]
+
+# processed_images / total_images as a percentage, evaluated by the database with each row
+PROGRESS_PERCENTAGE = sa.case(
+    (
+        inspections_table.c.total_images > 0,
+        sa.cast(inspections_table.c.processed_images, sa.Float) * 100.0 / inspections_table.c.total_images,
+    ),
+    else_=0.0,
+).label("progress_percentage")
+
 
 # =========================
 # Request Models
@@ -62,7 +85,7 @@ class DeleteImagesRequest(BaseModel):
 class UpdateInspectionRequest(BaseModel):
     operator: Optional[str] = None
     equipment: Optional[str] = None
-    status: Optional[str] = None
+    status: Optional[InspectionStatusValue] = None
     captured_at: Optional[datetime] = None
 
 class UpdateAssessmentRequest(BaseModel):
@@ -129,6 +152,15 @@ class _Service:
             return {"id": str(r["id"]), "name": r["name"], "email": r["email"]}
         return {"id": str(user_id), "name": "Unknown User", "email": "unknown@example.com"}
 
+    # ---------- Bounding box packing ----------
+
+    def _pack_boxes(self, boxes: Optional[List[Dict[str, Any]]]) -> Optional[bytes]:
+        """Pack user-edited boxes for ai_bounding_boxes_bin (400 nếu giá trị không phải số)"""
+        try:
+            return pack_bounding_boxes(boxes)
+        except (TypeError, ValueError, struct.error):
+            raise HTTPException(status_code=400, detail="Bounding box có giá trị không hợp lệ")
+
     # ---------- ZIP parsing & saving ----------
 
     def _parse_zip(self, extract_dir: Path) -> List[Dict[str, Any]]:
@@ -196,8 +228,8 @@ class _Service:
         if not zipfile.is_zipfile(zip_path):
             raise HTTPException(status_code=400, detail="📦 File không phải ZIP hợp lệ")
 
-        extract_dir = Path(TEMP_UPLOAD_DIR) / f"extract_{uuid.uuid4()}"
-        extract_dir.mkdir(parents=True, exist_ok=True)
+        extract_dir = Path(os.path.join(TEMP_UPLOAD_DIR_STR, f"extract_{uuid.uuid4()}"))
+        ensure_dir(extract_dir)
 
         try:
             with zipfile.ZipFile(zip_path, "r") as zf:
@@ -219,7 +251,7 @@ class _Service:
             )
             base_path = Path(paths["base_path"])
             raw_root = Path(paths["raw_images_path"])
-            raw_root.mkdir(parents=True, exist_ok=True)
+            ensure_dir(raw_root)
 
             data_ins = {
                 "id": inspection_id,
@@ -238,30 +270,38 @@ class _Service:
             }
             await database.execute(inspections_table.insert().values(data_ins))
 
-            # copy images -> DB rows
+            # copy images -> DB rows (each blade/surface directory is created once)
+            created_dirs = set()
+            image_records = []
             for it in imgs:
                 dest_dir = raw_root / it["blade"] / it["surface"]
-                dest_dir.mkdir(parents=True, exist_ok=True)
+                if dest_dir not in created_dirs:
+                    ensure_dir(dest_dir)
+                    created_dirs.add(dest_dir)
                 dest_path = dest_dir / it["filename"]
                 shutil.copy2(it["temp_path"], dest_path)
 
-                image_id = str(uuid.uuid4())
-                row = {
-                    "id": image_id,
-                    "inspection_id": inspection_id,
-                    "blade": it["blade"],
-                    "surface": it["surface"],
-                    "position_pct": it.get("position_pct"),
-                    "position_meter": None,
-                    "file_name": it["filename"],
-                    "file_path": str(dest_path),
-                    "file_size": os.path.getsize(dest_path),
-                    "captured_at": captured_at or datetime.now(),
-                    "status": ImageStatus.UPLOADED.value,
-                    "checked_flag": "Unchecked",
-                    "created_at": datetime.now(),
-                }
-                await database.execute(inspection_images_table.insert().values(row))
+                position_pct = it.get("position_pct")
+                image_records.append((
+                    uuid7(),
+                    uuid.UUID(inspection_id),
+                    it["blade"],
+                    it["surface"],
+                    Decimal(str(position_pct)) if position_pct is not None else None,
+                    None,
+                    it["filename"],
+                    str(dest_path),
+                    os.path.getsize(dest_path),
+                    captured_at or datetime.now(),
+                    ImageStatus.UPLOADED.value,
+                    "Unchecked",
+                    datetime.now(),
+                ))
+
+            # All image rows in one COPY instead of one INSERT per image
+            await prepared_queries.copy_records(
+                "inspection_images", IMAGE_COPY_COLUMNS, image_records
+            )
 
             return {
                 "inspection_id": inspection_id,
@@ -281,26 +321,27 @@ class _Service:
 
     # ---------- Queries for FE ----------
 
-    async def list_inspections(self, turbine_id: str, status_filter: Optional[str], limit: int, offset: int):
-        q = sa.select(inspections_table).where(inspections_table.c.turbine_id == turbine_id)
+    async def list_inspections(self, turbine_id: str, status_filter: Optional[InspectionStatusValue], limit: int, offset: int):
+        q = sa.select(inspections_table, PROGRESS_PERCENTAGE).where(inspections_table.c.turbine_id == turbine_id)
         if status_filter:
             q = q.where(inspections_table.c.status == status_filter)
         q = q.order_by(inspections_table.c.created_at.desc())
         q = q.limit(limit).offset(offset)
         rows = await database.fetch_all(q)
+        # UUID columns come back as asyncpg's own UUID type, which orjson cannot serialize
         res: List[Dict[str, Any]] = []
         for r in rows:
             d = dict(r)
             for k in ("id", "turbine_id", "created_by"):
-                if k in d and d[k] is not None:
+                if d[k] is not None:
                     d[k] = str(d[k])
-            if "status" in d and hasattr(d["status"], "value"):
-                d["status"] = d["status"].value
             res.append(d)
         return res
 
     async def get_inspection(self, inspection_id: str) -> Optional[Dict[str, Any]]:
-        r = await database.fetch_one(sa.select(inspections_table).where(inspections_table.c.id == inspection_id))
+        r = await database.fetch_one(
+            sa.select(inspections_table, PROGRESS_PERCENTAGE).where(inspections_table.c.id == inspection_id)
+        )
         if not r:
             return None
         d = dict(r)
@@ -310,8 +351,9 @@ class _Service:
             d["created_by"] = str(d["created_by"])
         return d
 
-    async def get_images_for_inspection(self, inspection_id: str) -> List[Dict[str, Any]]:
-        q = (
+    @staticmethod
+    def _images_query(inspection_id: str):
+        return (
             sa.select(inspection_images_table)
             .where(inspection_images_table.c.inspection_id == inspection_id)
             .order_by(
@@ -320,18 +362,37 @@ class _Service:
                 inspection_images_table.c.position_pct,
             )
         )
-        rows = await database.fetch_all(q)
-        images: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _image_row(r) -> Dict[str, Any]:
+        d = dict(r)
+        d["id"] = str(d["id"])
+        d["inspection_id"] = str(d["inspection_id"])
+        d["image_id"] = d["id"]
+        d["file_url"] = f"/api/v1/inspections/images/{d['id']}/stream"
+        d["processed_url"] = f"/api/v1/inspections/images/{d['id']}/processed"
+        d["checkedFlag"] = d.get("checked_flag", "Unchecked")
+        for k in ("position_pct", "position_meter"):
+            if d[k] is not None:
+                d[k] = float(d[k])
+        return d
+
+    async def get_images_for_inspection(self, inspection_id: str) -> List[Dict[str, Any]]:
+        rows = await database.fetch_all(self._images_query(inspection_id))
+        return [self._image_row(r) for r in rows]
+
+    async def iterate_images_for_inspection(self, inspection_id: str):
+        """Same rows as get_images_for_inspection, read from a server-side cursor one at a time"""
+        async for r in database.iterate(self._images_query(inspection_id)):
+            yield self._image_row(r)
+
+    async def get_image_statistics(self, inspection_id: str) -> Dict[str, Dict[str, int]]:
+        """Image counts by blade, surface and status, aggregated in SQL"""
+        stats: Dict[str, Dict[str, int]] = {"images_by_blade": {}, "images_by_surface": {}, "images_by_status": {}}
+        rows = await prepared_queries.fetch(prepared_queries.SELECT_INSPECTION_IMAGE_COUNTS, inspection_id)
         for r in rows:
-            d = dict(r)
-            d["id"] = str(d["id"])
-            d["inspection_id"] = str(d["inspection_id"])
-            d["image_id"] = d["id"]
-            d["file_url"] = f"/api/v1/inspections/images/{d['id']}/stream"
-            d["processed_url"] = f"/api/v1/inspections/images/{d['id']}/processed"
-            d["checkedFlag"] = d.get("checked_flag", "Unchecked")
-            images.append(d)
-        return images
+            stats[f"images_by_{r['dimension']}"][r["value"]] = r["count"]
+        return stats
 
     async def get_image(self, image_id: str) -> Optional[Dict[str, Any]]:
         r = await database.fetch_one(sa.select(inspection_images_table).where(inspection_images_table.c.id == image_id))
@@ -377,6 +438,7 @@ class _Service:
                             )
             
             update_data["ai_bounding_boxes"] = bboxes
+            update_data["ai_bounding_boxes_bin"] = self._pack_boxes(bboxes)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="Không có trường hợp lệ để cập nhật")
@@ -447,6 +509,7 @@ class _Service:
             .where(damage_assessments_table.c.id == assessment["id"])
             .values({
                 "ai_bounding_boxes": current_boxes,
+                "ai_bounding_boxes_bin": self._pack_boxes(current_boxes),
                 "updated_at": datetime.now()
             })
         )
@@ -501,8 +564,10 @@ class _Service:
 
         # ✅ Chỉ lưu data AI thuần túy; description được giữ lại khi re-analyze
         user_description: Optional[str] = existing["description"] if existing else None
+        bounding_boxes = detection_result.get("bounding_boxes", [])
         data_ass = {
-            "ai_bounding_boxes": detection_result.get("bounding_boxes", []),
+            "ai_bounding_boxes": bounding_boxes,
+            "ai_bounding_boxes_bin": pack_bounding_boxes(bounding_boxes),
             "ai_processed_at": datetime.now(),
             "updated_at": datetime.now(),
         }
@@ -515,7 +580,7 @@ class _Service:
             )
             ass_id = str(existing["id"])
         else:
-            ass_id = str(uuid.uuid4())
+            ass_id = str(uuid7())
             await database.execute(
                 damage_assessments_table.insert().values(
                     {
@@ -608,26 +673,26 @@ class _Service:
         if not ins:
             raise HTTPException(status_code=404, detail="Inspection không tồn tại")
 
-        images = await self.get_images_for_inspection(inspection_id)
-        out_images: List[Dict[str, Any]] = []
-
-        for img in images:
-            rows = await database.fetch_all(
-                sa.select(damage_assessments_table)
-                .where(damage_assessments_table.c.inspection_image_id == img["id"])
-                .order_by(damage_assessments_table.c.ai_processed_at.desc().nullslast())
-            )
+        images, assessment_rows, counts = await asyncio.gather(
+            self.get_images_for_inspection(inspection_id),
+            prepared_queries.fetch(prepared_queries.SELECT_INSPECTION_ASSESSMENTS, inspection_id),
+            self.get_image_statistics(inspection_id),
+        )
 
-            # ✅ Ultra-simplified assessments: only bounding boxes (contains all info) + description
-            assessments = []
-            for r in rows:
-                d = dict(r)
-                # 🎯 Each bounding box already contains: x, y, width, height, type, confidence
-                assessments.append({
-                    "ai_bounding_boxes": d.get("ai_bounding_boxes") or [],
-                    "description": d.get("description"),
-                })
+        # ✅ Ultra-simplified assessments: only bounding boxes (contains all info) + description
+        assessments_by_image: Dict[str, List[Dict[str, Any]]] = {}
+        for r in assessment_rows:
+            # 🎯 Each bounding box already contains: x, y, width, height, type, confidence
+            # (raw asyncpg rows carry JSONB as text)
+            boxes = r["ai_bounding_boxes"]
+            assessments_by_image.setdefault(str(r["inspection_image_id"]), []).append({
+                "ai_bounding_boxes": (orjson.loads(boxes) if boxes else None) or [],
+                "description": r["description"],
+            })
 
+        out_images: List[Dict[str, Any]] = []
+        for img in images:
+            assessments = assessments_by_image.get(img["id"], [])
             out_images.append({
                 "image_id": img["id"],
                 "blade": img["blade"],
@@ -641,7 +706,8 @@ class _Service:
         # Thống kê gọn
         stats = {
             "total_images": len(out_images),
-            "analyzed_images": sum(1 for i in images if (i.get("status") == ImageStatus.ANALYZED.value)),
+            "analyzed_images": counts["images_by_status"].get(ImageStatus.ANALYZED.value, 0),
+            **counts,
         }
 
         # Metadata gọn
@@ -718,6 +784,11 @@ class _Service:
 _service = _Service()
 
 
+def _without_none(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop keys whose value is None (smaller wire payload for sparse rows)"""
+    return {k: v for k, v in data.items() if v is not None}
+
+
 # =========================
 # Routes
 # =========================
@@ -739,9 +810,8 @@ async def upload_inspection(
     await check_turbine_access(turbine_id, current_user, min_role="editor")
 
     # Lưu về file tạm theo streaming + enforce MAX_ZIP_SIZE
-    tmp_dir = Path(TEMP_UPLOAD_DIR)
-    tmp_dir.mkdir(parents=True, exist_ok=True)
-    tmp_zip = tmp_dir / f"{uuid.uuid4()}.zip"
+    ensure_dir(TEMP_UPLOAD_DIR_STR)
+    tmp_zip = os.path.join(TEMP_UPLOAD_DIR_STR, f"{uuid.uuid4()}.zip")
 
     bytes_written = 0
     CHUNK = 1024 * 1024  # 1MB
@@ -758,7 +828,7 @@ async def upload_inspection(
                 except:
                     pass
                 try:
-                    tmp_zip.unlink(missing_ok=True)
+                    os.remove(tmp_zip)
                 except:
                     pass
                 raise HTTPException(status_code=400, detail=f"ZIP quá lớn (> {_Service.MAX_ZIP_SIZE // 1024 // 1024}MB)")
@@ -767,7 +837,7 @@ async def upload_inspection(
     # Kiểm tra chính xác ZIP
     if not zipfile.is_zipfile(tmp_zip):
         try:
-            tmp_zip.unlink(missing_ok=True)
+            os.remove(tmp_zip)
         except:
             pass
         raise HTTPException(status_code=400, detail="📦 File không phải định dạng ZIP hợp lệ")
@@ -775,7 +845,7 @@ async def upload_inspection(
     # Tạo inspection từ path
     result = await _service.create_inspection_from_zip_path(
         turbine_id=turbine_id,
-        zip_path=str(tmp_zip),
+        zip_path=tmp_zip,
         user_id=current_user["id"],
         operator=operator,
         equipment=equipment,
@@ -787,13 +857,13 @@ async def upload_inspection(
 @router.get("/turbine/{turbine_id}")
 async def list_inspections(
     turbine_id: str,
-    status_filter: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    status_filter: Optional[InspectionStatusValue] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(require_user),
 ):
     await check_turbine_access(turbine_id, current_user, min_role="viewer")
-    return await _service.list_inspections(turbine_id, status_filter, limit, offset)
+    return ORJSONResponse(await _service.list_inspections(turbine_id, status_filter, limit, offset))
 
 
 @router.get("/{inspection_id}")
@@ -805,12 +875,30 @@ async def get_inspection_detail(
     if not ins:
         raise HTTPException(status_code=404, detail="Inspection không tồn tại")
     await check_turbine_access(ins["turbine_id"], current_user, min_role="viewer")
-    images = await _service.get_images_for_inspection(inspection_id)
-    return {
-        "inspection": ins,
-        "total_images": len(images),
-        "images": images,
-    }
+
+    # Images are streamed from a cursor as they arrive, so large inspections are never
+    # held in memory as one list; total_images is written after the array.
+    # Image rows are sparse (viewed_at, captured_at, position_*...), so null keys are left out
+    images = _service.iterate_images_for_inspection(inspection_id)
+    # Read the first image before any bytes are sent, so a failing query is a 500
+    # rather than a truncated 200 body
+    first_img = await anext(images, None)
+
+    async def stream_detail():
+        try:
+            yield b'{"inspection":' + orjson.dumps(_without_none(ins)) + b',"images":['
+            total = 0
+            if first_img is not None:
+                yield orjson.dumps(_without_none(first_img))
+                total = 1
+                async for img in images:
+                    yield b",\n" + orjson.dumps(_without_none(img))
+                    total += 1
+            yield b'],"total_images":' + str(total).encode() + b"}"
+        finally:
+            await images.aclose()
+
+    return StreamingResponse(stream_detail(), media_type="application/json")
 
 
 @router.post("/images/{image_id}/analyze")
@@ -873,10 +961,11 @@ async def update_inspection(
     return await _service.update_inspection(inspection_id, request.dict(exclude_unset=True))
 
 
-@router.patch("/images/{image_id}/assessment", status_code=status.HTTP_200_OK)
+@router.patch("/images/{image_id}/assessment", status_code=status.HTTP_200_OK,
+              openapi_extra=json_body_openapi(UpdateAssessmentRequest))
 async def update_image_assessment(
     image_id: str,
-    request: UpdateAssessmentRequest,
+    request: UpdateAssessmentRequest = Depends(json_body(UpdateAssessmentRequest)),
     current_user: dict = Depends(require_user),
 ):
     """
@@ -998,10 +1087,11 @@ async def stream_image(image_id: str):
     )
 
 
-@router.patch("/images/{image_id}/assessment/box", status_code=status.HTTP_200_OK)
+@router.patch("/images/{image_id}/assessment/box", status_code=status.HTTP_200_OK,
+              openapi_extra=json_body_openapi(PartialUpdateBoxRequest))
 async def partial_update_bounding_box(
     image_id: str,
-    request: PartialUpdateBoxRequest,
+    request: PartialUpdateBoxRequest = Depends(json_body(PartialUpdateBoxRequest)),
     current_user: dict = Depends(require_user),
 ):
     """
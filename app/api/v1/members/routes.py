@@ -12,9 +12,10 @@ from app.db.models import (
     ProjectMemberResponse, ProjectMemberListResponse,
     AddMemberRequest, UpdateMemberRequest, ProjectRole, EntityType
 )
-from app.utilities.permissions import check_project_access
+from app.utilities.permissions import check_project_access, invalidate_project_membership
 from app.services.audit_service import AuditLogger
 from app.api.v1.users_admin.auth_routes import require_user
+from app.utilities.responses import model_response
 
 
 router = APIRouter(prefix="/members", tags=["members"])
@@ -22,8 +23,8 @@ router = APIRouter(prefix="/members", tags=["members"])
 
 def _row_to_member(row: sqlalchemy.engine.Row) -> ProjectMemberResponse:
     return ProjectMemberResponse(
-        project_id=str(row["project_id"]),
-        user_id=str(row["user_id"]),
+        project_id=row["project_id"],
+        user_id=row["user_id"],
         user_name=row["name"],
         user_email=row["email"],
         role=ProjectRole(row["role"]),
@@ -113,7 +114,7 @@ async def list_project_members(
     total = await database.fetch_val(
         "SELECT COUNT(*) FROM project_members WHERE project_id = :pid", {"pid": project_id}
     )
-    return ProjectMemberListResponse(members=members, total=total or 0, limit=limit, offset=offset)
+    return model_response(ProjectMemberListResponse(members=members, total=total or 0, limit=limit, offset=offset))
 
 
 @router.get("/project/{project_id}/search-users")
@@ -178,6 +179,7 @@ async def add_member(
         can_invite=payload.can_invite,
     )
     await database.execute(insert)
+    invalidate_project_membership(user["id"], project_id)
 
     # Fetch newly inserted membership with user info
     new_row = await database.fetch_one(
@@ -260,6 +262,7 @@ async def update_member(
         .values(**updates)
     )
     await database.execute(upd)
+    invalidate_project_membership(user_id, project_id)
 
     # Fetch updated
     new = await database.fetch_one(cur_q, {"pid": project_id, "uid": user_id})
@@ -320,6 +323,7 @@ async def remove_member(
             )
         )
     )
+    invalidate_project_membership(user_id, project_id)
 
     # Audit
     ip = AuditLogger.get_client_ip(request)
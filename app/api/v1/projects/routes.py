@@ -5,19 +5,22 @@ Cung cấp các endpoint để tạo, quản lý và thao tác với projects
 
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from pydantic import BaseModel
 
 from app.db.database import database, projects_table, project_members_table
 from app.db.models import (
-    ProjectCreateRequest, ProjectUpdateRequest, ProjectResponse, ProjectListResponse,
+    CreatedByInfo, ProjectCreateRequest, ProjectUpdateRequest, ProjectResponse, ProjectListResponse,
     ProjectMemberResponse, ProjectRole
 )
-from app.services.base_service import ProjectContextService
+from app.services.base_service import (
+    ProjectContextService, CREATED_BY_COLUMNS, attach_created_by, created_by_join
+)
 from app.services.audit_service import AuditLogger
 from app.utilities.permissions import check_project_access
 from app.db.models import EntityType
 from app.api.v1.users_admin.auth_routes import get_current_user, require_user, require_admin
+from app.utilities.responses import model_response
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -25,6 +28,15 @@ router = APIRouter(prefix="/projects", tags=["projects"])
 projects_service = ProjectContextService(projects_table, EntityType.PROJECT)
 
 
+def build_project_response(project: Dict[str, Any]) -> ProjectResponse:
+    """Build a ProjectResponse from trusted DB data without re-running validation"""
+    project = {**project, "id": str(project["id"])}
+    created_by = project.get("created_by")
+    if isinstance(created_by, dict):
+        project["created_by"] = CreatedByInfo.model_construct(**created_by)
+    return ProjectResponse.model_construct(**project)
+
+
 # ===============================
 # PROJECT CRUD OPERATIONS
 # ===============================
@@ -83,9 +95,9 @@ async def create_project(
         )
         
         # Enhance created_by info
-        enhanced_project = await projects_service.enhance_created_by_info(new_project)
+        enhanced_project = await projects_service.enhance_created_by_info(new_project, copy=False)
         
-        return ProjectResponse(**enhanced_project)
+        return model_response(build_project_response(enhanced_project), status_code=status.HTTP_201_CREATED)
         
     except Exception as e:
         raise HTTPException(
@@ -96,8 +108,8 @@ async def create_project(
 
 @router.get("/", response_model=ProjectListResponse)
 async def list_user_projects(
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(require_user)
 ):
     """
@@ -109,7 +121,7 @@ async def list_user_projects(
     
     try:
         # Query projects where user is a member with stats
-        query = """
+        query = f"""
         SELECT DISTINCT 
             p.*, 
             pm.role as user_role, 
@@ -120,9 +132,11 @@ async def list_user_projects(
                 SELECT COUNT(*) FROM turbines t 
                 INNER JOIN windfarms w2 ON t.windfarm_id = w2.id 
                 WHERE w2.project_id = p.id
-            ) as turbine_count
+            ) as turbine_count,
+            {CREATED_BY_COLUMNS}
         FROM projects p
         INNER JOIN project_members pm ON p.id = pm.project_id
+        {created_by_join("p")}
         WHERE pm.user_id = :user_id
         """
         
@@ -149,7 +163,7 @@ async def list_user_projects(
         # Format response
         projects = []
         for row in results:
-            project_dict = dict(row)
+            project_dict = attach_created_by(dict(row))
             # Add user's role in this project
             project_dict["user_role"] = project_dict.pop("user_role")
             project_dict["user_joined_at"] = project_dict.pop("joined_at")
@@ -158,17 +172,14 @@ async def list_user_projects(
             project_dict["windfarm_count"] = project_dict.get("windfarm_count", 0)
             project_dict["member_count"] = project_dict.get("member_count", 0)
             project_dict["turbine_count"] = project_dict.get("turbine_count", 0)
-            
-            # Enhance created_by information
-            project_dict = await projects_service.enhance_created_by_info(project_dict)
             projects.append(project_dict)
         
-        return ProjectListResponse(
+        return model_response(ProjectListResponse(
             projects=projects,
             total=total or 0,
             limit=limit,
             offset=offset
-        )
+        ))
         
     except Exception as e:
         raise HTTPException(
@@ -179,15 +190,15 @@ async def list_user_projects(
 
 @router.get("/list", response_model=ProjectListResponse)
 async def list_all_projects(
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(require_admin)
 ):
     """
     Admin-only: List all projects with counts of windfarms, turbines, and members.
     """
     try:
-        query = """
+        query = f"""
         SELECT 
           p.*, 
           (SELECT COUNT(*) FROM windfarms w WHERE w.project_id = p.id) AS windfarm_count,
@@ -196,29 +207,37 @@ async def list_all_projects(
             SELECT COUNT(*) FROM turbines t 
             INNER JOIN windfarms w2 ON t.windfarm_id = w2.id 
             WHERE w2.project_id = p.id
-          ) AS turbine_count
+          ) AS turbine_count,
+          {CREATED_BY_COLUMNS},
+          COUNT(*) OVER () AS total_count
         FROM projects p
+        {created_by_join("p")}
         ORDER BY p.created_at DESC
         LIMIT :limit OFFSET :offset
         """
 
         results = await database.fetch_all(query, {"limit": limit, "offset": offset})
         
-        # Enhance created_by information for each project
-        projects = []
-        for row in results:
-            project_dict = dict(row)
-            project_dict = await projects_service.enhance_created_by_info(project_dict)
-            projects.append(project_dict)
+        # The total rides along on every row (window count taken before LIMIT/OFFSET);
+        # past the last page there is no row to carry it
+        if results:
+            total = results[0]["total_count"]
+        elif offset:
+            total = await database.fetch_val("SELECT COUNT(*) FROM projects")
+        else:
+            total = 0
+        
+        # Creator info comes from the joined user columns
+        projects = [attach_created_by(dict(row)) for row in results]
+        for project in projects:
+            del project["total_count"]
 
-        total = await database.fetch_val("SELECT COUNT(*) FROM projects")
-
-        return ProjectListResponse(
+        return model_response(ProjectListResponse(
             projects=projects,
             total=total or 0,
             limit=limit,
             offset=offset
-        )
+        ))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -244,7 +263,7 @@ async def get_project_details(
         )
         
         # Enhance created_by information
-        project_data = await projects_service.enhance_created_by_info(project_data)
+        project_data = await projects_service.enhance_created_by_info(project_data, copy=False)
         
         # Get additional project stats
         stats_query = """
@@ -267,7 +286,7 @@ async def get_project_details(
                 "member_count": stats["member_count"] or 0
             })
         
-        return ProjectResponse(**project_response)
+        return model_response(build_project_response(project_response))
         
     except HTTPException:
         raise
@@ -321,7 +340,7 @@ async def update_project(
             update_data=update_data,
             actor_id=current_user["id"],
             project_id=project_id,
-            ip_address=request.client.host
+            ip_address=AuditLogger.get_client_ip(request)
         )
         
         # Get full project data with counts
@@ -339,7 +358,7 @@ async def update_project(
         stats = await database.fetch_one(stats_query, {"project_id": project_id})
         
         # Enhance created_by info
-        enhanced_project = await projects_service.enhance_created_by_info(updated_project)
+        enhanced_project = await projects_service.enhance_created_by_info(updated_project, copy=False)
         
         # Add stats to updated project data
         project_response = dict(enhanced_project)
@@ -350,7 +369,7 @@ async def update_project(
                 "member_count": stats["member_count"] or 0
             })
         
-        return ProjectResponse(**project_response)
+        return model_response(build_project_response(project_response))
         
     except HTTPException:
         raise
@@ -389,7 +408,7 @@ async def delete_project(
             entity_id=project_id,
             actor_id=current_user["id"],
             project_id=None,  # Set to None since project will be deleted
-            ip_address=request.client.host
+            ip_address=AuditLogger.get_client_ip(request)
         )
         
         if not success:
@@ -5,18 +5,21 @@ Cung cấp các endpoint để tạo, quản lý turbines trong windfarms
 
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from pydantic import BaseModel
 
 from app.db.database import database, turbines_table
 from app.db.models import (
-    TurbineCreateRequest, TurbineUpdateRequest, TurbineResponse, TurbineListResponse
+    CreatedByInfo, TurbineCreateRequest, TurbineUpdateRequest, TurbineResponse, TurbineListResponse
+)
+from app.services.base_service import (
+    ProjectContextService, CREATED_BY_COLUMNS, attach_created_by, created_by_join, list_page_cache
 )
-from app.services.base_service import ProjectContextService
 from app.services.audit_service import AuditLogger
 from app.utilities.permissions import check_project_access
 from app.db.models import EntityType
 from app.api.v1.users_admin.auth_routes import get_current_user, require_user, require_admin
+from app.utilities.responses import model_response
 
 router = APIRouter(prefix="/turbines", tags=["turbines"])
 
@@ -24,6 +27,18 @@ router = APIRouter(prefix="/turbines", tags=["turbines"])
 turbines_service = ProjectContextService(turbines_table, EntityType.TURBINE)
 
 
+def build_turbine_response(turbine: Dict[str, Any]) -> TurbineResponse:
+    """Build a TurbineResponse from trusted DB data without re-running validation"""
+    turbine = {**turbine, "id": str(turbine["id"]), "windfarm_id": str(turbine["windfarm_id"])}
+    created_by = turbine.get("created_by")
+    if isinstance(created_by, dict):
+        turbine["created_by"] = CreatedByInfo.model_construct(**created_by)
+    if turbine.get("capacity_mw") is not None:
+        turbine["capacity_mw"] = float(turbine["capacity_mw"])
+    turbine.setdefault("windfarm_name", None)
+    return TurbineResponse.model_construct(**turbine)
+
+
 # ===============================
 # TURBINE CRUD OPERATIONS
 # ===============================
@@ -88,12 +103,12 @@ async def create_turbine(
         )
         
         # Enhance created_by info
-        enhanced_turbine = await turbines_service.enhance_created_by_info(new_turbine)
+        enhanced_turbine = await turbines_service.enhance_created_by_info(new_turbine, copy=False)
         
         # Add windfarm_name to the response
         enhanced_turbine["windfarm_name"] = windfarm["name"]
         
-        return TurbineResponse(**enhanced_turbine)
+        return model_response(build_turbine_response(enhanced_turbine), status_code=status.HTTP_201_CREATED)
         
     except HTTPException:
         raise
@@ -107,8 +122,8 @@ async def create_turbine(
 @router.get("/windfarm/{windfarm_id}", response_model=TurbineListResponse)
 async def list_windfarm_turbines(
     windfarm_id: str,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     search: Optional[str] = None,
     current_user: dict = Depends(require_user)
 ):
@@ -147,6 +162,12 @@ async def list_windfarm_turbines(
             current_user["id"], windfarm["project_id"], required_role_level=1
         )
         
+        # Pages are cached briefly after the access check; writes clear the cache
+        cache_key = ("turbines", windfarm_id, search, limit, offset)
+        cached_page = list_page_cache.get(cache_key)
+        if cached_page is not None:
+            return model_response(cached_page)
+        
         # Build query with direct SQL
         where_conditions = ["t.windfarm_id = :windfarm_id"]
         query_params = {"windfarm_id": windfarm_id, "limit": limit, "offset": offset}
@@ -171,9 +192,11 @@ async def list_windfarm_turbines(
           t.created_at,
           t.updated_at,
           t.created_by,
-          w.name AS windfarm_name
+          w.name AS windfarm_name,
+          {CREATED_BY_COLUMNS}
         FROM turbines t
         INNER JOIN windfarms w ON t.windfarm_id = w.id
+        {created_by_join("t")}
         WHERE {where_clause}
         ORDER BY t.created_at DESC
         LIMIT :limit OFFSET :offset
@@ -181,12 +204,8 @@ async def list_windfarm_turbines(
         
         results = await database.fetch_all(query, query_params)
         
-        # Enhance created_by information for each turbine
-        turbines = []
-        for row in results:
-            turbine_dict = dict(row)
-            turbine_dict = await turbines_service.enhance_created_by_info(turbine_dict)
-            turbines.append(turbine_dict)
+        # Creator info comes from the joined user columns
+        turbines = [attach_created_by(dict(row)) for row in results]
         
         # Get total count
         count_query = f"""
@@ -197,18 +216,14 @@ async def list_windfarm_turbines(
         count_params = {k: v for k, v in query_params.items() if k not in ["limit", "offset"]}
         total = await database.fetch_val(count_query, count_params)
         
-        # Enhance created_by for each turbine
-        enhanced_turbines = []
-        for turbine in turbines:
-            enhanced_turbine = await turbines_service.enhance_created_by_info(dict(turbine))
-            enhanced_turbines.append(enhanced_turbine)
-        
-        return TurbineListResponse(
-            turbines=[TurbineResponse(**t) for t in enhanced_turbines],
+        page = TurbineListResponse(
+            turbines=[build_turbine_response(t) for t in turbines],
             total=total or 0,
             limit=limit,
             offset=offset
         )
+        list_page_cache.set(cache_key, page)
+        return model_response(page)
         
     except HTTPException:
         raise
@@ -221,15 +236,15 @@ async def list_windfarm_turbines(
 
 @router.get("/list", response_model=TurbineListResponse)
 async def list_all_turbines(
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     current_user: dict = Depends(require_admin)
 ):
     """
     Admin-only: List all turbines with windfarm name.
     """
     try:
-        query = """
+        query = f"""
         SELECT 
           t.id,
           t.name,
@@ -241,30 +256,28 @@ async def list_all_turbines(
           t.created_at,
           t.updated_at,
           t.created_by,
-          w.name AS windfarm_name
+          w.name AS windfarm_name,
+          {CREATED_BY_COLUMNS}
         FROM turbines t
         INNER JOIN windfarms w ON t.windfarm_id = w.id
+        {created_by_join("t")}
         ORDER BY t.created_at DESC
         LIMIT :limit OFFSET :offset
         """
 
         results = await database.fetch_all(query, {"limit": limit, "offset": offset})
         
-        # Enhance created_by information for each turbine
-        turbines = []
-        for row in results:
-            turbine_dict = dict(row)
-            turbine_dict = await turbines_service.enhance_created_by_info(turbine_dict)
-            turbines.append(turbine_dict)
+        # Creator info comes from the joined user columns
+        turbines = [attach_created_by(dict(row)) for row in results]
 
         total = await database.fetch_val("SELECT COUNT(*) FROM turbines")
 
-        return TurbineListResponse(
-            turbines=[TurbineResponse(**t) for t in turbines],
+        return model_response(TurbineListResponse(
+            turbines=[build_turbine_response(t) for t in turbines],
             total=total or 0,
             limit=limit,
             offset=offset
-        )
+        ))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -338,9 +351,9 @@ async def update_turbine(
         )
         
         # Enhance created_by info
-        enhanced_turbine = await turbines_service.enhance_created_by_info(dict(full_turbine))
+        enhanced_turbine = await turbines_service.enhance_created_by_info(dict(full_turbine), copy=False)
         
-        return TurbineResponse(**enhanced_turbine)
+        return model_response(build_turbine_response(enhanced_turbine))
         
     except HTTPException:
         raise
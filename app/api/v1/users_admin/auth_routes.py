@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, Response, Request, Depends, status
 from fastapi.responses import JSONResponse
 from app.db.models import *
-from app.db.database import database, users_table, temp_registrations_table, temp_sessions_table, auth_sessions_table, password_resets_table
+from app.db.database import database, users_table, temp_registrations_table, auth_sessions_table
 from app.utils import *
 from app.services.email_service import send_otp_email, send_otp_sms, send_admin_notification
 from datetime import datetime
@@ -10,14 +10,21 @@ from typing import Optional, List
 import uuid
 from datetime import datetime, timedelta
 from typing import List, Optional
+import asyncio
+import hmac
+import logging
+import time
 import uuid
 import sqlalchemy
 
-from fastapi import APIRouter, HTTPException, Response, Request, Depends, status
+from fastapi import (APIRouter, BackgroundTasks, Depends, HTTPException,
+                     Request, Response, status)
 
+from app.core.config import OTP_EXPIRE_MINUTES, PASSWORD_RESET_EXPIRE_MINUTES
 from app.db.database import (auth_sessions_table, database,
-                             password_resets_table, temp_registrations_table,
-                             temp_sessions_table, users_table)
+                             temp_registrations_table, user_credentials_table,
+                             users_table)
+from app.db import prepared_queries
 from app.db.models import (
     RegisterRequest,
     VerifyRegistrationRequest,
@@ -30,6 +37,7 @@ from app.db.models import (
     LoginSuccessResponse,
     SuccessResponse,
     UserListResponse,
+    USER_LIST_ADAPTER,
     ApproveUserRequest,
     AdminResponse,
     ForgotPasswordRequest,
@@ -37,7 +45,11 @@ from app.db.models import (
     ResetPasswordRequest,
     ChangePasswordRequest,
 )
+from app.services.base_service import invalidate_creator_cache
 from app.services.email_service import send_admin_notification, send_otp_email
+from app.utilities.cache import TTLCache
+from app.utilities.permissions import invalidate_admin_cache
+from app.utilities.responses import list_response
 from app.utilities import (
     hash_password,
     verify_password,
@@ -48,10 +60,36 @@ from app.utilities import (
     get_auth_session_expiry,
     is_expired,
     generate_session_token,
+    hash_session_token,
+    hmac_digest,
+    create_password_reset_token,
+    verify_password_reset_token,
 )
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+logger = logging.getLogger(__name__)
+
+# Short-lived cache of the user columns login needs, keyed by email/phone.
+# Entries are dropped whenever password, approval or existence changes.
+LOGIN_CACHE_FIELDS = ("id", "internal_id", "email", "phone", "password_hash", "is_approved", "is_active")
+login_user_cache = TTLCache(ttl_seconds=60, maxsize=4096)
+
+# Pending login OTPs keyed by temp_session_id ({"user_id", "email", "otp"}).
+# The TTL is the OTP lifetime, so an expired OTP is simply a missing entry.
+login_otp_sessions = TTLCache(ttl_seconds=OTP_EXPIRE_MINUTES * 60, maxsize=10000)
+# Latest temp_session_id per user, so a new login replaces the previous OTP
+login_otp_session_by_user = TTLCache(ttl_seconds=OTP_EXPIRE_MINUTES * 60, maxsize=10000)
+
+# Resolved auth sessions keyed by the session token hash ({"expires_at", "user"}).
+# Entries are dropped on logout, re-login and any change to the user.
+auth_session_cache = TTLCache(ttl_seconds=300, maxsize=10000)
+auth_session_key_by_user = TTLCache(ttl_seconds=300, maxsize=10000)
+
+# Users (internal_id) whose auth session is being replaced right now.
+# Guards the delete+insert in verify_otp against double-submitted OTPs.
+session_creation_in_progress = set()
+
 # ==================================================================================
 # 1. HELPER FUNCTIONS - Cookie handling and user validation utilities
 # ==================================================================================
@@ -80,6 +118,58 @@ def get_auth_session_id(request: Request) -> Optional[str]:
 def get_temp_password_reset_id(request: Request) -> Optional[str]:
     return request.cookies.get("temp_password_reset_id")
 
+# Helper function to decode the password reset token from cookie
+
+
+def get_password_reset_claims(request: Request) -> dict:
+    reset_token = get_temp_password_reset_id(request)
+    claims = verify_password_reset_token(reset_token) if reset_token else None
+    if not claims:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"status": "error", "message": "Phiên reset không hợp lệ"}
+        )
+    return claims
+
+# Helper function to set the password reset token cookie
+
+
+def set_password_reset_cookie(response: Response, reset_token: str):
+    response.set_cookie(
+        key="temp_password_reset_id",
+        value=reset_token,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        path="/",
+        max_age=PASSWORD_RESET_EXPIRE_MINUTES * 60
+    )
+
+# Helper function to drop the cached auth session of a user
+
+
+def invalidate_auth_session_cache(user_internal_id: int) -> None:
+    cache_key = auth_session_key_by_user.get(user_internal_id)
+    if cache_key:
+        auth_session_cache.delete(cache_key)
+    auth_session_key_by_user.delete(user_internal_id)
+
+# Helper function to drop cached login rows and auth session of a user
+
+
+def invalidate_user_cache(user) -> None:
+    login_user_cache.delete(user["email"], user["phone"])
+    invalidate_auth_session_cache(user["internal_id"])
+    invalidate_creator_cache(user["id"])
+    invalidate_admin_cache(user["id"])
+
+# Helper function to mask an email address before it is logged
+
+
+def mask_email(email: str) -> str:
+    local, _, domain = email.partition("@")
+    return f"{local[:2]}***@{domain}" if domain else "***"
+
 # Helper function to get current user from session
 
 async def get_current_user(request: Request) -> Optional[dict]:
@@ -88,21 +178,32 @@ async def get_current_user(request: Request) -> Optional[dict]:
     if not auth_session_id:
         return None
 
+    # Sessions are stored by token hash, so a leaked table holds no usable cookies
+    token_hash = hash_session_token(auth_session_id)
+
+    # Warm path: session already resolved recently
+    cached = auth_session_cache.get(token_hash)
+    if cached is not None:
+        if is_expired(cached["expires_at"]):
+            auth_session_cache.delete(token_hash)
+            return None
+        return dict(cached["user"])
+
     # Check auth session
-    query = sqlalchemy.select(auth_sessions_table).where(
-        auth_sessions_table.c.session_token == auth_session_id
-    )
-    session = await database.fetch_one(query)
+    session = await prepared_queries.fetchrow(prepared_queries.AUTH_SESSION_BY_TOKEN, token_hash)
 
     if not session or is_expired(session["expires_at"]):
         return None
 
     # Get user
-    user_query = sqlalchemy.select(users_table).where(
-        users_table.c.id == session.user_id
-    )
-    user = await database.fetch_one(user_query)
-    return dict(user) if user else None
+    user = await prepared_queries.fetchrow(prepared_queries.USER_BY_INTERNAL_ID, session["user_id"])
+    if not user:
+        return None
+
+    user = dict(user)
+    auth_session_cache.set(token_hash, {"expires_at": session["expires_at"], "user": user})
+    auth_session_key_by_user.set(user["internal_id"], token_hash)
+    return dict(user)
 
 # Strict dependency to require authentication in routes
 async def require_user(request: Request) -> dict:
@@ -155,13 +256,12 @@ async def register(request: RegisterRequest, response: Response):
         )
 
     # Check if email or phone already exists
-    query = sqlalchemy.select(users_table).where(
-        sqlalchemy.or_(
-            users_table.c.email == request.email,
-            users_table.c.phone == request.phone
-        )
+    # Hash password on a worker thread while the existence check runs,
+    # so bcrypt no longer blocks the event loop nor adds to the DB latency
+    existing_user, password_hash = await asyncio.gather(
+        prepared_queries.fetchrow(prepared_queries.SELECT_USER_EXISTS, request.email, request.phone),
+        asyncio.to_thread(hash_password, request.password)
     )
-    existing_user = await database.fetch_one(query)
 
     if existing_user:
         raise HTTPException(
@@ -169,9 +269,8 @@ async def register(request: RegisterRequest, response: Response):
             detail={"status": "error", "message": "Email hoặc số điện thoại đã được đăng kí"}
         )
 
-    # Generate OTP and hash password
+    # Generate OTP
     otp = generate_otp()
-    password_hash = hash_password(request.password)
 
     # Save temporary registration
     temp_reg_id = str(uuid.uuid4())
@@ -185,18 +284,18 @@ async def register(request: RegisterRequest, response: Response):
         "otp_expires_at": get_otp_expiry()
     }
 
-    # Delete any existing temp registration for this email/phone
-    delete_query = sqlalchemy.delete(temp_registrations_table).where(
-        sqlalchemy.or_(
-            temp_registrations_table.c.email == request.email,
-            temp_registrations_table.c.phone == request.phone
-        )
+    # Insert new temp registration, replacing a pending one for the same email or phone
+    # (expired rows are pruned by the background cleanup task)
+    await prepared_queries.execute(
+        prepared_queries.UPSERT_TEMP_REGISTRATION,
+        temp_reg_data["id"],
+        temp_reg_data["name"],
+        temp_reg_data["email"],
+        temp_reg_data["phone"],
+        temp_reg_data["password_hash"],
+        temp_reg_data["otp_code"],
+        temp_reg_data["otp_expires_at"]
     )
-    await database.execute(delete_query)
-
-    # Insert new temp registration
-    insert_query = temp_registrations_table.insert().values(temp_reg_data)
-    await database.execute(insert_query)
     # Set cookie
     response.set_cookie(
         key="temp_registration_id",
@@ -221,11 +320,10 @@ async def verify_registration(request: VerifyRegistrationRequest, http_request:
     
     Process:
     1. Validate temporary registration cookie
-    2. Check OTP code and expiration
+    2. Check OTP code and expiration while consuming the temporary registration
     3. Create user account (not approved yet)
     4. Send admin notification email
-    5. Clean up temporary registration
-    6. Return success response
+    5. Return success response
     """
 
     temp_reg_id = get_temp_registration_id(http_request)
@@ -235,40 +333,48 @@ async def verify_registration(request: VerifyRegistrationRequest, http_request:
             detail={"status": "error", "message": "Chưa thấy đăng kí"}
         )
 
-    # Get temp registration
-    query = sqlalchemy.select(temp_registrations_table).where(
-        temp_registrations_table.c.id == temp_reg_id
-    )
-    temp_reg = await database.fetch_one(query)
-
-    if not temp_reg:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"status": "error", "message": "Chưa thấy đăng kí"}
-        )
-
-    # Check OTP and expiry
-    if temp_reg.otp_code != request.otp or is_expired(temp_reg.otp_expires_at):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={"status": "error", "message": "Mã OTP đã hết hạn hoặc không tồn tại"}
+    # Verify and consume the OTP in a single statement: the row is only
+    # deleted (and returned) when id, OTP and expiry all match, so the
+    # comparison happens inside the database rather than in Python
+    consume_query = sqlalchemy.delete(temp_registrations_table).where(
+        sqlalchemy.and_(
+            temp_registrations_table.c.id == temp_reg_id,
+            temp_registrations_table.c.otp_code == request.otp,
+            temp_registrations_table.c.otp_expires_at > datetime.utcnow()
         )
+    ).returning(
+        temp_registrations_table.c.name,
+        temp_registrations_table.c.email,
+        temp_registrations_table.c.phone,
+        temp_registrations_table.c.password_hash
+    )
 
-    # Create user (not approved yet)
     user_id = str(uuid.uuid4())
-    user_data = {
-        "id": user_id,
-        "name": temp_reg.name,
-        "email": temp_reg.email,
-        "phone": temp_reg.phone,
-        "password_hash": temp_reg.password_hash,
-        "role": "user",
-        "is_active": True,
-        "is_approved": False  # Need admin approval
-    }
-
-    insert_user_query = users_table.insert().values(user_data)
-    await database.execute(insert_user_query)
+    async with database.transaction():
+        temp_reg = await database.fetch_one(consume_query)
+
+        if not temp_reg:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"status": "error", "message": "Mã OTP đã hết hạn hoặc không tồn tại"}
+            )
+
+        # Create user (not approved yet)
+        user_data = {
+            "id": user_id,
+            "name": temp_reg.name,
+            "email": temp_reg.email,
+            "phone": temp_reg.phone,
+            "role": "user",
+            "is_active": True,
+            "is_approved": False  # Need admin approval
+        }
+
+        insert_user_query = users_table.insert().values(user_data)
+        await database.execute(insert_user_query)
+        await database.execute(
+            user_credentials_table.insert().values(user_id=user_id, password_hash=temp_reg.password_hash)
+        )
 
     # Send notification to admin about new registration
     admin_notification_data = {
@@ -281,14 +387,8 @@ async def verify_registration(request: VerifyRegistrationRequest, http_request:
     # Send admin notification (don't fail registration if email fails)
     try:
         await send_admin_notification(admin_notification_data)
-    except Exception as e:
-        print(f"Warning: Failed to send admin notification: {e}")
-
-    # Delete temp registration
-    delete_temp_query = sqlalchemy.delete(temp_registrations_table).where(
-        temp_registrations_table.c.id == temp_reg_id
-    )
-    await database.execute(delete_temp_query)
+    except Exception:
+        logger.warning("admin notification failed for %s", mask_email(temp_reg.email), exc_info=True)
 
     # Clear temp registration cookie
     response.delete_cookie(key="temp_registration_id", path="/")
@@ -382,19 +482,23 @@ async def login(request: LoginRequest, response: Response):
     6. Set temporary session cookie
     """
 
-    # Determine if identifier is email or phone
-    if is_email(request.identifier):
-        query = sqlalchemy.select(users_table).where(users_table.c.email == request.identifier)
-    elif is_phone(request.identifier):
-        query = sqlalchemy.select(users_table).where(users_table.c.phone == request.identifier)
-    else:
+    # Validate identifier format (email or phone)
+    if not (is_email(request.identifier) or is_phone(request.identifier)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"status": "error", "message": "Định dạng email hoặc số điện thoại không hợp lệ"}
         )
 
-    user = await database.fetch_one(query)
-    if not user or not verify_password(request.password, user["password_hash"]):
+    # Single prepared lookup statement for both identifier kinds
+    user = login_user_cache.get(request.identifier)
+    if user is None:
+        row = await prepared_queries.fetchrow(prepared_queries.SELECT_LOGIN_USER, request.identifier)
+        if row:
+            user = {field: row[field] for field in LOGIN_CACHE_FIELDS}
+            login_user_cache.set(request.identifier, user)
+
+    # bcrypt runs on a worker thread so the event loop keeps serving other requests
+    if not user or not await asyncio.to_thread(verify_password, request.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"status": "error", "message": "Thông tin đăng nhập không chính xác"}
@@ -417,22 +521,17 @@ async def login(request: LoginRequest, response: Response):
     otp = generate_otp()
     temp_session_id = str(uuid.uuid4())
 
-    # Delete any existing temp sessions for this user
-    delete_query = sqlalchemy.delete(temp_sessions_table).where(
-        temp_sessions_table.c.user_id == user["id"]
-    )
-    await database.execute(delete_query)
-
-    # Create new temp session
-    temp_session_data = {
-        "id": temp_session_id,
-        "user_id": user["id"],
-        "otp_code": otp,
-        "otp_expires_at": get_otp_expiry()
-    }
-
-    insert_query = temp_sessions_table.insert().values(temp_session_data)
-    await database.execute(insert_query)
+    # Drop any pending OTP of this user, then store the new one
+    previous_session_id = login_otp_session_by_user.get(user["internal_id"])
+    if previous_session_id:
+        login_otp_sessions.delete(previous_session_id)
+
+    login_otp_sessions.set(temp_session_id, {
+        "user_id": user["internal_id"],
+        "email": user["email"],
+        "otp": otp
+    })
+    login_otp_session_by_user.set(user["internal_id"], temp_session_id)
     # Set cookie
     response.set_cookie(
         key="temp_session_id",
@@ -462,16 +561,16 @@ async def forgot_password(request: ForgotPasswordRequest, response: Response):
     
     Process:
     1. Validate user email and approval status
-    2. Generate reset token and OTP
-    3. Store password reset record
-    4. Send OTP via email
-    5. Set temporary reset cookie
+    2. Generate OTP and signed reset token (OTP stored as HMAC in the token)
+    3. Send OTP via email
+    4. Set temporary reset cookie
     """
     email = request.email.lower().strip()
 
     # Chỉ tìm user khi email khớp và đã được phê duyệt
     user_query = (
-        sqlalchemy.select(users_table)
+        sqlalchemy.select(users_table.c.id, user_credentials_table.c.password_hash)
+        .join(user_credentials_table, user_credentials_table.c.user_id == users_table.c.id)
         .where(users_table.c.email == email)
         .where(users_table.c.is_approved)
     )
@@ -484,43 +583,18 @@ async def forgot_password(request: ForgotPasswordRequest, response: Response):
             message="Email không tồn tại hoặc chưa được phê duyệt. Vui lòng liên hệ quản trị viên."
         )
 
-    # Nếu hợp lệ thì tạo bản ghi reset password
-    reset_id = str(uuid.uuid4())
+    # Nếu hợp lệ thì tạo token reset (OTP được HMAC, không lưu DB)
     otp = generate_otp()
-    reset_data = {
-        "id": reset_id,
-        "user_id": user["id"],
-        "email": email,
-        "otp_code": otp,
-        "otp_expires_at": get_otp_expiry(),
-        "is_verified": False,
-        "used": False
-    }
-
-    # Xóa bản ghi reset cũ của email này (nếu có)
-    await database.execute(
-        sqlalchemy.delete(password_resets_table).where(password_resets_table.c.email == email)
-    )
-
-    insert_query = password_resets_table.insert().values(reset_data)
-    await database.execute(insert_query)
+    reset_token = create_password_reset_token(user["id"], email, hmac_digest(user["password_hash"]), otp=otp)
 
     # Gửi OTP qua email (nếu lỗi thì chỉ log, không thông báo cho client)
     try:
         await send_otp_email(email, otp, "password_reset")
-    except Exception as e:
-        print(f"Warning: failed to send password reset OTP to {email}: {e}")
+    except Exception:
+        logger.warning("password reset OTP send failed for %s", mask_email(email), exc_info=True)
 
     # Đặt cookie tạm để xác thực OTP
-    response.set_cookie(
-        key="temp_password_reset_id",
-        value=reset_id,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        path="/",
-        max_age=600  # 10 phút
-    )
+    set_password_reset_cookie(response, reset_token)
 
     return SuccessResponse(
         status="success",
@@ -544,7 +618,8 @@ async def change_password(
     """
 
     # 1. Check current password
-    if not verify_password(request.current_password, current_user["password_hash"]):
+    password_hash = await prepared_queries.fetchval(prepared_queries.SELECT_PASSWORD_HASH, current_user["id"])
+    if not password_hash or not await asyncio.to_thread(verify_password, request.current_password, password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"status": "error", "message": "Mật khẩu hiện tại không chính xác"},
@@ -558,19 +633,15 @@ async def change_password(
         )
 
     # 3. Hash new password
-    new_hashed = hash_password(request.new_password)
+    new_hashed = await asyncio.to_thread(hash_password, request.new_password)
 
     # 4. Update vào DB
-    update_q = (
-        users_table.update()
-        .where(users_table.c.id == current_user["id"])
-        .values(password_hash=new_hashed)
-    )
-    await database.execute(update_q)
+    await prepared_queries.execute(prepared_queries.UPDATE_PASSWORD_HASH, current_user["id"], new_hashed)
+    invalidate_user_cache(current_user)
 
     # 5. (optional) có thể xoá session cũ để buộc đăng nhập lại
     # await database.execute(sqlalchemy.delete(auth_sessions_table).where(
-    #     auth_sessions_table.c.user_id == current_user["id"]
+    #     auth_sessions_table.c.user_id == current_user["internal_id"]
     # ))
 
     return SuccessResponse(
@@ -578,59 +649,42 @@ async def change_password(
         message="Đổi mật khẩu thành công!"
     )
 @router.post("/verify-reset-otp", response_model=SuccessResponse)
-async def verify_reset_otp(request: VerifyResetOTPRequest, http_request: Request):
+async def verify_reset_otp(request: VerifyResetOTPRequest, http_request: Request, response: Response):
     """
     Step 2 of Password Reset: Verify OTP code
     
     Process:
-    1. Validate reset session cookie
-    2. Check OTP code and expiration
+    1. Validate reset token cookie
+    2. Check OTP code and expiration against the token claims
     3. Auto-resend OTP if expired
-    4. Mark OTP as verified if valid
+    4. Issue a verified reset token if valid
     """
-    reset_id = get_temp_password_reset_id(http_request)
-    if not reset_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"status": "error", "message": "Phiên reset không hợp lệ"}
-        )
-
-    query = sqlalchemy.select(password_resets_table).where(password_resets_table.c.id == reset_id)
-    reset_record = await database.fetch_one(query)
-    if not reset_record:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"status": "error", "message": "Phiên reset không hợp lệ"}
-        )
+    claims = get_password_reset_claims(http_request)
 
-    if reset_record.used:
+    if not claims.get("otp_hmac"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"status": "error", "message": "Mã đã được sử dụng"}
         )
 
-    # Nếu OTP đã hết hạn (sau 5 phút) thì sinh lại OTP mới và gửi lại
-    if is_expired(reset_record.otp_expires_at):
-        await resend_otp(reset_record)
+    # Nếu OTP đã hết hạn thì sinh lại OTP mới và gửi lại
+    if time.time() > claims["otp_exp"]:
+        await reissue_reset_otp(claims, response)
         return SuccessResponse(
             status="expired",
             message="Mã OTP đã hết hạn. OTP mới đã được gửi đến email của bạn."
         )
 
-    # Nếu OTP không khớp
-    if reset_record.otp_code != request.otp:
+    # Nếu OTP không khớp (so sánh constant-time)
+    if not hmac.compare_digest(claims["otp_hmac"], hmac_digest(request.otp)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"status": "error", "message": "Mã OTP không hợp lệ"}
         )
 
-    # Nếu mọi thứ hợp lệ => mark là verified
-    update_q = (
-        sqlalchemy.update(password_resets_table)
-        .where(password_resets_table.c.id == reset_id)
-        .values(is_verified=True)
-    )
-    await database.execute(update_q)
+    # Nếu mọi thứ hợp lệ => cấp token đã verified
+    verified_token = create_password_reset_token(claims["uid"], claims["email"], claims["pwh"], verified=True)
+    set_password_reset_cookie(response, verified_token)
 
     return SuccessResponse(
         status="success",
@@ -638,87 +692,57 @@ async def verify_reset_otp(request: VerifyResetOTPRequest, http_request: Request
     )
 
 
-async def resend_otp(reset_record):
+async def reissue_reset_otp(claims: dict, response: Response) -> str:
     """
     Utility function: Generate and send new OTP when previous one expires
     
     Process:
-    1. Generate new OTP with 5-minute expiry
-    2. Update database record
+    1. Generate new OTP
+    2. Issue a new reset token carrying the OTP HMAC
     3. Send new OTP via email
     """
     new_otp = generate_otp()
-    new_expiry = get_otp_expiry(minutes=5)  # chỉ sống 5 phút
-
-    # Update record trong DB
-    update_q = (
-        sqlalchemy.update(password_resets_table)
-        .where(password_resets_table.c.id == reset_record.id)
-        .values(otp_code=new_otp, otp_expires_at=new_expiry, is_verified=False)
-    )
-    await database.execute(update_q)
+    reset_token = create_password_reset_token(claims["uid"], claims["email"], claims["pwh"], otp=new_otp)
+    set_password_reset_cookie(response, reset_token)
 
     # Gửi lại email OTP
     try:
-        await send_otp_email(reset_record.email, new_otp, "password_reset")
-    except Exception as e:
-        print(f"Warning: resend OTP failed for {reset_record.email}: {e}")
+        await send_otp_email(claims["email"], new_otp, "password_reset")
+    except Exception:
+        logger.warning("password reset OTP resend failed for %s", mask_email(claims["email"]), exc_info=True)
 
     return new_otp
 
 
 @router.post("/resend-reset-otp", response_model=SuccessResponse)
-async def resend_reset_otp(http_request: Request):
+async def resend_reset_otp(http_request: Request, response: Response):
     """
     Manual Resend Reset OTP: Allow user to request new OTP
     
     Process:
-    1. Validate reset session
+    1. Validate reset token
     2. Generate new OTP with fresh expiry
-    3. Update database record
+    3. Issue a new reset token
     4. Send new OTP via email
     """
-
-    reset_id = get_temp_password_reset_id(http_request)
-    if not reset_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"status": "error", "message": "Phiên reset không hợp lệ"}
-        )
-
-    query = sqlalchemy.select(password_resets_table).where(password_resets_table.c.id == reset_id)
-    reset_record = await database.fetch_one(query)
-    if not reset_record:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"status": "error", "message": "Phiên reset không hợp lệ"}
-        )
+    claims = get_password_reset_claims(http_request)
 
     # Sinh OTP mới
     new_otp = generate_otp()
-    new_expiry = get_otp_expiry(minutes=5)
-
-    update_q = (
-        sqlalchemy.update(password_resets_table)
-        .where(password_resets_table.c.id == reset_id)
-        .values(
-            otp_code=new_otp,
-            otp_expires_at=new_expiry,
-            is_verified=False
-        )
-    )
-    await database.execute(update_q)
+    reset_token = create_password_reset_token(claims["uid"], claims["email"], claims["pwh"], otp=new_otp)
 
     # Gửi email OTP mới
     try:
-        await send_otp_email(reset_record.email, new_otp, "password_reset")
-    except Exception as e:
-        print(f"Warning: resend OTP failed for {reset_record.email}: {e}")
+        await send_otp_email(claims["email"], new_otp, "password_reset")
+    except Exception:
+        logger.warning("password reset OTP resend failed for %s", mask_email(claims["email"]), exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={"status": "error", "message": "Không thể gửi lại OTP, thử lại sau."}
         )
 
+    set_password_reset_cookie(response, reset_token)
+
     return SuccessResponse(
         status="success",
         message="Mã OTP mới đã được gửi đến email của bạn. Vui lòng kiểm tra hộp thư."
@@ -731,58 +755,41 @@ async def reset_password(request: ResetPasswordRequest, http_request: Request, r
     Step 3 of Password Reset: Set new password after OTP verification
     
     Process:
-    1. Validate reset session and verification status
+    1. Validate reset token and verification status
     2. Confirm password match
-    3. Update user password hash
-    4. Invalidate all existing auth sessions (force logout)
-    5. Mark reset request as used
+    3. Reject the token if the password already changed since it was issued
+    4. Update user password hash
+    5. Invalidate all existing auth sessions (force logout)
     6. Clear reset cookie
     """
-    reset_id = get_temp_password_reset_id(http_request)
-    if not reset_id:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail={"status": "error", "message": "Phiên reset không hợp lệ"})
+    claims = get_password_reset_claims(http_request)
 
-    # fetch reset record
-    query = sqlalchemy.select(password_resets_table).where(password_resets_table.c.id == reset_id)
-    reset_record = await database.fetch_one(query)
-    if not reset_record:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail={"status": "error", "message": "Phiên reset không hợp lệ"})
-
-    if reset_record.used:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"status": "error", "message": "Yêu cầu reset đã được xử lý"})
-
-    if not reset_record.is_verified:
+    if not claims.get("verified"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"status": "error", "message": "OTP chưa được xác thực"})
 
-    if is_expired(reset_record.otp_expires_at):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"status": "error", "message": "Phiên reset đã hết hạn"})
-
     # check password match
     if request.password != request.confirm_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"status": "error", "message": "Mật khẩu không trùng khớp"})
 
-    # find user by user_id or email
-    user = None
-    if reset_record.user_id:
-        user_q = sqlalchemy.select(users_table).where(users_table.c.id == reset_record.user_id)
-        user = await database.fetch_one(user_q)
-    else:
-        # fallback by email if user_id is null (maybe account did not exist at request time)
-        user_q = sqlalchemy.select(users_table).where(users_table.c.email == reset_record.email)
-        user = await database.fetch_one(user_q)
+    user, password_hash = await asyncio.gather(
+        prepared_queries.fetchrow(prepared_queries.USER_BY_ID, claims["uid"]),
+        prepared_queries.fetchval(prepared_queries.SELECT_PASSWORD_HASH, claims["uid"]),
+    )
+
+    # Token chỉ dùng được 1 lần: mật khẩu đã đổi thì fingerprint không còn khớp
+    if user and not (password_hash and hmac.compare_digest(hmac_digest(password_hash), claims["pwh"])):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"status": "error", "message": "Yêu cầu reset đã được xử lý"})
 
     # If user does not exist -> we still return generic success to avoid leakage,
     # but no password is changed.
     if user:
-        new_hash = hash_password(request.password)
-        update_user_q = users_table.update().where(users_table.c.id == user["id"]).values(password_hash=new_hash)
-        await database.execute(update_user_q)
-
-        # Optional: Invalidate all existing auth sessions for the user (force logout)
-        await database.execute(sqlalchemy.delete(auth_sessions_table).where(auth_sessions_table.c.user_id == user["id"]))
+        new_hash = await asyncio.to_thread(hash_password, request.password)
+        await prepared_queries.execute(prepared_queries.UPDATE_PASSWORD_HASH, user["id"], new_hash)
 
-    # mark reset record used
-    await database.execute(sqlalchemy.update(password_resets_table).where(password_resets_table.c.id == reset_id).values(used=True))
+        # Invalidate all existing auth sessions for the user (force logout). Delete the rows
+        # before dropping the caches, or a request in between could re-cache an old session
+        await prepared_queries.execute(prepared_queries.DELETE_AUTH_SESSIONS_BY_USER, user["internal_id"])
+        invalidate_user_cache(user)
 
     # remove cookie
     response.delete_cookie(key="temp_password_reset_id", path="/")
@@ -803,7 +810,7 @@ async def verify_otp(request: VerifyOTPRequest, http_request: Request, response:
     Process:
     1. Validate temporary session cookie
     2. Check OTP code and expiration
-    3. Create permanent auth session
+    3. Replace existing auth sessions with a new one (single statement)
     4. Set auth session cookie
     5. Clean up temporary session
     6. Return user information
@@ -816,11 +823,8 @@ async def verify_otp(request: VerifyOTPRequest, http_request: Request, response:
             detail={"status": "error", "message": "Phiên đăng nhập không hợp lệ"}
         )
 
-    # Get temp session
-    query = sqlalchemy.select(temp_sessions_table).where(
-        temp_sessions_table.c.id == temp_session_id
-    )
-    temp_session = await database.fetch_one(query)
+    # Get pending OTP (expired entries are already gone)
+    temp_session = login_otp_sessions.get(temp_session_id)
 
     if not temp_session:
         raise HTTPException(
@@ -828,49 +832,60 @@ async def verify_otp(request: VerifyOTPRequest, http_request: Request, response:
             detail={"status": "error", "message": "Phiên đăng nhập không hợp lệ"}
         )
 
-    # Check OTP and expiry
-    if temp_session.otp_code != request.otp or is_expired(temp_session.otp_expires_at):
+    # Check OTP (constant-time comparison)
+    if not hmac.compare_digest(temp_session["otp"], request.otp):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"status": "error", "message": "Mã OTP không hợp lệ hoặc đã hết hạn"}
         )
 
     # Get user info
-    user_query = sqlalchemy.select(users_table).where(
-        users_table.c.id == temp_session.user_id
-    )
-    user = await database.fetch_one(user_query)
+    user = await prepared_queries.fetchrow(prepared_queries.USER_BY_INTERNAL_ID, temp_session["user_id"])
 
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"status": "error", "message": "Người dùng không tồn tại"}
         )    # Create auth session
-    auth_session_id = str(uuid.uuid4())
+    # One CSPRNG draw for the cookie; only its hash is stored (id comes from the DB default)
     session_token = generate_session_token()
 
     auth_session_data = {
-        "id": auth_session_id,
-        "user_id": user["id"],
-        "session_token": session_token,
+        "user_id": user["internal_id"],
+        "session_token": hash_session_token(session_token),
         "expires_at": get_auth_session_expiry()
     }
 
-    # Delete any existing auth sessions for this user
-    delete_auth_query = sqlalchemy.delete(auth_sessions_table).where(
-        auth_sessions_table.c.user_id == user["id"]
-    )
-    await database.execute(delete_auth_query)
-
-    # Insert new auth session
-    insert_auth_query = auth_sessions_table.insert().values(auth_session_data)
-    await database.execute(insert_auth_query)
+    # Only one session replacement per user at a time; a concurrent verify gets 429
+    if user["internal_id"] in session_creation_in_progress:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"status": "error", "message": "Đang xử lý đăng nhập, vui lòng thử lại"}
+        )
+    session_creation_in_progress.add(user["internal_id"])
+    try:
+        # Replace any existing auth sessions for this user in one statement:
+        # WITH old_sessions AS (DELETE ...) INSERT INTO auth_sessions ...
+        delete_auth_cte = sqlalchemy.delete(auth_sessions_table).where(
+            auth_sessions_table.c.user_id == user["internal_id"]
+        ).returning(auth_sessions_table.c.id).cte("old_sessions")
+        replace_auth_query = auth_sessions_table.insert().values(auth_session_data).add_cte(delete_auth_cte)
+        await database.execute(replace_auth_query)
+        invalidate_auth_session_cache(user["internal_id"])
+
+        # Write the new session through to the cache so the first authenticated
+        # request after login does not go back to the database
+        auth_session_cache.set(
+            auth_session_data["session_token"],
+            {"expires_at": auth_session_data["expires_at"], "user": dict(user)}
+        )
+        auth_session_key_by_user.set(user["internal_id"], auth_session_data["session_token"])
+    finally:
+        session_creation_in_progress.discard(user["internal_id"])
 
     # Delete temp session
-    delete_temp_query = sqlalchemy.delete(temp_sessions_table).where(
-        temp_sessions_table.c.id == temp_session_id
-    )
-    await database.execute(delete_temp_query)
+    login_otp_sessions.delete(temp_session_id)
+    login_otp_session_by_user.delete(user["internal_id"])
 
     # Set auth cookie and clear temp cookie
     response.set_cookie(
@@ -887,14 +902,7 @@ async def verify_otp(request: VerifyOTPRequest, http_request: Request, response:
     return LoginSuccessResponse(
         status="success",
         message="Login successful",
-        user=UserResponse(
-            id=str(user["id"]),
-            name=user["name"],
-            email=user["email"],
-            phone=user["phone"],
-            role=user["role"],
-            is_approved=user["is_approved"]
-        )
+        user=UserResponse.model_validate(dict(user))
     )
 
 
@@ -905,10 +913,9 @@ async def resend_otp(request: Request):
     
     Process:
     1. Validate temporary session
-    2. Get user information
-    3. Generate new OTP
-    4. Update temporary session
-    5. Send new OTP via email
+    2. Generate new OTP
+    3. Update temporary session (restarts its expiry)
+    4. Send new OTP via email
     """
 
     temp_session_id = get_temp_session_id(request)
@@ -918,11 +925,8 @@ async def resend_otp(request: Request):
             detail={"status": "error", "message": "Phiên đăng nhập không hợp lệ"}
         )
 
-    # Get temp session with user info
-    query = sqlalchemy.select(temp_sessions_table).where(
-        temp_sessions_table.c.id == temp_session_id
-    )
-    temp_session = await database.fetch_one(query)
+    # Get temp session (carries the user's email)
+    temp_session = login_otp_sessions.get(temp_session_id)
 
     if not temp_session:
         raise HTTPException(
@@ -930,36 +934,15 @@ async def resend_otp(request: Request):
             detail={"status": "error", "message": "Phiên đăng nhập không hợp lệ"}
         )
 
-    # Get user info
-    user_query = sqlalchemy.select(users_table).where(
-        users_table.c.id == temp_session.user_id
-    )
-    user = await database.fetch_one(user_query)
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"status": "error", "message": "Người dùng không tồn tại"}
-        )
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"status": "error", "message": "Phiên đăng nhập không hợp lệ"}
-        )
-
     # Generate new OTP
     new_otp = generate_otp()
 
     # Update temp session with new OTP
-    update_query = sqlalchemy.update(temp_sessions_table).where(
-        temp_sessions_table.c.id == temp_session_id
-    ).values(
-        otp_code=new_otp,
-        otp_expires_at=get_otp_expiry()
-    )
-    await database.execute(update_query)
+    login_otp_sessions.set(temp_session_id, {**temp_session, "otp": new_otp})
+    login_otp_session_by_user.set(temp_session["user_id"], temp_session_id)
 
     # Send new OTP to email (you can modify logic to determine email vs SMS)
-    otp_sent = await send_otp_email(user["email"], new_otp, "login")
+    otp_sent = await send_otp_email(temp_session["email"], new_otp, "login")
 
     if not otp_sent:
         raise HTTPException(
@@ -987,10 +970,12 @@ async def logout(request: Request, response: Response):
     auth_session_id = get_auth_session_id(request)
     if auth_session_id:
         # Delete auth session from database
+        token_hash = hash_session_token(auth_session_id)
         delete_query = sqlalchemy.delete(auth_sessions_table).where(
-            auth_sessions_table.c.session_token == auth_session_id
+            auth_sessions_table.c.session_token == token_hash
         )
         await database.execute(delete_query)
+        auth_session_cache.delete(token_hash)
 
     # Clear cookie
     response.delete_cookie(key="auth_session_id", path="/")
@@ -1019,14 +1004,7 @@ async def me(request: Request):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"status": "error", "message": "Chưa đăng nhập"}
         )
-    return UserResponse(
-        id=str(user["id"]),
-        name=user["name"],
-        email=user["email"],
-        phone=user["phone"],
-        role=user["role"],
-        is_approved=user["is_approved"],
-    )
+    return UserResponse.model_validate(dict(user))
 
 # ==================================================================================
 # 6. ADMIN ENDPOINTS - Administrative user management functions
@@ -1049,23 +1027,16 @@ async def get_pending_users(request: Request, admin_user=Depends(require_admin))
 
     users = await database.fetch_all(query)
 
-    return [
-        UserListResponse(
-            id=str(user["id"]),
-            name=user["name"],
-            email=user["email"],
-            phone=user["phone"],
-            role=user["role"],
-            is_approved=user["is_approved"],
-            is_active=user["is_active"],
-            created_at=user["created_at"]
-        )
-        for user in users
-    ]
+    return list_response(USER_LIST_ADAPTER, [dict(user) for user in users])
 
 
 @router.post("/admin/approve-user", response_model=AdminResponse)
-async def approve_user(request: ApproveUserRequest, http_request: Request, admin_user=Depends(require_admin)):
+async def approve_user(
+    request: ApproveUserRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    admin_user=Depends(require_admin)
+):
     """
     Approve User: Grant user access after admin review
     
@@ -1073,15 +1044,12 @@ async def approve_user(request: ApproveUserRequest, http_request: Request, admin
     1. Verify admin privileges
     2. Check user exists and is not already approved
     3. Update user approval status with admin details
-    4. Send approval confirmation email
+    4. Queue approval confirmation email (sent after the response)
     5. Return success response
     """
 
     # Check if user exists
-    user_query = sqlalchemy.select(users_table).where(
-        users_table.c.id == request.user_id
-    )
-    user = await database.fetch_one(user_query)
+    user = await prepared_queries.fetchrow(prepared_queries.USER_BY_ID, request.user_id)
 
     if not user:
         raise HTTPException(
@@ -1104,13 +1072,10 @@ async def approve_user(request: ApproveUserRequest, http_request: Request, admin
         approved_by=admin_user["id"]
     )
     await database.execute(update_query)
+    invalidate_user_cache(user)
 
-    # Send approval email
-    approval_sent = await send_otp_email(
-        user["email"],
-        "",
-        "approval"
-    )
+    # Send approval email in the background so SMTP does not delay the response
+    background_tasks.add_task(send_otp_email, user["email"], "", "approval")
 
     return AdminResponse(
         status="success",
@@ -1133,19 +1098,7 @@ async def get_all_users(request: Request, admin_user=Depends(require_admin)):
     query = sqlalchemy.select(users_table).order_by(users_table.c.created_at.desc())
     users = await database.fetch_all(query)
 
-    return [
-        UserListResponse(
-            id=str(user["id"]),
-            name=user["name"],
-            email=user["email"],
-            phone=user["phone"],
-            role=user["role"],
-            is_approved=user["is_approved"],
-            is_active=user["is_active"],
-            created_at=user["created_at"]
-        )
-        for user in users
-    ]
+    return list_response(USER_LIST_ADAPTER, [dict(user) for user in users])
 
 
 @router.delete("/admin/delete-user/{user_id}", response_model=AdminResponse)
@@ -1163,10 +1116,7 @@ async def delete_user(user_id: str, http_request: Request, admin_user=Depends(re
     """
 
     # Check if user exists
-    user_query = sqlalchemy.select(users_table).where(
-        users_table.c.id == user_id
-    )
-    user = await database.fetch_one(user_query)
+    user = await prepared_queries.fetchrow(prepared_queries.USER_BY_ID, user_id)
 
     if not user:
         raise HTTPException(
@@ -1179,6 +1129,7 @@ async def delete_user(user_id: str, http_request: Request, admin_user=Depends(re
         users_table.c.id == user_id
     )
     await database.execute(delete_query)
+    invalidate_user_cache(user)
 
     return AdminResponse(
         status="success",
@@ -3,26 +3,61 @@ Windfarms API Routes - Quản lý trang trại gió
 Cung cấp các endpoint để tạo, quản lý windfarms trong projects
 """
 
+import asyncio
+import uuid
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import sqlalchemy
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import StreamingResponse
+import orjson
 from pydantic import BaseModel
 
-from app.db.database import database, windfarms_table
+from app.db.database import database, projects_table, turbines_table, windfarms_table
 from app.db.models import (
-    WindfarmCreateRequest, WindfarmUpdateRequest, WindfarmResponse, WindfarmListResponse
+    CreatedByInfo, WindfarmCreateRequest, WindfarmUpdateRequest, WindfarmResponse, WindfarmListResponse
+)
+from app.services.base_service import (
+    ProjectContextService, CREATED_BY_COLUMNS, attach_created_by, created_by_join, list_page_cache
 )
-from app.services.base_service import ProjectContextService
 from app.services.audit_service import AuditLogger
 from app.utilities.permissions import check_project_access
 from app.db.models import EntityType
 from app.api.v1.users_admin.auth_routes import get_current_user, require_user, require_admin
+from app.utilities.responses import model_response
 
 router = APIRouter(prefix="/windfarms", tags=["windfarms"])
 
 # Initialize service
 windfarms_service = ProjectContextService(windfarms_table, EntityType.WINDFARM)
 
+# Response-only fields evaluated inside INSERT/UPDATE ... RETURNING (correlated to the written row)
+WINDFARM_PROJECT_NAME = (
+    sqlalchemy.select(projects_table.c.name)
+    .where(projects_table.c.id == windfarms_table.c.project_id)
+    .correlate(windfarms_table)
+    .scalar_subquery()
+    .label("project_name")
+)
+WINDFARM_TURBINE_COUNT = (
+    sqlalchemy.select(sqlalchemy.func.count())
+    .select_from(turbines_table)
+    .where(turbines_table.c.windfarm_id == windfarms_table.c.id)
+    .correlate(windfarms_table)
+    .scalar_subquery()
+    .label("turbine_count")
+)
+
+
+
+def build_windfarm_response(windfarm: Dict[str, Any]) -> WindfarmResponse:
+    """Build a WindfarmResponse from trusted DB data without re-running validation"""
+    windfarm = {**windfarm, "id": str(windfarm["id"]), "project_id": str(windfarm["project_id"])}
+    created_by = windfarm.get("created_by")
+    if isinstance(created_by, dict):
+        windfarm["created_by"] = CreatedByInfo.model_construct(**created_by)
+    return WindfarmResponse.model_construct(**windfarm)
+
 
 # ===============================
 # WINDFARM CRUD OPERATIONS
@@ -59,26 +94,22 @@ async def create_windfarm(
         # Get client IP
         ip_address = AuditLogger.get_client_ip(request)
         
-        # Create windfarm
+        # Create windfarm (project name comes back from INSERT ... RETURNING)
         new_windfarm = await windfarms_service.create(
             data=create_data,
             actor_id=current_user["id"],
             project_id=project_id,
-            ip_address=ip_address
+            ip_address=ip_address,
+            extra_returning=[WINDFARM_PROJECT_NAME]
         )
         
         # Enhance created_by info
-        enhanced_windfarm = await windfarms_service.enhance_created_by_info(new_windfarm)
-        
-        # Get project name for response
-        project_query = "SELECT name FROM projects WHERE id = :project_id"
-        project = await database.fetch_one(project_query, {"project_id": project_id})
+        enhanced_windfarm = await windfarms_service.enhance_created_by_info(new_windfarm, copy=False)
         
         # Add missing fields for response
-        enhanced_windfarm["project_name"] = project["name"] if project else None
         enhanced_windfarm["turbine_count"] = 0  # New windfarm has no turbines yet
         
-        return WindfarmResponse(**enhanced_windfarm)
+        return WindfarmResponse.model_validate(enhanced_windfarm)
         
     except HTTPException:
         raise
@@ -92,8 +123,8 @@ async def create_windfarm(
 @router.get("/project/{project_id}", response_model=WindfarmListResponse)
 async def list_project_windfarms(
     project_id: str,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     search: Optional[str] = None,
     current_user: dict = Depends(require_user)
 ):
@@ -114,65 +145,85 @@ async def list_project_windfarms(
             current_user["id"], project_id, required_role_level=1
         )
         
-        # Build SQL query with all fields including description and turbine count
-        base_query = """
-        SELECT 
-            w.id,
-            w.name,
-            w.description,
-            w.own_company,
-            w.location,
-            w.project_id,
-            w.created_at,
-            w.updated_at,
-            w.created_by,
-            p.name as project_name,
-            (SELECT COUNT(*) FROM turbines t WHERE t.windfarm_id = w.id) as turbine_count
-        FROM windfarms w
-        INNER JOIN projects p ON w.project_id = p.id
-        WHERE w.project_id = :project_id
-        """
+        # Pages are cached briefly after the access check; writes clear the cache
+        cache_key = ("windfarms", project_id, search, limit, offset)
+        cached_page = list_page_cache.get(cache_key)
+        if cached_page is not None:
+            return model_response(cached_page)
         
-        # Add search filter if provided
+        # Page the windfarms first, then count turbines for that page with one grouped aggregate
+        search_filter = ""
         if search:
-            search_term = f"%{search.lower()}%"
-            base_query += " AND (LOWER(w.name) LIKE :search_term OR LOWER(w.location) LIKE :search_term)"
-        
-        base_query += " ORDER BY w.created_at DESC LIMIT :limit OFFSET :offset"
+            search_filter = " AND (LOWER(w.name) LIKE :search_term OR LOWER(w.location) LIKE :search_term)"
+        
+        base_query = f"""
+        WITH win_page AS (
+            SELECT 
+                w.id,
+                w.name,
+                w.description,
+                w.own_company,
+                w.location,
+                w.project_id,
+                w.created_at,
+                w.updated_at,
+                w.created_by,
+                p.name as project_name,
+                {CREATED_BY_COLUMNS},
+                COUNT(*) OVER () AS total_count
+            FROM windfarms w
+            INNER JOIN projects p ON w.project_id = p.id
+            {created_by_join("w")}
+            WHERE w.project_id = :project_id{search_filter}
+            ORDER BY w.created_at DESC
+            LIMIT :limit OFFSET :offset
+        ),
+        tcnt AS (
+            SELECT windfarm_id, COUNT(*) AS turbine_count
+            FROM turbines
+            WHERE windfarm_id IN (SELECT id FROM win_page)
+            GROUP BY windfarm_id
+        )
+        SELECT wp.*, COALESCE(tcnt.turbine_count, 0) AS turbine_count
+        FROM win_page wp
+        LEFT JOIN tcnt ON tcnt.windfarm_id = wp.id
+        ORDER BY wp.created_at DESC
+        """
         
-        # Execute query
         query_params = {"project_id": project_id, "limit": limit, "offset": offset}
         if search:
             query_params["search_term"] = f"%{search.lower()}%"
-            
-        results = await database.fetch_all(base_query, query_params)
         
-        # Enhance created_by information for each windfarm
-        windfarms = []
-        for row in results:
-            windfarm_dict = dict(row)
-            windfarm_dict = await windfarms_service.enhance_created_by_info(windfarm_dict)
-            windfarms.append(windfarm_dict)
-        
-        # Count total
-        count_query = "SELECT COUNT(*) FROM windfarms w WHERE w.project_id = :project_id"
-        count_params = {"project_id": project_id}
-        
-        if search:
-            count_query += " AND (LOWER(w.name) LIKE :search_term OR LOWER(w.location) LIKE :search_term)"
-            count_params["search_term"] = f"%{search.lower()}%"
-            
-        total = await database.fetch_val(count_query, count_params)
+        # The total rides along on every row (window count taken before LIMIT/OFFSET)
+        results = await database.fetch_all(base_query, query_params)
+        if results:
+            total = results[0]["total_count"]
+        elif offset:
+            # Past the last page there is no row to carry the total
+            count_query = "SELECT COUNT(*) FROM windfarms w WHERE w.project_id = :project_id" + search_filter
+            count_params = {"project_id": project_id}
+            if search:
+                count_params["search_term"] = query_params["search_term"]
+            total = await database.fetch_val(count_query, count_params)
+        else:
+            total = 0
+        
+        # Creator info comes from the joined user columns
+        windfarms = [attach_created_by(dict(row)) for row in results]
+        for wf in windfarms:
+            del wf["total_count"]
         
         # Create response objects
-        windfarm_responses = [WindfarmResponse(**wf) for wf in windfarms]
+        windfarm_responses = [build_windfarm_response(wf) for wf in windfarms]
         
-        return WindfarmListResponse(
+        page = WindfarmListResponse(
             windfarms=windfarm_responses,
             total=total,
             limit=limit,
             offset=offset
         )
+        list_page_cache.set(cache_key, page)
+        return model_response(page)
         
     except HTTPException:
         raise
@@ -191,52 +242,81 @@ async def list_all_windfarms(
 ):
     """
     Admin-only: List all windfarms with project name and turbine count.
+    
+    Rows are streamed from a server-side cursor and written out as they arrive,
+    so memory use does not grow with the page size.
     """
     try:
-        query = """
-        SELECT 
-          w.id, 
-          w.name, 
-          w.description, 
-          w.own_company, 
-          w.location, 
-          w.project_id,
-          w.created_at, 
-          w.updated_at,
-          w.created_by,
-          p.name AS project_name,
-          (
-            SELECT COUNT(*) FROM turbines t
-            WHERE t.windfarm_id = w.id
-          ) AS turbine_count
-        FROM windfarms w
-        INNER JOIN projects p ON w.project_id = p.id
-        ORDER BY w.created_at DESC
-        LIMIT :limit OFFSET :offset
-        """
-        results = await database.fetch_all(query, {"limit": limit, "offset": offset})
-        
-        # Enhance created_by information for each windfarm
-        windfarms = []
-        for row in results:
-            windfarm_dict = dict(row)
-            windfarm_dict = await windfarms_service.enhance_created_by_info(windfarm_dict)
-            windfarms.append(windfarm_dict)
-
-        total = await database.fetch_val("SELECT COUNT(*) FROM windfarms")
-
-        return WindfarmListResponse(
-            windfarms=[WindfarmResponse(**wf) for wf in windfarms],
-            total=total or 0,
-            limit=limit,
-            offset=offset
+        query = f"""
+        WITH win_page AS (
+          SELECT 
+            w.id, 
+            w.name, 
+            w.description, 
+            w.own_company, 
+            w.location, 
+            w.project_id,
+            w.created_at, 
+            w.updated_at,
+            w.created_by,
+            p.name AS project_name,
+            {CREATED_BY_COLUMNS},
+            COUNT(*) OVER () AS total_count
+          FROM windfarms w
+          INNER JOIN projects p ON w.project_id = p.id
+          {created_by_join("w")}
+          ORDER BY w.created_at DESC
+          LIMIT :limit OFFSET :offset
+        ),
+        tcnt AS (
+          SELECT windfarm_id, COUNT(*) AS turbine_count
+          FROM turbines
+          WHERE windfarm_id IN (SELECT id FROM win_page)
+          GROUP BY windfarm_id
         )
+        SELECT wp.*, COALESCE(tcnt.turbine_count, 0) AS turbine_count
+        FROM win_page wp
+        LEFT JOIN tcnt ON tcnt.windfarm_id = wp.id
+        ORDER BY wp.created_at DESC
+        """
+        values = {"limit": limit, "offset": offset}
+        rows = database.iterate(query, values)
+        # Open the cursor and read its first row before any bytes are sent, so query
+        # errors still become a 500 instead of a truncated 200 body. The total rides
+        # along on every row (window count taken before LIMIT/OFFSET)
+        first_row = await anext(rows, None)
+        if first_row is not None:
+            total = first_row["total_count"]
+        elif offset:
+            # Past the last page there is no row to carry the total
+            total = await database.fetch_val("SELECT COUNT(*) FROM windfarms")
+        else:
+            total = 0
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch all windfarms: {str(e)}"
         )
 
+    def encode(row) -> bytes:
+        windfarm = attach_created_by(dict(row))
+        del windfarm["total_count"]
+        return orjson.dumps(build_windfarm_response(windfarm).model_dump())
+
+    async def stream_windfarms():
+        try:
+            header = orjson.dumps({"total": total or 0, "limit": limit, "offset": offset})
+            yield header[:-1] + b',"windfarms":['
+            if first_row is not None:
+                yield encode(first_row)
+                async for row in rows:
+                    yield b",\n" + encode(row)
+            yield b"]}"
+        finally:
+            await rows.aclose()
+
+    return StreamingResponse(stream_windfarms(), media_type="application/json")
+
 
 @router.put("/{windfarm_id}", response_model=WindfarmResponse)
 async def update_windfarm(
@@ -268,34 +348,22 @@ async def update_windfarm(
         # Get client IP
         ip_address = AuditLogger.get_client_ip(request)
         
-        # Update windfarm
+        # Update windfarm; project name and turbine count come back from UPDATE ... RETURNING
         update_data = windfarm_data.dict(exclude_unset=True)
         updated_windfarm = await windfarms_service.update(
             entity_id=windfarm_id,
             update_data=update_data,
             actor_id=current_user["id"],
             project_id=windfarm["project_id"],
-            ip_address=ip_address
+            ip_address=ip_address,
+            current_data=windfarm,
+            extra_returning=[WINDFARM_PROJECT_NAME, WINDFARM_TURBINE_COUNT]
         )
         
-        # Get project name and turbine count for response
-        project_query = "SELECT name FROM projects WHERE id = :project_id"
-        project = await database.fetch_one(project_query, {"project_id": windfarm["project_id"]})
-        
-        turbine_count_query = """
-        SELECT COUNT(*) FROM turbines 
-        WHERE windfarm_id = :windfarm_id
-        """
-        turbine_count = await database.fetch_val(turbine_count_query, {"windfarm_id": windfarm_id})
-        
         # Enhance created_by information
-        updated_windfarm = await windfarms_service.enhance_created_by_info(updated_windfarm)
+        updated_windfarm = await windfarms_service.enhance_created_by_info(updated_windfarm, copy=False)
         
-        # Add missing fields for response
-        updated_windfarm["project_name"] = project["name"] if project else None
-        updated_windfarm["turbine_count"] = turbine_count or 0
-        
-        return WindfarmResponse(**updated_windfarm)
+        return WindfarmResponse.model_validate(updated_windfarm)
         
     except HTTPException:
         raise
@@ -332,16 +400,20 @@ async def delete_windfarm(
             current_user["id"], windfarm["project_id"], required_role_level=2
         )
         
-        # Check if windfarm has turbines
-        turbine_count_query = """
-        SELECT COUNT(*) FROM turbines 
-        WHERE windfarm_id = :windfarm_id
+        # Check if windfarm has turbines (EXISTS stops at the first match)
+        has_turbines_query = """
+        SELECT EXISTS(SELECT 1 FROM turbines WHERE windfarm_id = :windfarm_id)
         """
-        turbine_count = await database.fetch_val(
-            turbine_count_query, {"windfarm_id": windfarm_id}
+        has_turbines = await database.fetch_val(
+            has_turbines_query, {"windfarm_id": windfarm_id}
         )
         
-        if turbine_count > 0:
+        if has_turbines:
+            # Count only when the delete is rejected, for the error message
+            turbine_count = await database.fetch_val(
+                "SELECT COUNT(*) FROM turbines WHERE windfarm_id = :windfarm_id",
+                {"windfarm_id": windfarm_id}
+            )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Cannot delete windfarm with {turbine_count} active turbines. Please delete turbines first."
@@ -395,52 +467,87 @@ async def bulk_delete_windfarms(
                 detail="At least one windfarm ID is required"
             )
         
-        # Get all windfarms and verify access
-        deleted_count = 0
         errors = []
         
-        for windfarm_id in windfarm_ids:
+        # Ignore malformed IDs up front so the batched queries cannot fail on a cast
+        valid_ids = []
+        for windfarm_id in dict.fromkeys(windfarm_ids):
             try:
-                # Get windfarm
-                windfarm = await windfarms_service.get_by_id(windfarm_id)
-                if not windfarm:
-                    errors.append(f"Windfarm {windfarm_id} not found")
-                    continue
-                
-                # Check project access
-                await check_project_access(
-                    current_user["id"], windfarm["project_id"], required_role_level=2
-                )
-                
-                # Check for turbines
-                turbine_count_query = """
-                SELECT COUNT(*) FROM turbines 
-                WHERE windfarm_id = :windfarm_id
-                """
-                turbine_count = await database.fetch_val(
-                    turbine_count_query, {"windfarm_id": windfarm_id}
-                )
-                
-                if turbine_count > 0:
-                    errors.append(f"Windfarm {windfarm_id} has {turbine_count} active turbines")
-                    continue
-                
-                # Delete windfarm
-                ip_address = AuditLogger.get_client_ip(request)
-                await windfarms_service.delete(
-                    entity_id=windfarm_id,
+                valid_ids.append(str(uuid.UUID(windfarm_id)))
+            except ValueError:
+                errors.append(f"Windfarm {windfarm_id} not found")
+        
+        # Fetch all windfarms and their turbine counts in two queries
+        windfarms_query = sqlalchemy.select(windfarms_table).where(windfarms_table.c.id.in_(valid_ids))
+        turbine_counts_query = sqlalchemy.select(
+            turbines_table.c.windfarm_id, sqlalchemy.func.count().label("turbine_count")
+        ).where(turbines_table.c.windfarm_id.in_(valid_ids)).group_by(turbines_table.c.windfarm_id)
+        
+        windfarm_rows, turbine_count_rows = await asyncio.gather(
+            database.fetch_all(windfarms_query),
+            database.fetch_all(turbine_counts_query)
+        ) if valid_ids else ([], [])
+        
+        windfarms = {str(row["id"]): dict(row) for row in windfarm_rows}
+        turbine_counts = {str(row["windfarm_id"]): row["turbine_count"] for row in turbine_count_rows}
+        
+        # Check project access once per distinct project
+        project_ids = list({str(wf["project_id"]) for wf in windfarms.values()})
+        access_results = await asyncio.gather(
+            *[check_project_access(current_user["id"], pid, required_role_level=2) for pid in project_ids],
+            return_exceptions=True
+        )
+        access_errors = {
+            pid: result for pid, result in zip(project_ids, access_results)
+            if isinstance(result, Exception)
+        }
+        
+        # Decide which windfarms can be deleted
+        deletable = []
+        for windfarm_id in valid_ids:
+            windfarm = windfarms.get(windfarm_id)
+            if not windfarm:
+                errors.append(f"Windfarm {windfarm_id} not found")
+                continue
+            
+            access_error = access_errors.get(str(windfarm["project_id"]))
+            if access_error is not None:
+                detail = access_error.detail if isinstance(access_error, HTTPException) else str(access_error)
+                errors.append(f"Windfarm {windfarm_id}: {detail}")
+                continue
+            
+            turbine_count = turbine_counts.get(windfarm_id, 0)
+            if turbine_count > 0:
+                errors.append(f"Windfarm {windfarm_id} has {turbine_count} active turbines")
+                continue
+            
+            deletable.append(windfarm)
+        
+        # Delete eligible windfarms concurrently
+        ip_address = AuditLogger.get_client_ip(request)
+        delete_results = await asyncio.gather(
+            *[
+                windfarms_service.delete(
+                    entity_id=str(windfarm["id"]),
                     actor_id=current_user["id"],
                     project_id=windfarm["project_id"],
                     ip_address=ip_address,
-                    soft_delete=True
+                    soft_delete=True,
+                    current_data=windfarm
                 )
-                
+                for windfarm in deletable
+            ],
+            return_exceptions=True
+        )
+        
+        deleted_count = 0
+        for windfarm, result in zip(deletable, delete_results):
+            if isinstance(result, HTTPException):
+                errors.append(f"Windfarm {windfarm['id']}: {result.detail}")
+            elif isinstance(result, Exception):
+                errors.append(f"Windfarm {windfarm['id']}: {str(result)}")
+            else:
                 deleted_count += 1
-                
-            except HTTPException as he:
-                errors.append(f"Windfarm {windfarm_id}: {he.detail}")
-            except Exception as e:
-                errors.append(f"Windfarm {windfarm_id}: {str(e)}")
         
         return {
             "deleted_count": deleted_count,
@@ -1,8 +1,16 @@
 from decouple import config
+from functools import lru_cache
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Database
 DATABASE_URL = config("DATABASE_URL")
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", default=5, cast=int)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", default=30, cast=int)
+DB_STATEMENT_CACHE_SIZE = config("DB_STATEMENT_CACHE_SIZE", default=1024, cast=int)
+DB_COMMAND_TIMEOUT = config("DB_COMMAND_TIMEOUT", default=30, cast=float)
  
 
 # JWT
@@ -22,16 +30,20 @@ ADMIN_EMAIL = config("ADMIN_EMAIL", default="admin@example.com")
 OTP_EXPIRE_MINUTES = config("OTP_EXPIRE_MINUTES", default=5, cast=int)
 SESSION_EXPIRE_MINUTES = config("SESSION_EXPIRE_MINUTES", default=5, cast=int)
 AUTH_SESSION_EXPIRE_MINUTES = config("AUTH_SESSION_EXPIRE_MINUTES", default=1440, cast=int)
+PASSWORD_RESET_EXPIRE_MINUTES = config("PASSWORD_RESET_EXPIRE_MINUTES", default=10, cast=int)
 
 # Environment
 ENVIRONMENT = config("ENVIRONMENT", default="development")
+# Level of the "app" logger; DEBUG enables per-send SMTP diagnostics
+LOG_LEVEL = config("LOG_LEVEL", default="INFO").upper()
 
-FRONTEND_ORIGINS = [
+# frozenset: CORSMiddleware checks `origin in allow_origins` on every request
+FRONTEND_ORIGINS = frozenset(
     o.strip() for o in config(
         "FRONTEND_ORIGINS",
         default="http://localhost:3000,http://localhost:5173,http://127.0.0.1:5173"
     ).split(",") if o.strip()
-]
+)
 # Thay 192.168.1.X bằng IP thật của máy chủ và máy client
 
 # ==================================================================================
@@ -47,13 +59,17 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 STORAGE_ROOT = Path(config("STORAGE_ROOT", default=str(PROJECT_ROOT / "storage" / "inspections")))
 TEMP_UPLOAD_DIR = Path(config("TEMP_UPLOAD_DIR", default=str(PROJECT_ROOT / "storage" / "temp")))
 AI_MODEL_PATH = Path(config("AI_MODEL_PATH", default=str(PROJECT_ROOT / "models" / "blade_damage_detector.pt")))
+# String forms, computed once, for plain string joins and os/open calls
+STORAGE_ROOT_STR = os.fspath(STORAGE_ROOT)
+TEMP_UPLOAD_DIR_STR = os.fspath(TEMP_UPLOAD_DIR)
+AI_MODEL_PATH_STR = os.fspath(AI_MODEL_PATH)
 
 # Upload limits
 MAX_UPLOAD_SIZE = config("MAX_UPLOAD_SIZE", default=1024 * 1024 * 1024, cast=int)  # 1GB
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tiff", ".bmp"}
 
-# Note: Don't create directories on import - will be created on demand when needed
-# This prevents permission errors during startup
+# Note: this module creates no directories itself. app.main calls ensure_storage_directories()
+# once at import; a PermissionError there is logged, not raised, so startup still succeeds
 
 
 def get_inspection_storage_path(project_id: str, windfarm_id: str, turbine_id: str, inspection_id: str) -> dict:
@@ -61,29 +77,49 @@ def get_inspection_storage_path(project_id: str, windfarm_id: str, turbine_id: s
     Generate storage paths for inspection
     Creates directories on demand
     """
-    base_path = STORAGE_ROOT / "projects" / project_id / "windfarms" / windfarm_id / "turbines" / turbine_id / "inspections" / inspection_id
+    sep = os.sep
+    base_path = (
+        f"{STORAGE_ROOT_STR}{sep}projects{sep}{project_id}{sep}windfarms{sep}{windfarm_id}"
+        f"{sep}turbines{sep}{turbine_id}{sep}inspections{sep}{inspection_id}"
+    )
     
     paths = {
-        "base_path": str(base_path),
-        "raw_images_path": str(base_path / "raw"),
-        "processed_images_path": str(base_path / "processed"),
-        "results_path": str(base_path / "results")
+        "base_path": base_path,
+        "raw_images_path": base_path + sep + "raw",
+        "processed_images_path": base_path + sep + "processed",
+        "results_path": base_path + sep + "results"
     }
     
     return paths
 
 
+def ensure_dir(path) -> None:
+    """
+    Create a directory, trying a single mkdir before walking the parents
+    Falls back to os.makedirs only when a parent is missing
+    """
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+
+
+@lru_cache(maxsize=1)
 def ensure_storage_directories():
     """
     Create storage directories if they don't exist
-    Call this during application startup or before first use
+    Runs once per process (cached); later calls are free
     """
     try:
         STORAGE_ROOT.mkdir(parents=True, exist_ok=True)
         TEMP_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        print(f"✓ Storage directories created: {STORAGE_ROOT}")
+        logger.info("Storage directories created: %s", STORAGE_ROOT)
     except PermissionError as e:
-        print(f"⚠ Warning: Could not create storage directories: {e}")
-        print(f"  Please create manually or run with appropriate permissions")
+        logger.warning(
+            "Could not create storage directories: %s. "
+            "Please create manually or run with appropriate permissions", e
+        )
     except Exception as e:
-        print(f"✗ Error creating storage directories: {e}")
+        logger.error("Error creating storage directories: %s", e)
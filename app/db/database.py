@@ -1,40 +1,108 @@
 import databases
+import orjson
 import sqlalchemy
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
 
-from app.core.config import DATABASE_URL
+from app.core.config import (DATABASE_URL, DB_COMMAND_TIMEOUT, DB_POOL_MAX_SIZE,
+                             DB_POOL_MIN_SIZE, DB_STATEMENT_CACHE_SIZE)
 
-# Database connection
-database = databases.Database(DATABASE_URL)
+# Database connection (options are passed through to asyncpg.create_pool)
+# Idle connections are recycled after 5 minutes so the pool doesn't hand out ones the
+# server or a proxy already dropped; command_timeout bounds a hung query instead of a request
+database = databases.Database(
+    DATABASE_URL,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+    max_inactive_connection_lifetime=300,
+    command_timeout=DB_COMMAND_TIMEOUT
+)
+
+# orjson equivalent of json.dumps(data, default=str): same datetime text, non-str keys allowed
+JSON_SERIALIZE_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def json_serializer(value) -> str:
+    return orjson.dumps(value, default=str, option=JSON_SERIALIZE_OPTIONS).decode()
+
+
+# JSON/JSONB binds and results go through orjson: databases compiles queries with its own
+# dialect, so the serializers are set there rather than on an engine
+database._backend._dialect._json_serializer = json_serializer
+database._backend._dialect._json_deserializer = orjson.loads
 
 # SQLAlchemy metadata
 metadata = sqlalchemy.MetaData()
 
+# Shared column type instances (type objects are stateless and reusable across columns)
+PG_UUID = postgresql.UUID(as_uuid=True)
+PG_JSONB = postgresql.JSONB()
+PG_INET = postgresql.INET()
+
+# Native enum types; created by create_tables / database_schema.sql before the tables
+user_role_enum = postgresql.ENUM("user", "admin", "superadmin", name="user_role", create_type=False)
+inspection_status_enum = postgresql.ENUM(
+    "uploaded", "processing", "completed", "failed", name="inspection_status", create_type=False
+)
+image_status_enum = postgresql.ENUM(
+    "uploaded", "processing", "analyzed", "reviewed", "failed", name="image_status", create_type=False
+)
+image_checked_flag_enum = postgresql.ENUM(
+    "Unchecked", "Checked", "Processed", name="image_checked_flag", create_type=False
+)
+ENUM_TYPES = (user_role_enum, inspection_status_enum, image_status_enum, image_checked_flag_enum)
+
+# Time-ordered UUIDv7 generator for high-churn tables (sequential B-tree inserts)
+UUIDV7_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION uuidv7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(gen_random_uuid())
+                    placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
+"""
+
 # Define tables
 users_table = sqlalchemy.Table(
     "users",
     metadata,
-    sqlalchemy.Column("id", sqlalchemy.dialects.postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
+    # Surrogate 8-byte key used by the session tables; UUID id stays the external identifier
+    sqlalchemy.Column("internal_id", sqlalchemy.BigInteger, sqlalchemy.Identity(always=True),
+                      unique=True, nullable=False),
     sqlalchemy.Column("name", sqlalchemy.String(100), nullable=False),
     sqlalchemy.Column("email", sqlalchemy.String(255), unique=True, nullable=False),
     sqlalchemy.Column("phone", sqlalchemy.String(20), unique=True, nullable=False),
-    sqlalchemy.Column("password_hash", sqlalchemy.Text, nullable=False),
-    sqlalchemy.Column("role", sqlalchemy.String(50), default="user"),
+    sqlalchemy.Column("role", user_role_enum, default="user"),
     sqlalchemy.Column("is_active", sqlalchemy.Boolean, default=True),
     sqlalchemy.Column("is_approved", sqlalchemy.Boolean, default=False),
     sqlalchemy.Column("approved_at", sqlalchemy.DateTime, nullable=True),
-    sqlalchemy.Column("approved_by", sqlalchemy.dialects.postgresql.UUID(as_uuid=True), nullable=True),
+    sqlalchemy.Column("approved_by", PG_UUID, nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.text("CURRENT_TIMESTAMP"))
 )
 
+# Password hashes split out of users (1:1) so user lists and lookups read narrower rows
+user_credentials_table = sqlalchemy.Table(
+    "user_credentials",
+    metadata,
+    sqlalchemy.Column("user_id", PG_UUID,
+                      sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("password_hash", sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column("updated_at", sqlalchemy.DateTime, server_default=sqlalchemy.text("CURRENT_TIMESTAMP"))
+)
+
 temp_registrations_table = sqlalchemy.Table(
     "temp_registrations",
     metadata,
-    sqlalchemy.Column("id", sqlalchemy.dialects.postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
     sqlalchemy.Column("name", sqlalchemy.String(100), nullable=False),
-    sqlalchemy.Column("email", sqlalchemy.String(255), nullable=False),
+    sqlalchemy.Column("email", sqlalchemy.String(255), unique=True, nullable=False),
     sqlalchemy.Column("phone", sqlalchemy.String(20), nullable=False),
     sqlalchemy.Column("password_hash", sqlalchemy.Text, nullable=False),
     sqlalchemy.Column("otp_code", sqlalchemy.String(6), nullable=False),
@@ -45,10 +113,10 @@ temp_registrations_table = sqlalchemy.Table(
 temp_sessions_table = sqlalchemy.Table(
     "temp_sessions",
     metadata,
-    sqlalchemy.Column("id", sqlalchemy.dialects.postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
-    sqlalchemy.Column("user_id", sqlalchemy.dialects.postgresql.UUID(as_uuid=True),
-                      sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Column("user_id", sqlalchemy.BigInteger,
+                      sqlalchemy.ForeignKey("users.internal_id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("otp_code", sqlalchemy.String(6), nullable=False),
     sqlalchemy.Column("otp_expires_at", sqlalchemy.DateTime, nullable=False),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.text("CURRENT_TIMESTAMP"))
@@ -57,44 +125,16 @@ temp_sessions_table = sqlalchemy.Table(
 auth_sessions_table = sqlalchemy.Table(
     "auth_sessions",
     metadata,
-    sqlalchemy.Column("id", sqlalchemy.dialects.postgresql.UUID(as_uuid=True),
-                      primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
-    sqlalchemy.Column("user_id", sqlalchemy.dialects.postgresql.UUID(as_uuid=True),
-                      sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Column("id", PG_UUID,
+                      primary_key=True, server_default=sqlalchemy.text("uuidv7()")),
+    sqlalchemy.Column("user_id", sqlalchemy.BigInteger,
+                      sqlalchemy.ForeignKey("users.internal_id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("session_token", sqlalchemy.Text, unique=True, nullable=False),
     sqlalchemy.Column("expires_at", sqlalchemy.DateTime, nullable=False),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.text("CURRENT_TIMESTAMP"))
 )
 
 
-password_resets_table = sqlalchemy.Table(
-    "password_resets",
-    metadata,
-    sqlalchemy.Column(
-        "id",
-        postgresql.UUID(as_uuid=True),
-        primary_key=True,
-        server_default=sqlalchemy.text("gen_random_uuid()")
-    ),
-    sqlalchemy.Column(
-        "user_id",
-        postgresql.UUID(as_uuid=True),
-        sqlalchemy.ForeignKey("users.id", ondelete="SET NULL"),
-        nullable=True,
-        index=True  # thêm index để join nhanh với bảng users
-    ),
-    sqlalchemy.Column("email", sqlalchemy.String(255), nullable=False, index=True),
-    sqlalchemy.Column("otp_code", sqlalchemy.String(6), nullable=False),
-    sqlalchemy.Column("otp_expires_at", sqlalchemy.DateTime, nullable=False),
-    sqlalchemy.Column("is_verified", sqlalchemy.Boolean, server_default=sqlalchemy.text("FALSE")),
-    sqlalchemy.Column("used", sqlalchemy.Boolean, server_default=sqlalchemy.text("FALSE")),
-    sqlalchemy.Column("created_at", sqlalchemy.DateTime, server_default=sqlalchemy.text("CURRENT_TIMESTAMP"))
-)
-
-# Create engine for table creation
-engine = sqlalchemy.create_engine(DATABASE_URL)
-
-
 async def connect_db():
     """Connect to database"""
     await database.connect()
@@ -112,13 +152,13 @@ async def disconnect_db():
 projects_table = sqlalchemy.Table(
     "projects",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
     sqlalchemy.Column("name", sqlalchemy.String(255), nullable=False),
     sqlalchemy.Column("description", sqlalchemy.Text, nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
     sqlalchemy.Column("updated_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
-    sqlalchemy.Column("created_by", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("created_by", PG_UUID,
                       sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
 )
@@ -126,76 +166,105 @@ projects_table = sqlalchemy.Table(
 project_members_table = sqlalchemy.Table(
     "project_members",
     metadata,
-    sqlalchemy.Column("project_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("project_id", PG_UUID,
                       sqlalchemy.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
-    sqlalchemy.Column("user_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("user_id", PG_UUID,
                       sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("role", sqlalchemy.String(20), nullable=False, server_default=sqlalchemy.text("'editor'"),
                       doc="Role: owner, editor, viewer"),
     sqlalchemy.Column("can_invite", sqlalchemy.Boolean, server_default=sqlalchemy.text("FALSE")),
     sqlalchemy.Column("joined_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
-    sqlalchemy.PrimaryKeyConstraint("project_id", "user_id")
+    sqlalchemy.PrimaryKeyConstraint("project_id", "user_id"),
+    # Index-only membership lookups by (user_id, project_id)
+    sqlalchemy.Index("idx_project_members_user_project", "user_id", "project_id",
+                     unique=True, postgresql_include=["role", "can_invite"])
 )
 
 windfarms_table = sqlalchemy.Table(
     "windfarms",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
     sqlalchemy.Column("name", sqlalchemy.String(255), nullable=False),
     sqlalchemy.Column("description", sqlalchemy.Text, nullable=True),
     sqlalchemy.Column("own_company", sqlalchemy.String(255), nullable=True),
     sqlalchemy.Column("location", sqlalchemy.String(500), nullable=True),
-    sqlalchemy.Column("project_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("project_id", PG_UUID,
                       sqlalchemy.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
     sqlalchemy.Column("updated_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
-    sqlalchemy.Column("created_by", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("created_by", PG_UUID,
                       sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 )
 
+# "lat,lng" with at most 3 integer digits per part, so both parts fit DECIMAL(9, 6)
+COORDINATES_PATTERN = r"^\s*-?[0-9]{1,3}(\.[0-9]+)?\s*,\s*-?[0-9]{1,3}(\.[0-9]+)?\s*$"
+
+
+def turbine_coordinate_expr(part: int) -> str:
+    """Generated-column expression for the latitude (1) or longitude (2) part of coordinates"""
+    return (
+        f"CASE WHEN coordinates ~ '{COORDINATES_PATTERN}' "
+        f"THEN trim(split_part(coordinates, ',', {part}))::numeric(9, 6) END"
+    )
+
+
 turbines_table = sqlalchemy.Table(
     "turbines",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
     sqlalchemy.Column("name", sqlalchemy.String(255), nullable=False),
     sqlalchemy.Column("description", sqlalchemy.Text, nullable=True),
-    sqlalchemy.Column("windfarm_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("windfarm_id", PG_UUID,
                       sqlalchemy.ForeignKey("windfarms.id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("capacity_mw", sqlalchemy.DECIMAL(10, 3), nullable=True),
     sqlalchemy.Column("coordinates", sqlalchemy.String(50), nullable=True),  # Store as "lat,lng" format
     sqlalchemy.Column("serial_no", sqlalchemy.String(100), nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
     sqlalchemy.Column("updated_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
-    sqlalchemy.Column("created_by", postgresql.UUID(as_uuid=True),
-                      sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sqlalchemy.Column("created_by", PG_UUID,
+                      sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    # Parsed once by Postgres when coordinates is written, so geo queries never split strings
+    sqlalchemy.Column("latitude", sqlalchemy.DECIMAL(9, 6),
+                      sqlalchemy.Computed(turbine_coordinate_expr(1), persisted=True)),
+    sqlalchemy.Column("longitude", sqlalchemy.DECIMAL(9, 6),
+                      sqlalchemy.Computed(turbine_coordinate_expr(2), persisted=True)),
+    sqlalchemy.CheckConstraint(
+        f"coordinates IS NULL OR coordinates ~ '{COORDINATES_PATTERN}'",
+        name="turbines_coordinates_format"
+    ),
+    sqlalchemy.Index("idx_turbines_geo", "latitude", "longitude")
 )
 
 audit_logs_table = sqlalchemy.Table(
     "audit_logs",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
-                      primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
-    sqlalchemy.Column("project_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
+                      primary_key=True, server_default=sqlalchemy.text("uuidv7()")),
+    sqlalchemy.Column("project_id", PG_UUID,
                       sqlalchemy.ForeignKey("projects.id", ondelete="SET NULL"), nullable=True),
-    sqlalchemy.Column("actor_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("actor_id", PG_UUID,
                       sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("action", sqlalchemy.String(50), nullable=False,
                       doc="Action: CREATE, UPDATE, DELETE, STATUS_CHANGE, MEMBER_ADDED, MEMBER_REMOVED"),
     sqlalchemy.Column("entity_type", sqlalchemy.String(30), nullable=False,
                       doc="Entity: PROJECT, WINDFARM, TURBINE, PROJECT_MEMBER"),
-    sqlalchemy.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+    sqlalchemy.Column("entity_id", PG_UUID, nullable=False),
     sqlalchemy.Column("entity_name", sqlalchemy.String(255), nullable=True),
     sqlalchemy.Column("description", sqlalchemy.Text, nullable=True),
-    sqlalchemy.Column("before_data", postgresql.JSONB, nullable=True),
-    sqlalchemy.Column("after_data", postgresql.JSONB, nullable=True),
-    sqlalchemy.Column("changes", postgresql.JSONB, nullable=True),
-    sqlalchemy.Column("metadata", postgresql.JSONB, nullable=True),
-    sqlalchemy.Column("timestamp", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
+    sqlalchemy.Column("before_data", PG_JSONB, nullable=True),
+    sqlalchemy.Column("after_data", PG_JSONB, nullable=True),
+    sqlalchemy.Column("changes", PG_JSONB, nullable=True),
+    sqlalchemy.Column("metadata", PG_JSONB, nullable=True),
+    # Partition key, so it is part of the primary key
+    sqlalchemy.Column("timestamp", sqlalchemy.DateTime(timezone=True), primary_key=True,
+                      server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
     sqlalchemy.Column("expires_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP + INTERVAL '30 days'")),
-    sqlalchemy.Column("ip_address", postgresql.INET, nullable=True),
-    sqlalchemy.Column("user_agent", sqlalchemy.Text, nullable=True)
+    sqlalchemy.Column("ip_address", PG_INET, nullable=True),
+    sqlalchemy.Column("user_agent", sqlalchemy.Text, nullable=True),
+    # Monthly partitions (audit_logs_YYYY_MM) are created and dropped by AuditLogger.maintain_partitions
+    postgresql_partition_by="RANGE (timestamp)"
 )
 
 
@@ -206,12 +275,12 @@ audit_logs_table = sqlalchemy.Table(
 inspections_table = sqlalchemy.Table(
     "inspections",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
                       primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
-    sqlalchemy.Column("turbine_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("turbine_id", PG_UUID,
                       sqlalchemy.ForeignKey("turbines.id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("inspection_code", sqlalchemy.String(100), unique=True, nullable=False),
-    sqlalchemy.Column("status", sqlalchemy.String(50), server_default=sqlalchemy.text("'uploaded'")),
+    sqlalchemy.Column("status", inspection_status_enum, server_default=sqlalchemy.text("'uploaded'")),
     sqlalchemy.Column("captured_at", sqlalchemy.DateTime(timezone=True), nullable=True),
     sqlalchemy.Column("operator", sqlalchemy.String(255), nullable=True),
     sqlalchemy.Column("equipment", sqlalchemy.String(255), nullable=True),
@@ -220,17 +289,17 @@ inspections_table = sqlalchemy.Table(
     sqlalchemy.Column("processed_images", sqlalchemy.Integer, server_default=sqlalchemy.text("0")),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
     sqlalchemy.Column("updated_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP")),
-    sqlalchemy.Column("created_by", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("created_by", PG_UUID,
                       sqlalchemy.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
-    sqlalchemy.Column("metadata", postgresql.JSONB, nullable=True)
+    sqlalchemy.Column("metadata", PG_JSONB, nullable=True)
 )
 
 inspection_images_table = sqlalchemy.Table(
     "inspection_images",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
-                      primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
-    sqlalchemy.Column("inspection_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
+                      primary_key=True, server_default=sqlalchemy.text("uuidv7()")),
+    sqlalchemy.Column("inspection_id", PG_UUID,
                       sqlalchemy.ForeignKey("inspections.id", ondelete="CASCADE"), nullable=False),
     sqlalchemy.Column("blade", sqlalchemy.String(10), nullable=False),
     sqlalchemy.Column("surface", sqlalchemy.String(10), nullable=False),
@@ -240,10 +309,10 @@ inspection_images_table = sqlalchemy.Table(
     sqlalchemy.Column("file_path", sqlalchemy.Text, nullable=False),
     sqlalchemy.Column("file_size", sqlalchemy.BigInteger, nullable=True),
     sqlalchemy.Column("captured_at", sqlalchemy.DateTime(timezone=True), nullable=True),
-    sqlalchemy.Column("status", sqlalchemy.String(50), server_default=sqlalchemy.text("'uploaded'")),
-    sqlalchemy.Column("checked_flag", sqlalchemy.String(20), server_default=sqlalchemy.text("'Unchecked'")),
-    sqlalchemy.Column("metadata", postgresql.JSONB, nullable=True),
-    sqlalchemy.Column("viewed_by", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("status", image_status_enum, server_default=sqlalchemy.text("'uploaded'")),
+    sqlalchemy.Column("checked_flag", image_checked_flag_enum, server_default=sqlalchemy.text("'Unchecked'")),
+    sqlalchemy.Column("metadata", PG_JSONB, nullable=True),
+    sqlalchemy.Column("viewed_by", PG_UUID,
                       sqlalchemy.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
     sqlalchemy.Column("viewed_at", sqlalchemy.DateTime(timezone=True), nullable=True),
     sqlalchemy.Column("created_at", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.text("CURRENT_TIMESTAMP"))
@@ -252,13 +321,15 @@ inspection_images_table = sqlalchemy.Table(
 damage_assessments_table = sqlalchemy.Table(
     "damage_assessments",
     metadata,
-    sqlalchemy.Column("id", postgresql.UUID(as_uuid=True),
-                      primary_key=True, server_default=sqlalchemy.text("gen_random_uuid()")),
-    sqlalchemy.Column("inspection_image_id", postgresql.UUID(as_uuid=True),
+    sqlalchemy.Column("id", PG_UUID,
+                      primary_key=True, server_default=sqlalchemy.text("uuidv7()")),
+    sqlalchemy.Column("inspection_image_id", PG_UUID,
                       sqlalchemy.ForeignKey("inspection_images.id", ondelete="CASCADE"), nullable=False),
     
     # ✅ AI Analysis (Pure Detection Results - bounding boxes contain all detection info)
-    sqlalchemy.Column("ai_bounding_boxes", postgresql.JSONB, nullable=True),
+    sqlalchemy.Column("ai_bounding_boxes", PG_JSONB, nullable=True),
+    # Same boxes packed by app.utilities.bbox_codec (float32 x/y/w/h/conf + label ids) for the AI pipeline
+    sqlalchemy.Column("ai_bounding_boxes_bin", postgresql.BYTEA, nullable=True),
     sqlalchemy.Column("ai_processed_at", sqlalchemy.DateTime(timezone=True), nullable=True),
     
     # ✅ User Notes (Optional manual input)
@@ -270,6 +341,21 @@ damage_assessments_table = sqlalchemy.Table(
 )
 
 
-def create_tables():
-    """Create all tables"""
-    metadata.create_all(engine)
+async def create_tables():
+    """
+    Create all tables (and their indexes) that do not exist yet
+    DDL is compiled for PostgreSQL and run over the async pool, so no sync driver or engine is needed
+    """
+    dialect = postgresql.dialect()
+    async with database.transaction():
+        await database.execute(UUIDV7_FUNCTION_SQL)
+        for enum_type in ENUM_TYPES:
+            labels = ", ".join(f"'{label}'" for label in enum_type.enums)
+            await database.execute(
+                f"DO $$ BEGIN CREATE TYPE {enum_type.name} AS ENUM ({labels}); "
+                f"EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+            )
+        for table in metadata.sorted_tables:
+            await database.execute(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)))
+            for index in table.indexes:
+                await database.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect)))
@@ -3,8 +3,8 @@ Metadata Models - For inspection ZIP upload metadata.json
 Defines the structure for metadata.json that tracks image information
 """
 
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, List, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from datetime import datetime
 
 
@@ -19,8 +19,8 @@ class ImageMetadata(BaseModel):
     captured_at: Optional[datetime] = Field(None, description="When the image was captured")
     file_size: Optional[int] = Field(None, description="File size in bytes")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "image_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
                 "surface": "PS",
@@ -32,6 +32,7 @@ class ImageMetadata(BaseModel):
                 "file_size": 2048576
             }
         }
+    )
 
 
 class BladeMetadata(BaseModel):
@@ -40,8 +41,8 @@ class BladeMetadata(BaseModel):
     images: List[ImageMetadata] = Field(default_factory=list, description="List of images for this blade")
     total_images: int = Field(0, description="Total number of images for this blade")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "blade_name": "BladeA",
                 "total_images": 45,
@@ -57,6 +58,7 @@ class BladeMetadata(BaseModel):
                 ]
             }
         }
+    )
 
 
 class InspectionMetadata(BaseModel):
@@ -80,8 +82,8 @@ class InspectionMetadata(BaseModel):
     project_id: Optional[str] = Field(None, description="Project UUID")
     windfarm_id: Optional[str] = Field(None, description="Windfarm UUID")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "inspection_code": "INSP-20240115-a1b2c3d4",
                 "inspection_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
@@ -103,6 +105,21 @@ class InspectionMetadata(BaseModel):
                 ]
             }
         }
+    )
+
+
+# Validates a whole image list in one call instead of one model init per image
+IMAGE_LIST_ADAPTER = TypeAdapter(List[ImageMetadata])
+
+
+def parse_images(raw: List[Any]) -> List[ImageMetadata]:
+    """Validate a list of raw image dicts into ImageMetadata"""
+    return IMAGE_LIST_ADAPTER.validate_python(raw)
+
+
+def parse_inspection_metadata(content: Union[bytes, str]) -> InspectionMetadata:
+    """Parse metadata.json content directly from JSON (no json.loads round-trip)"""
+    return InspectionMetadata.model_validate_json(content)
 
 
 class AIAnalysisRequest(BaseModel):
@@ -110,8 +127,8 @@ class AIAnalysisRequest(BaseModel):
     image_ids: List[str] = Field(..., description="List of image UUIDs to analyze")
     reanalyze: bool = Field(False, description="If True, re-run AI even if already analyzed")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "image_ids": [
                     "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
@@ -120,6 +137,7 @@ class AIAnalysisRequest(BaseModel):
                 "reanalyze": False
             }
         }
+    )
 
 
 class DeleteImagesRequest(BaseModel):
@@ -127,8 +145,8 @@ class DeleteImagesRequest(BaseModel):
     image_ids: List[str] = Field(..., description="List of image UUIDs to delete")
     delete_files: bool = Field(True, description="If True, also delete physical files")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "image_ids": [
                     "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
@@ -136,6 +154,7 @@ class DeleteImagesRequest(BaseModel):
                 "delete_files": True
             }
         }
+    )
 
 
 class AddImageRequest(BaseModel):
@@ -146,8 +165,8 @@ class AddImageRequest(BaseModel):
     position_meter: Optional[float] = Field(None, description="Position in meters")
     captured_at: Optional[datetime] = Field(None, description="When image was captured")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "blade": "BladeA",
                 "surface": "PS",
@@ -156,3 +175,4 @@ class AddImageRequest(BaseModel):
                 "captured_at": "2024-01-15T11:00:00Z"
             }
         }
+    )
@@ -1,30 +1,75 @@
 from datetime import datetime
 from uuid import UUID
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any, Literal, Tuple
 from enum import Enum
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import (BaseModel, BeforeValidator, ConfigDict, EmailStr, Field, PlainSerializer,
+                      TypeAdapter, field_validator)
+from typing_extensions import TypedDict
+
+# Shared config of outbound models. Rows from the DB are trusted, so routes may build these
+# with model_construct (no validation); extra DB columns are dropped.
+RESPONSE_MODEL_CONFIG = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
+
+# IDs leave the API as strings: UUIDs from the DB are stringified once on validation, so
+# pydantic-core checks a plain str instead of trying a UUID | str union
+def uuid_to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, UUID) else value
+
+
+IdStr = Annotated[str, BeforeValidator(uuid_to_str)]
+
+
+def to_epoch_millis(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+# Datetime written to JSON as integer epoch milliseconds; used on high-volume rows (audit logs)
+# where the ISO-8601 string is most of the payload
+EpochMillis = Annotated[datetime, PlainSerializer(to_epoch_millis, return_type=int, when_used="json")]
 
 # Common models
 class CreatedByInfo(BaseModel):
     """Information about who created a resource"""
-    id: UUID | str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: IdStr
     name: str
     email: str
 
+# Digit-only checks for phone numbers and OTPs: plain string checks instead of a regex
+# (isascii keeps non-ASCII digits such as '٣' out, like [0-9] did)
+
+
+def check_digits(value: str, min_length: int, max_length: int) -> str:
+    if not (value.isascii() and value.isdigit() and min_length <= len(value) <= max_length):
+        raise ValueError(f"must be {min_length}-{max_length} digits" if min_length != max_length
+                         else f"must be {min_length} digits")
+    return value
+
 # Registration models
 
 
 class RegisterRequest(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     email: EmailStr
-    phone: str = Field(..., pattern=r'^[0-9]{10,11}$')
+    phone: str = Field(..., json_schema_extra={"pattern": r'^[0-9]{10,11}$'})
     password: str = Field(..., min_length=6)
     confirm_password: str = Field(..., min_length=6)
 
+    @field_validator("phone")
+    @classmethod
+    def validate_phone(cls, value: str) -> str:
+        return check_digits(value, 10, 11)
+
 
 class VerifyRegistrationRequest(BaseModel):
-    otp: str = Field(..., pattern=r'^[0-9]{6}$')
+    otp: str = Field(..., json_schema_extra={"pattern": r'^[0-9]{6}$'})
+
+    @field_validator("otp")
+    @classmethod
+    def validate_otp(cls, value: str) -> str:
+        return check_digits(value, 6, 6)
 
 # Login models
 
@@ -35,13 +80,20 @@ class LoginRequest(BaseModel):
 
 
 class VerifyOTPRequest(BaseModel):
-    otp: str = Field(..., pattern=r'^[0-9]{6}$')
+    otp: str = Field(..., json_schema_extra={"pattern": r'^[0-9]{6}$'})
+
+    @field_validator("otp")
+    @classmethod
+    def validate_otp(cls, value: str) -> str:
+        return check_digits(value, 6, 6)
 
 # Response models
 
 
 class UserResponse(BaseModel):
-    id: str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: UUID
     name: str
     email: str
     phone: str
@@ -50,33 +102,45 @@ class UserResponse(BaseModel):
 
 
 class RegisterSuccessResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
     user: Optional[UserResponse] = None
 
 
 class RegisterResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
 
 
 class LoginPendingResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
 
 
 class LoginSuccessResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
     user: UserResponse
 
 
 class ErrorResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
 
 
 class SuccessResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
 
@@ -84,7 +148,9 @@ class SuccessResponse(BaseModel):
 
 
 class UserListResponse(BaseModel):
-    id: str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: UUID
     name: str
     email: str
     phone: str
@@ -94,11 +160,17 @@ class UserListResponse(BaseModel):
     created_at: datetime
 
 
+# Reused across requests by the admin user list endpoints
+USER_LIST_ADAPTER = TypeAdapter(List[UserListResponse])
+
+
 class ApproveUserRequest(BaseModel):
     user_id: str
 
 
 class AdminResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: str
     message: str
     data: Optional[dict] = None
@@ -180,7 +252,9 @@ class ProjectUpdateRequest(BaseModel):
 
 
 class ProjectResponse(BaseModel):
-    id: UUID | str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: IdStr
     name: str
     description: Optional[str]
     created_at: datetime
@@ -192,6 +266,8 @@ class ProjectResponse(BaseModel):
 
 
 class ProjectListResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     projects: List[Dict[str, Any]]
     total: int
     limit: int
@@ -203,8 +279,10 @@ class ProjectListResponse(BaseModel):
 # ==================================================================================
 
 class ProjectMemberResponse(BaseModel):
-    project_id: str
-    user_id: str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    project_id: UUID
+    user_id: UUID
     user_name: str
     user_email: str
     role: ProjectRole
@@ -224,6 +302,8 @@ class AddMemberRequest(BaseModel):
 
 
 class ProjectMemberListResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     members: List[ProjectMemberResponse]
     total: int
     limit: int
@@ -249,12 +329,14 @@ class WindfarmUpdateRequest(BaseModel):
 
 
 class WindfarmResponse(BaseModel):
-    id: UUID | str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: IdStr
     name: str
     description: Optional[str]
     own_company: Optional[str]
     location: Optional[str]
-    project_id: UUID | str
+    project_id: IdStr
     project_name: Optional[str]
     created_at: datetime
     updated_at: datetime
@@ -263,6 +345,8 @@ class WindfarmResponse(BaseModel):
 
 
 class WindfarmListResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     windfarms: List[WindfarmResponse]
     total: int
     limit: int
@@ -273,12 +357,37 @@ class WindfarmListResponse(BaseModel):
 # TURBINE MODELS
 # ==================================================================================
 
+# Turbine coordinates: "lat,lng" is parsed once into a (lat, lng) float tuple at validation
+# and written back as "lat,lng" on dump, the format the turbines_coordinates_format CHECK expects
+
+
+def parse_coordinates(value: Any) -> Any:
+    if isinstance(value, str):
+        parts = value.split(",")
+        if len(parts) != 2:
+            raise ValueError('must be "lat,lng"')
+        return parts[0].strip(), parts[1].strip()
+    return value
+
+
+def format_coordinates(value: Tuple[float, float]) -> str:
+    # Fixed-point (no exponent), trimmed; the DB keeps 6 decimals
+    return ",".join(f"{part:.6f}".rstrip("0").rstrip(".") for part in value)
+
+
+Coordinates = Annotated[
+    Tuple[Annotated[float, Field(ge=-90, le=90)], Annotated[float, Field(ge=-180, le=180)]],
+    BeforeValidator(parse_coordinates),
+    PlainSerializer(format_coordinates, return_type=str),
+]
+
+
 class TurbineCreateRequest(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = Field(None, max_length=1000)
     capacity_mw: Optional[float] = Field(None, ge=0)
     serial_no: Optional[str] = Field(None, max_length=100)
-    coordinates: Optional[str] = None  # Will store as "lat,lng"
+    coordinates: Optional[Coordinates] = None  # Will store as "lat,lng"
 
 
 class TurbineUpdateRequest(BaseModel):
@@ -286,14 +395,16 @@ class TurbineUpdateRequest(BaseModel):
     description: Optional[str] = Field(None, max_length=1000)
     capacity_mw: Optional[float] = Field(None, ge=0)
     serial_no: Optional[str] = Field(None, max_length=100)
-    coordinates: Optional[str] = None
+    coordinates: Optional[Coordinates] = None
 
 
 class TurbineResponse(BaseModel):
-    id: UUID | str
+    model_config = RESPONSE_MODEL_CONFIG
+
+    id: IdStr
     name: str
     description: Optional[str]
-    windfarm_id: UUID | str
+    windfarm_id: IdStr
     windfarm_name: Optional[str]
     capacity_mw: Optional[float]
     coordinates: Optional[str]
@@ -304,6 +415,8 @@ class TurbineResponse(BaseModel):
 
 
 class TurbineListResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     turbines: List[TurbineResponse]
     total: int
     limit: int
@@ -322,6 +435,8 @@ class AutoCoordinates(BaseModel):
 # ==================================================================================
 
 class AuditLogResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str
     project_id: Optional[str]
     actor_id: str
@@ -332,7 +447,7 @@ class AuditLogResponse(BaseModel):
     before_data: Optional[Dict[str, Any]]
     after_data: Optional[Dict[str, Any]]
     metadata: Optional[Dict[str, Any]]
-    timestamp: datetime
+    timestamp: EpochMillis
     ip_address: Optional[str]
 
 
@@ -399,6 +514,15 @@ class DamageGrade(int, Enum):
     GRADE_5 = 5  # Lỗ lớp Laminate 100% - Red
 
 
+# Literal forms of the enums above for request/response fields: pydantic-core validates a
+# Literal with a set lookup instead of coercing into the Enum class. The Enum classes stay
+# as named constants for service code.
+BladeSurfaceValue = Literal["PS", "LE", "TE", "SS"]
+InspectionStatusValue = Literal["uploaded", "processing", "completed", "failed"]
+ImageStatusValue = Literal["uploaded", "processing", "analyzed", "reviewed", "failed"]
+DamageGradeValue = Literal[1, 2, 3, 4, 5]
+
+
 # Request Models
 class InspectionUploadRequest(BaseModel):
     """Request khi upload inspection"""
@@ -409,14 +533,27 @@ class InspectionUploadRequest(BaseModel):
 
 class DamageAssessmentUpdateRequest(BaseModel):
     """Request để cập nhật đánh giá hư hỏng sau khi AI xử lý"""
-    damage_grade: int = Field(..., ge=1, le=5, description="Cấp độ hư hỏng 1-5")
+    damage_grade: DamageGradeValue = Field(..., description="Cấp độ hư hỏng 1-5")
     damage_description: Optional[str] = Field(None, description="Mô tả chi tiết hư hỏng")
     manual_notes: Optional[str] = Field(None, description="Ghi chú của reviewer")
 
 
+# One AI detection box. A TypedDict (typing_extensions: pydantic needs it below Python 3.12)
+# gives pydantic-core a fixed per-key schema instead of validating/serializing Any values.
+class BBox(TypedDict):
+    x: float
+    y: float
+    width: float
+    height: float
+    type: str
+    confidence: float
+
+
 # Response Models
 class DamageGradeInfo(BaseModel):
     """Thông tin cấp độ hư hỏng"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     grade: int
     label: str
     color: str
@@ -425,13 +562,41 @@ class DamageGradeInfo(BaseModel):
     recommended_action: str
 
 
+# Static grade table, built once at import; index with damage_grade_info(grade)
+DAMAGE_GRADE_INFO: Tuple[DamageGradeInfo, ...] = tuple(
+    DamageGradeInfo.model_construct(
+        grade=grade, label=f"Cấp {grade}", color=color, description=description,
+        impact=impact, recommended_action=recommended_action
+    )
+    for grade, color, description, impact, recommended_action in (
+        (1, "#4CAF50", "Vết bẩn, vết nứt nhỏ", "Không ảnh hưởng hiệu suất",
+         "Theo dõi ở lần kiểm tra tiếp theo"),
+        (2, "#8BC34A", "Hao mòn lớp phủ", "Ảnh hưởng nhỏ đến khí động học",
+         "Đưa vào kế hoạch bảo dưỡng định kỳ"),
+        (3, "#FFEB3B", "Hư hỏng lớp phủ/LEP", "Giảm hiệu suất, hư hỏng có thể lan rộng",
+         "Sửa chữa lớp phủ/LEP trong kỳ bảo dưỡng gần nhất"),
+        (4, "#FF9800", "Mất LEP nghiêm trọng", "Giảm hiệu suất đáng kể, nguy cơ hư hỏng kết cấu",
+         "Lên lịch sửa chữa sớm"),
+        (5, "#F44336", "Lỗ lớp Laminate 100%", "Hư hỏng kết cấu, nguy cơ mất an toàn",
+         "Dừng turbine và sửa chữa ngay"),
+    )
+)
+
+
+def damage_grade_info(grade: int) -> DamageGradeInfo:
+    """Return the shared DamageGradeInfo for grade 1-5"""
+    return DAMAGE_GRADE_INFO[grade - 1]
+
+
 class DamageAssessmentResponse(BaseModel):
     """✅ Ultra-simplified Response - Only bounding boxes (with type & confidence) + description"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str
     inspection_image_id: str
     
     # ✅ AI Analysis (Bounding boxes contain all detection info: x, y, width, height, type, confidence)
-    ai_bounding_boxes: Optional[List[Dict[str, Any]]]
+    ai_bounding_boxes: Optional[List[BBox]]
     ai_processed_at: Optional[datetime]
     
     # ✅ User Notes
@@ -444,14 +609,16 @@ class DamageAssessmentResponse(BaseModel):
 
 class InspectionImageResponse(BaseModel):
     """Response cho từng ảnh"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str
     inspection_id: str
     blade: str
-    surface: str
+    surface: BladeSurfaceValue
     position_pct: Optional[float]
     file_name: str
     file_size: Optional[int]
-    status: str
+    status: ImageStatusValue
     captured_at: Optional[datetime]
     viewed_at: Optional[datetime]
     created_at: datetime
@@ -462,10 +629,12 @@ class InspectionImageResponse(BaseModel):
 
 class InspectionResponse(BaseModel):
     """Response cho inspection"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str
     turbine_id: str
     inspection_code: str
-    status: str
+    status: InspectionStatusValue
     captured_at: Optional[datetime]
     operator: Optional[str]
     equipment: Optional[str]
@@ -482,10 +651,12 @@ class InspectionResponse(BaseModel):
 
 class InspectionListItemResponse(BaseModel):
     """Response cho list item (simplified version)"""
+    model_config = RESPONSE_MODEL_CONFIG
+
     id: str
     turbine_id: str
     inspection_code: str
-    status: str
+    status: InspectionStatusValue
     captured_at: Optional[datetime]
     operator: Optional[str]
     total_images: int
@@ -502,3 +673,17 @@ class InspectionDetailResponse(InspectionResponse):
     images_by_surface: Dict[str, int]
     images_by_status: Dict[str, int]
     damage_distribution: Dict[int, int]  # {grade: count}
+
+
+# Pydantic builds validators at class creation; only models with unresolved forward
+# references are deferred to first use. Resolve those now so no request pays for it.
+# Only models defined here: BaseModel itself (imported above) is never complete and
+# cannot be rebuilt.
+for _model in list(globals().values()):
+    if (
+        isinstance(_model, type)
+        and issubclass(_model, BaseModel)
+        and _model.__module__ == __name__
+        and not _model.__pydantic_complete__
+    ):
+        _model.model_rebuild()
@@ -0,0 +1,196 @@
+"""
+Hot-path queries as plain SQL executed on the raw asyncpg connection
+Skips the per-call SQLAlchemy compile of `databases`; asyncpg's per-connection
+statement cache prepares each SQL text once and reuses it afterwards.
+Statements are either hand-written or Core statements compiled once at import.
+"""
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+
+from app.db.database import (auth_sessions_table, database, projects_table,
+                             users_table)
+
+# asyncpg uses $1, $2, ... placeholders
+_DIALECT = postgresql.dialect(paramstyle="numeric_dollar")
+
+
+def compile_statement(statement) -> str:
+    """Compile a SQLAlchemy statement once (at import) into asyncpg SQL text"""
+    return str(statement.compile(dialect=_DIALECT))
+
+
+# Login lookup: only the columns login (and its cache) needs
+SELECT_LOGIN_USER = """
+    SELECT u.id, u.internal_id, u.email, u.phone, c.password_hash, u.is_approved, u.is_active
+    FROM users u
+    JOIN user_credentials c ON c.user_id = u.id
+    WHERE u.email = $1 OR u.phone = $1
+    LIMIT 1
+"""
+
+# Password hash of one user (change/reset password, reset token fingerprint)
+SELECT_PASSWORD_HASH = """
+    SELECT password_hash FROM user_credentials WHERE user_id = $1
+"""
+
+UPDATE_PASSWORD_HASH = """
+    UPDATE user_credentials SET password_hash = $2, updated_at = CURRENT_TIMESTAMP
+    WHERE user_id = $1
+"""
+
+# Direct audit log insert (durable AuditLogger.log); JSONB values are passed as JSON text
+INSERT_AUDIT_LOG = """
+    INSERT INTO audit_logs (id, actor_id, action, entity_type, entity_id, entity_name, description,
+                            project_id, before_data, after_data, changes, ip_address, user_agent, metadata)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+"""
+
+# Registration duplicate check
+SELECT_USER_EXISTS = """
+    SELECT 1 FROM users WHERE email = $1 OR phone = $2 LIMIT 1
+"""
+
+# Pending registration upsert (one row per email). A pending row for the same phone under
+# another email is replaced too, so two pending registrations can never both verify into
+# users with the same (unique) phone
+UPSERT_TEMP_REGISTRATION = """
+    WITH same_phone AS (
+        DELETE FROM temp_registrations WHERE phone = $4 AND email <> $3
+    )
+    INSERT INTO temp_registrations (id, name, email, phone, password_hash, otp_code, otp_expires_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    ON CONFLICT (email) DO UPDATE SET
+        id = EXCLUDED.id,
+        name = EXCLUDED.name,
+        phone = EXCLUDED.phone,
+        password_hash = EXCLUDED.password_hash,
+        otp_code = EXCLUDED.otp_code,
+        otp_expires_at = EXCLUDED.otp_expires_at
+"""
+
+# Precompiled Core statements for the per-request auth lookups
+USER_BY_ID = compile_statement(
+    sqlalchemy.select(users_table).where(users_table.c.id == sqlalchemy.bindparam("user_id"))
+)
+
+USER_BY_INTERNAL_ID = compile_statement(
+    sqlalchemy.select(users_table).where(users_table.c.internal_id == sqlalchemy.bindparam("internal_id"))
+)
+
+AUTH_SESSION_BY_TOKEN = compile_statement(
+    sqlalchemy.select(auth_sessions_table.c.user_id, auth_sessions_table.c.expires_at)
+    .where(auth_sessions_table.c.session_token == sqlalchemy.bindparam("session_token"))
+)
+
+DELETE_AUTH_SESSIONS_BY_USER = compile_statement(
+    sqlalchemy.delete(auth_sessions_table).where(auth_sessions_table.c.user_id == sqlalchemy.bindparam("internal_id"))
+)
+
+# Per-request permission lookups
+PROJECT_BY_ID = compile_statement(
+    sqlalchemy.select(projects_table).where(projects_table.c.id == sqlalchemy.bindparam("project_id"))
+)
+
+SELECT_PROJECT_MEMBERSHIP = """
+    SELECT role, can_invite
+    FROM project_members
+    WHERE user_id = $1 AND project_id = $2
+"""
+
+# Project row plus the user's membership (NULL role when not a member) in one lookup
+SELECT_PROJECT_WITH_MEMBERSHIP = """
+    SELECT p.*, pm.role AS member_role, pm.can_invite AS member_can_invite
+    FROM projects p
+    LEFT JOIN project_members pm ON pm.project_id = p.id AND pm.user_id = $1
+    WHERE p.id = $2
+"""
+
+# Projects a user belongs to, with their role (only the columns callers list)
+SELECT_USER_PROJECTS_WITH_ROLE = """
+    SELECT p.id, p.name, p.created_at, pm.role, pm.joined_at
+    FROM project_members pm
+    JOIN projects p ON p.id = pm.project_id
+    WHERE pm.user_id = $1
+"""
+
+# Turbine with its windfarm/project and the user's membership (NULL role when not a member)
+SELECT_TURBINE_ACCESS = """
+    SELECT t.id, t.name, t.windfarm_id, w.name AS windfarm_name, w.project_id,
+           pm.role AS member_role, pm.can_invite AS member_can_invite
+    FROM turbines t
+    JOIN windfarms w ON w.id = t.windfarm_id
+    LEFT JOIN project_members pm ON pm.project_id = w.project_id AND pm.user_id = $2
+    WHERE t.id = $1
+"""
+
+SELECT_USER_ROLE = """
+    SELECT role FROM users WHERE id = $1
+"""
+
+# Creator info for one entity / a batch of entities
+SELECT_USER_BRIEF = """
+    SELECT id, name, email FROM users WHERE id = $1
+"""
+
+# Creator info for a batch of entities
+SELECT_USERS_BY_IDS = """
+    SELECT id, name, email FROM users WHERE id = ANY($1::uuid[])
+"""
+
+
+# Image counts per blade / surface / status of one inspection, aggregated in one pass
+SELECT_INSPECTION_IMAGE_COUNTS = """
+    SELECT
+        CASE
+            WHEN GROUPING(blade) = 0 THEN 'blade'
+            WHEN GROUPING(surface) = 0 THEN 'surface'
+            ELSE 'status'
+        END AS dimension,
+        COALESCE(blade, surface, status::text) AS value,
+        COUNT(*) AS count
+    FROM inspection_images
+    WHERE inspection_id = $1
+    GROUP BY GROUPING SETS ((blade), (surface), (status))
+"""
+
+# Assessments of every image of one inspection, newest analysis first per image
+SELECT_INSPECTION_ASSESSMENTS = """
+    SELECT da.inspection_image_id, da.ai_bounding_boxes, da.description
+    FROM damage_assessments da
+    JOIN inspection_images ii ON ii.id = da.inspection_image_id
+    WHERE ii.inspection_id = $1
+    ORDER BY da.inspection_image_id, da.ai_processed_at DESC NULLS LAST
+"""
+
+
+async def fetchrow(sql: str, *args):
+    """Run a prepared query on the current pooled connection and return one row"""
+    async with database.connection() as connection:
+        return await connection.raw_connection.fetchrow(sql, *args)
+
+
+async def fetch(sql: str, *args) -> list:
+    """Run a prepared query on the current pooled connection and return all rows"""
+    async with database.connection() as connection:
+        return await connection.raw_connection.fetch(sql, *args)
+
+
+async def fetchval(sql: str, *args):
+    """Run a prepared query on the current pooled connection and return the first column of the first row"""
+    async with database.connection() as connection:
+        return await connection.raw_connection.fetchval(sql, *args)
+
+
+async def copy_records(table_name: str, columns: list, records: list) -> str:
+    """Bulk-insert records with COPY (binary protocol, one round-trip) on the current pooled connection"""
+    async with database.connection() as connection:
+        return await connection.raw_connection.copy_records_to_table(
+            table_name, records=records, columns=columns
+        )
+
+
+async def execute(sql: str, *args) -> str:
+    """Run a prepared statement on the current pooled connection"""
+    async with database.connection() as connection:
+        return await connection.raw_connection.execute(sql, *args)
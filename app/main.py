@@ -2,6 +2,7 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
 from app.api.v1.users_admin.auth_routes import router as auth_router
 from app.api.v1.projects.routes import router as projects_router
@@ -10,14 +11,25 @@ from app.api.v1.turbines import router as turbines_router
 from app.api.v1.audit import router as audit_router
 from app.api.v1.members.routes import router as members_router
 from app.api.v1.inspections.routes import router as inspections_router
-from app.core.config import FRONTEND_ORIGINS, ensure_storage_directories
+from app.core.config import ENVIRONMENT, FRONTEND_ORIGINS, LOG_LEVEL, ensure_storage_directories
+from app.core.logging_config import setup_logging, shutdown_logging
 from app.db.database import connect_db, disconnect_db
+from app.services.audit_service import start_audit_writer, stop_audit_writer
+from app.services.cleanup_service import start_cleanup_task, stop_cleanup_task
+from app.services.email_service import close_smtp_pool, init_smtp_pool
+from app.utilities.permissions import ProjectAccessCacheMiddleware
+
+# Logging and storage directories are set up at import, so startup and the first
+# request never wait on these disk syscalls
+setup_logging(LOG_LEVEL)
+ensure_storage_directories()
 
 # Create FastAPI app
 app = FastAPI(
     title="Wind Turbine Management API",
     description="API for managing wind turbine projects, windfarms, turbines, and team collaboration",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -29,6 +41,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Repeated project access checks within one request share a single lookup
+app.add_middleware(ProjectAccessCacheMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(projects_router, prefix="/api/v1") 
@@ -45,16 +60,31 @@ app.include_router(inspections_router, prefix="/api/v1")
 async def startup():
     """Connect to database on startup"""
     await connect_db()
-    # Create storage directories for inspections
-    ensure_storage_directories()
+    # Start pooled SMTP connections used for OTP/notification emails
+    await init_smtp_pool()
+    # Periodically prune expired temp registrations/sessions
+    start_cleanup_task()
+    # Batch audit log inserts in the background
+    start_audit_writer()
+    # Build the OpenAPI schema now (FastAPI caches it) instead of on the first /docs request
+    app.openapi()
     # Optionally create tables (better to use migrations in production)
-    # create_tables()
+    # await create_tables()
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Disconnect from database on shutdown"""
+    await stop_cleanup_task()
+    # Flush queued audit rows while the database is still connected
+    await stop_audit_writer()
+    await close_smtp_pool()
     await disconnect_db()
+    shutdown_logging()
+
+# Constant payloads rendered once; each request only wraps the bytes
+HEALTH_BODY = b'{"status":"healthy","message":"API is running"}'
+ROOT_BODY = ORJSONResponse({"message": "Authentication API", "version": "1.0.0", "docs": "/docs"}).body
 
 # Health check endpoint
 
@@ -62,7 +92,7 @@ async def shutdown():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "message": "API is running"}
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 # Root endpoint
 
@@ -70,16 +100,17 @@ async def health_check():
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Authentication API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        # C event loop and HTTP parser (both in requirements.txt)
+        loop="uvloop",
+        http="httptools",
+        # One worker: OTP sessions, auth and permission caches live in process memory
+        workers=1,
+        reload=ENVIRONMENT == "development"
     )
@@ -65,11 +65,17 @@ async def create_admin_user():
             await conn.close()
             return
 
-        # Insert admin user
-        await conn.execute("""
-            INSERT INTO users (name, email, phone, password_hash, role, is_active, is_approved)
-            VALUES ($1, $2, $3, $4, 'admin', TRUE, TRUE)
-        """, name, email, phone, password_hash)
+        # Insert admin user and its credentials
+        async with conn.transaction():
+            admin_id = await conn.fetchval("""
+                INSERT INTO users (name, email, phone, role, is_active, is_approved)
+                VALUES ($1, $2, $3, 'admin', TRUE, TRUE)
+                RETURNING id
+            """, name, email, phone)
+            await conn.execute(
+                "INSERT INTO user_credentials (user_id, password_hash) VALUES ($1, $2)",
+                admin_id, password_hash
+            )
 
         print("✅ Tạo admin user thành công!")
         print(f"📧 Email: {email}")
@@ -1,12 +1,38 @@
 -- ============================================================================
 -- MERGED SCHEMA: Authentication (base) + Project/Windfarm/Turbine management
 -- Safe to run multiple times (uses IF NOT EXISTS where possible)
--- Requires: PostgreSQL 12+ and extension pgcrypto (for gen_random_uuid)
+-- Requires: PostgreSQL 12+ and extension pgcrypto (for gen_random_uuid / uuidv7)
 -- ============================================================================
 
 -- Enable needed extension
 CREATE EXTENSION IF NOT EXISTS pgcrypto;
 
+-- Time-ordered UUIDs (48-bit unix ms prefix) for high-churn tables, so inserts append to the
+-- rightmost B-tree leaf instead of landing on random pages
+CREATE OR REPLACE FUNCTION uuidv7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(gen_random_uuid())
+                    placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
+
+-- Native enum types (4 bytes per value instead of VARCHAR(50) + CHECK)
+DO $$ BEGIN
+    CREATE TYPE user_role AS ENUM ('user', 'admin', 'superadmin');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN
+    CREATE TYPE inspection_status AS ENUM ('uploaded', 'processing', 'completed', 'failed');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN
+    CREATE TYPE image_status AS ENUM ('uploaded', 'processing', 'analyzed', 'reviewed', 'failed');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN
+    CREATE TYPE image_checked_flag AS ENUM ('Unchecked', 'Checked', 'Processed');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
 -- ============================================================================
 -- AUTHENTICATION & ACCOUNT TABLES  (BASE - from old file)
 -- ============================================================================
@@ -14,11 +40,11 @@ CREATE EXTENSION IF NOT EXISTS pgcrypto;
 -- Users table
 CREATE TABLE IF NOT EXISTS users (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    internal_id BIGINT GENERATED ALWAYS AS IDENTITY UNIQUE NOT NULL,
     name VARCHAR(100) NOT NULL,
     email VARCHAR(255) UNIQUE NOT NULL,
     phone VARCHAR(20) UNIQUE NOT NULL,
-    password_hash TEXT NOT NULL,
-    role VARCHAR(50) DEFAULT 'user',
+    role user_role DEFAULT 'user',
     is_active BOOLEAN DEFAULT TRUE,
     is_approved BOOLEAN DEFAULT FALSE,
     approved_at TIMESTAMP NULL,
@@ -26,11 +52,32 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Password hashes, 1:1 with users and kept out of the hot users rows
+CREATE TABLE IF NOT EXISTS user_credentials (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    password_hash TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Existing databases: move users.password_hash into user_credentials
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'users' AND column_name = 'password_hash'
+    ) THEN
+        INSERT INTO user_credentials (user_id, password_hash)
+        SELECT id, password_hash FROM users
+        ON CONFLICT (user_id) DO NOTHING;
+        ALTER TABLE users DROP COLUMN password_hash;
+    END IF;
+END $$;
+
 -- Temporary registrations table for OTP verification
 CREATE TABLE IF NOT EXISTS temp_registrations (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     name VARCHAR(100) NOT NULL,
-    email VARCHAR(255) NOT NULL,
+    email VARCHAR(255) UNIQUE NOT NULL,
     phone VARCHAR(20) NOT NULL,
     password_hash TEXT NOT NULL,
     otp_code VARCHAR(6) NOT NULL,
@@ -41,7 +88,7 @@ CREATE TABLE IF NOT EXISTS temp_registrations (
 -- Temporary sessions table for login OTP verification
 CREATE TABLE IF NOT EXISTS temp_sessions (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL REFERENCES users(internal_id) ON DELETE CASCADE,
     otp_code VARCHAR(6) NOT NULL,
     otp_expires_at TIMESTAMP NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -49,36 +96,37 @@ CREATE TABLE IF NOT EXISTS temp_sessions (
 
 -- Authentication sessions table for logged in users
 CREATE TABLE IF NOT EXISTS auth_sessions (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    id UUID PRIMARY KEY DEFAULT uuidv7(),
+    user_id BIGINT NOT NULL REFERENCES users(internal_id) ON DELETE CASCADE,
     session_token TEXT UNIQUE NOT NULL,
     expires_at TIMESTAMP NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE IF NOT EXISTS password_resets (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES users(id) ON DELETE SET NULL,
-    email VARCHAR(255) NOT NULL,
-    otp_code VARCHAR(6) NOT NULL,
-    otp_expires_at TIMESTAMP NOT NULL,
-    is_verified BOOLEAN DEFAULT FALSE,
-    used BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+-- Password reset state lives in a signed token cookie; the old table (and its indexes) goes
+DROP TABLE IF EXISTS password_resets;
 
 -- Indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
+-- Pending-approval list: WHERE is_approved = FALSE ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_users_pending ON users(created_at DESC) WHERE is_approved = FALSE;
 CREATE INDEX IF NOT EXISTS idx_temp_registrations_email ON temp_registrations(email);
 CREATE INDEX IF NOT EXISTS idx_temp_registrations_phone ON temp_registrations(phone);
 CREATE INDEX IF NOT EXISTS idx_temp_sessions_user_id ON temp_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_auth_sessions_user_id ON auth_sessions(user_id);
-CREATE INDEX IF NOT EXISTS idx_auth_sessions_session_token ON auth_sessions(session_token);
+-- session_token is already covered by its UNIQUE constraint index
+DROP INDEX IF EXISTS idx_auth_sessions_session_token;
 
-CREATE INDEX IF NOT EXISTS idx_password_resets_email ON password_resets(email);
-CREATE INDEX IF NOT EXISTS idx_password_resets_user_id ON password_resets(user_id);
-CREATE INDEX IF NOT EXISTS idx_password_resets_expires_at ON password_resets(otp_expires_at);
+-- One pending registration per email (register upserts on it); keep the newest row on existing databases
+DELETE FROM temp_registrations a USING temp_registrations b
+WHERE a.email = b.email AND (a.created_at, a.id::text) < (b.created_at, b.id::text);
+CREATE UNIQUE INDEX IF NOT EXISTS temp_registrations_email_key ON temp_registrations(email);
+
+-- Expiry indexes for the background cleanup task
+CREATE INDEX IF NOT EXISTS idx_temp_registrations_expires_at ON temp_registrations(otp_expires_at);
+CREATE INDEX IF NOT EXISTS idx_temp_sessions_expires_at ON temp_sessions(otp_expires_at);
+CREATE INDEX IF NOT EXISTS idx_auth_sessions_expires_at ON auth_sessions(expires_at);
 
 -- ============================================================================
 -- PROJECT / WINDFARM / TURBINE MANAGEMENT  (from new file)
@@ -133,9 +181,31 @@ CREATE TABLE IF NOT EXISTS turbines (
     created_by UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Latitude/longitude parsed from coordinates by Postgres on write (NULL when the text is malformed)
+ALTER TABLE turbines ADD COLUMN IF NOT EXISTS latitude DECIMAL(9,6) GENERATED ALWAYS AS (
+    CASE WHEN coordinates ~ '^\s*-?[0-9]{1,3}(\.[0-9]+)?\s*,\s*-?[0-9]{1,3}(\.[0-9]+)?\s*$'
+    THEN trim(split_part(coordinates, ',', 1))::numeric(9, 6) END
+) STORED;
+ALTER TABLE turbines ADD COLUMN IF NOT EXISTS longitude DECIMAL(9,6) GENERATED ALWAYS AS (
+    CASE WHEN coordinates ~ '^\s*-?[0-9]{1,3}(\.[0-9]+)?\s*,\s*-?[0-9]{1,3}(\.[0-9]+)?\s*$'
+    THEN trim(split_part(coordinates, ',', 2))::numeric(9, 6) END
+) STORED;
+-- New writes must use "lat,lng"; NOT VALID leaves existing rows unchecked
+DO $$
+BEGIN
+    ALTER TABLE turbines ADD CONSTRAINT turbines_coordinates_format CHECK (
+        coordinates IS NULL
+        OR coordinates ~ '^\s*-?[0-9]{1,3}(\.[0-9]+)?\s*,\s*-?[0-9]{1,3}(\.[0-9]+)?\s*$'
+    ) NOT VALID;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
 -- AUDIT LOG TABLE - Track all user actions
+-- Partitioned by month on timestamp; monthly partitions (audit_logs_YYYY_MM) are created
+-- ahead of time and dropped after 30 days by the app (AuditLogger.maintain_partitions).
+-- Existing unpartitioned tables are converted by app/scripts/partition_audit_logs.py
 CREATE TABLE IF NOT EXISTS audit_logs (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT uuidv7(),
     project_id UUID REFERENCES projects(id) ON DELETE SET NULL,
     actor_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     action VARCHAR(50) NOT NULL CHECK (action IN (
@@ -153,11 +223,28 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     after_data JSONB,
     changes JSONB, -- Calculated diff between before and after data
     metadata JSONB, -- Additional context like batch_count, etc.
-    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     expires_at TIMESTAMP WITH TIME ZONE DEFAULT (CURRENT_TIMESTAMP + INTERVAL '30 days'), -- Auto-expire after 30 days
     ip_address INET,
-    user_agent TEXT -- Browser/client information
-);
+    user_agent TEXT, -- Browser/client information
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catches rows outside the monthly partitions so inserts never fail.
+-- On an install whose audit_logs predates partitioning, CREATE TABLE IF NOT EXISTS above
+-- kept the plain table; run app/scripts/partition_audit_logs.py to convert it
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit_logs'::regclass) THEN
+        CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT;
+    ELSE
+        RAISE NOTICE 'audit_logs is not partitioned; run app/scripts/partition_audit_logs.py to convert it';
+    END IF;
+END $$;
+
+-- Snapshots are already compact JSONB; skip TOAST compression on insert
+ALTER TABLE audit_logs ALTER COLUMN before_data SET STORAGE EXTERNAL;
+ALTER TABLE audit_logs ALTER COLUMN after_data SET STORAGE EXTERNAL;
 
 -- ============================================================================
 -- BLADE INSPECTION TABLES - Quản lý kiểm tra cánh turbine với AI
@@ -168,7 +255,7 @@ CREATE TABLE IF NOT EXISTS inspections (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     turbine_id UUID NOT NULL REFERENCES turbines(id) ON DELETE CASCADE,
     inspection_code VARCHAR(100) UNIQUE NOT NULL,
-    status VARCHAR(50) DEFAULT 'uploaded' CHECK (status IN ('uploaded', 'processing', 'completed', 'failed')),
+    status inspection_status DEFAULT 'uploaded',
     
     -- Thông tin kiểm tra
     captured_at TIMESTAMP WITH TIME ZONE,
@@ -193,7 +280,7 @@ CREATE TABLE IF NOT EXISTS inspections (
 
 -- INSPECTION IMAGES TABLE - Từng ảnh trong inspection
 CREATE TABLE IF NOT EXISTS inspection_images (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID PRIMARY KEY DEFAULT uuidv7(),
     inspection_id UUID NOT NULL REFERENCES inspections(id) ON DELETE CASCADE,
     
     -- Vị trí trên cánh
@@ -211,10 +298,10 @@ CREATE TABLE IF NOT EXISTS inspection_images (
     captured_at TIMESTAMP WITH TIME ZONE,
     
     -- Status
-    status VARCHAR(50) DEFAULT 'uploaded' CHECK (status IN ('uploaded', 'processing', 'analyzed', 'reviewed', 'failed')),
+    status image_status DEFAULT 'uploaded',
     
     -- Checked flag for selective AI workflow
-    checked_flag VARCHAR(20) DEFAULT 'Unchecked' CHECK (checked_flag IN ('Unchecked', 'Checked', 'Processed')),
+    checked_flag image_checked_flag DEFAULT 'Unchecked',
     
     -- User interaction
     viewed_by UUID REFERENCES users(id),
@@ -233,7 +320,7 @@ CREATE TABLE IF NOT EXISTS inspection_images (
 -- Removed grading system, measurements, and AI summary fields
 -- Only keeping bounding boxes array (contains all detection info) + user notes
 CREATE TABLE IF NOT EXISTS damage_assessments (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID PRIMARY KEY DEFAULT uuidv7(),
     inspection_image_id UUID NOT NULL REFERENCES inspection_images(id) ON DELETE CASCADE,
     
     -- ✅ AI Analysis (Bounding boxes contain all detection info: x, y, width, height, type, confidence)
@@ -250,7 +337,11 @@ CREATE TABLE IF NOT EXISTS damage_assessments (
 
 COMMENT ON TABLE damage_assessments IS 'Ultra-simplified: only bounding boxes (with embedded type & confidence per box) + user description';
 COMMENT ON COLUMN damage_assessments.description IS 'Optional user notes/description for the damage';
+-- Packed copy of ai_bounding_boxes (see app/utilities/bbox_codec.py), written alongside the JSONB
+ALTER TABLE damage_assessments ADD COLUMN IF NOT EXISTS ai_bounding_boxes_bin BYTEA;
+
 COMMENT ON COLUMN damage_assessments.ai_bounding_boxes IS 'YOLOv8 detection results: [{x, y, width, height, type, confidence}] - All detection data in one array';
+COMMENT ON COLUMN damage_assessments.ai_bounding_boxes_bin IS 'ai_bounding_boxes packed as float32 (x, y, width, height, confidence) + uint16 label ids';
 
 -- ============================================================================
 -- ❌ REMOVED: damage_grade_definitions table
@@ -258,29 +349,89 @@ COMMENT ON COLUMN damage_assessments.ai_bounding_boxes IS 'YOLOv8 detection resu
 -- Frontend can implement custom grading/categorization if needed
 -- ============================================================================
 
+-- Convert VARCHAR role/status columns of older databases to the enum types (skipped once converted)
+DO $$
+DECLARE
+    col RECORD;
+BEGIN
+    FOR col IN
+        SELECT * FROM (VALUES
+            ('users', 'role', 'user_role', 'user', NULL),
+            ('inspections', 'status', 'inspection_status', 'uploaded', 'inspections_status_check'),
+            ('inspection_images', 'status', 'image_status', 'uploaded', 'inspection_images_status_check'),
+            ('inspection_images', 'checked_flag', 'image_checked_flag', 'Unchecked', 'inspection_images_checked_flag_check')
+        ) AS t(table_name, column_name, type_name, default_value, check_name)
+    LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = col.table_name AND column_name = col.column_name
+              AND data_type = 'character varying'
+        ) THEN
+            IF col.check_name IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE %I DROP CONSTRAINT IF EXISTS %I', col.table_name, col.check_name);
+            END IF;
+            EXECUTE format('ALTER TABLE %I ALTER COLUMN %I DROP DEFAULT', col.table_name, col.column_name);
+            EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE %I USING %I::text::%I',
+                           col.table_name, col.column_name, col.type_name, col.column_name, col.type_name);
+            EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET DEFAULT %L',
+                           col.table_name, col.column_name, col.default_value);
+        END IF;
+    END LOOP;
+END $$;
+
+-- Existing databases: switch high-churn tables to time-ordered ids for new rows
+ALTER TABLE auth_sessions ALTER COLUMN id SET DEFAULT uuidv7();
+ALTER TABLE audit_logs ALTER COLUMN id SET DEFAULT uuidv7();
+ALTER TABLE inspection_images ALTER COLUMN id SET DEFAULT uuidv7();
+ALTER TABLE damage_assessments ALTER COLUMN id SET DEFAULT uuidv7();
+
 -- INDEXES for performance optimization
 CREATE INDEX IF NOT EXISTS idx_projects_created_by ON projects(created_by);
 
-CREATE INDEX IF NOT EXISTS idx_project_members_project_id ON project_members(project_id);
-CREATE INDEX IF NOT EXISTS idx_project_members_user_id ON project_members(user_id);
-
-CREATE INDEX IF NOT EXISTS idx_windfarms_project_id ON windfarms(project_id);
+-- Membership lookups by (user_id, project_id) answered index-only (role, can_invite included);
+-- also serves "projects of a user". The (project_id, user_id) primary key covers the other direction,
+-- so the single-column indexes are redundant
+CREATE UNIQUE INDEX IF NOT EXISTS idx_project_members_user_project
+    ON project_members(user_id, project_id) INCLUDE (role, can_invite);
+DROP INDEX IF EXISTS idx_project_members_user_id;
+DROP INDEX IF EXISTS idx_project_members_project_id;
+
+-- Project windfarm list: WHERE project_id = ? ORDER BY created_at DESC (also serves project_id lookups)
+CREATE INDEX IF NOT EXISTS idx_windfarms_project_created ON windfarms(project_id, created_at DESC);
+DROP INDEX IF EXISTS idx_windfarms_project_id;
+-- Admin windfarm list: ORDER BY created_at DESC LIMIT ?
+CREATE INDEX IF NOT EXISTS idx_windfarms_created_at ON windfarms(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_windfarms_created_by ON windfarms(created_by);
 
 CREATE INDEX IF NOT EXISTS idx_turbines_windfarm_id ON turbines(windfarm_id);
 CREATE INDEX IF NOT EXISTS idx_turbines_created_by ON turbines(created_by);
+-- Map / bounding-box queries on the parsed coordinates
+CREATE INDEX IF NOT EXISTS idx_turbines_geo ON turbines(latitude, longitude);
 
 CREATE INDEX IF NOT EXISTS idx_audit_logs_project_id ON audit_logs(project_id);
-CREATE INDEX IF NOT EXISTS idx_audit_logs_actor_id ON audit_logs(actor_id);
-CREATE INDEX IF NOT EXISTS idx_audit_logs_entity_type ON audit_logs(entity_type);
 CREATE INDEX IF NOT EXISTS idx_audit_logs_entity_id ON audit_logs(entity_id);
-CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
+-- Newest-first pages and keyset cursors on (timestamp, id); replaces the plain timestamp index
+CREATE INDEX IF NOT EXISTS idx_audit_logs_time_id ON audit_logs(timestamp DESC, id DESC);
+DROP INDEX IF EXISTS idx_audit_logs_timestamp;
+-- Project audit trail: WHERE project_id = ? ORDER BY timestamp DESC
+CREATE INDEX IF NOT EXISTS idx_audit_logs_project_time ON audit_logs(project_id, timestamp DESC);
+-- Admin log filters (get_all_logs/count_logs): actor or entity type/action, newest first.
+-- These replace the single-column actor_id and entity_type indexes (their leading columns)
+CREATE INDEX IF NOT EXISTS idx_audit_logs_actor_time ON audit_logs(actor_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_entity_action_time ON audit_logs(entity_type, action, timestamp DESC);
+DROP INDEX IF EXISTS idx_audit_logs_actor_id;
+DROP INDEX IF EXISTS idx_audit_logs_entity_type;
 
 CREATE INDEX IF NOT EXISTS idx_inspections_turbine_id ON inspections(turbine_id);
+-- Turbine inspection list filtered by status: WHERE turbine_id = ? AND status = ? ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_inspections_turbine_status ON inspections(turbine_id, status, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_inspections_status ON inspections(status);
 CREATE INDEX IF NOT EXISTS idx_inspections_created_by ON inspections(created_by);
 
-CREATE INDEX IF NOT EXISTS idx_inspection_images_inspection_id ON inspection_images(inspection_id);
+-- Inspection image list: WHERE inspection_id = ? ORDER BY blade, surface, position_pct (also serves inspection_id lookups)
+CREATE INDEX IF NOT EXISTS idx_inspection_images_inspection_blade_surface
+    ON inspection_images(inspection_id, blade, surface, position_pct);
+DROP INDEX IF EXISTS idx_inspection_images_inspection_id;
 CREATE INDEX IF NOT EXISTS idx_inspection_images_blade_surface ON inspection_images(blade, surface);
 CREATE INDEX IF NOT EXISTS idx_inspection_images_status ON inspection_images(status);
 CREATE INDEX IF NOT EXISTS idx_inspection_images_checked_flag ON inspection_images(checked_flag);
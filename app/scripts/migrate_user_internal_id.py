@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Non-interactive migration that gives users a BIGINT surrogate key for session joins.
+- Adds users.internal_id (BIGINT GENERATED ALWAYS AS IDENTITY, UNIQUE)
+- Converts temp_sessions.user_id and auth_sessions.user_id from UUID to BIGINT
+  referencing users.internal_id (existing sessions are kept)
+- users.id (UUID) stays the primary key and external identifier
+"""
+import asyncio
+
+import asyncpg
+
+from app.core.config import DATABASE_URL
+
+SESSION_TABLES = ("temp_sessions", "auth_sessions")
+
+
+async def get_column_type(conn: asyncpg.Connection, table: str, column: str):
+    return await conn.fetchval(
+        """
+        SELECT data_type
+        FROM information_schema.columns
+        WHERE table_name = $1 AND column_name = $2
+        """,
+        table, column
+    )
+
+
+async def migrate():
+    print("Connecting to database...")
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        async with conn.transaction():
+            if await get_column_type(conn, "users", "internal_id") is None:
+                print("Adding users.internal_id...")
+                await conn.execute(
+                    "ALTER TABLE users ADD COLUMN internal_id BIGINT GENERATED ALWAYS AS IDENTITY"
+                )
+            await conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS users_internal_id_key ON users (internal_id)"
+            )
+
+            for table in SESSION_TABLES:
+                if await get_column_type(conn, table, "user_id") == "bigint":
+                    print(f"{table}.user_id already BIGINT, skipping")
+                    continue
+
+                print(f"Converting {table}.user_id to BIGINT...")
+                await conn.execute(f"ALTER TABLE {table} ADD COLUMN user_internal_id BIGINT")
+                await conn.execute(
+                    f"""
+                    UPDATE {table} s
+                    SET user_internal_id = u.internal_id
+                    FROM users u
+                    WHERE u.id = s.user_id
+                    """
+                )
+                await conn.execute(f"DELETE FROM {table} WHERE user_internal_id IS NULL")
+                await conn.execute(f"ALTER TABLE {table} DROP COLUMN user_id")
+                await conn.execute(f"ALTER TABLE {table} RENAME COLUMN user_internal_id TO user_id")
+                await conn.execute(f"ALTER TABLE {table} ALTER COLUMN user_id SET NOT NULL")
+                await conn.execute(
+                    f"""
+                    ALTER TABLE {table}
+                    ADD CONSTRAINT {table}_user_id_fkey
+                    FOREIGN KEY (user_id) REFERENCES users(internal_id) ON DELETE CASCADE
+                    """
+                )
+                await conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_user_id ON {table}(user_id)"
+                )
+
+        print("✅ Migration complete")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
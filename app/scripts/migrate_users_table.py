@@ -2,6 +2,8 @@
 """
 Non-interactive migration to ensure users table has expected columns for the app.
 - Adds missing columns: name, phone, role, is_active, is_approved, approved_at, approved_by, created_at
+  (password hashes live in user_credentials, see database_schema.sql)
+- Backfills NULL role/is_active/is_approved in one UPDATE
 - Adds UNIQUE constraint on email and phone if missing
 - Prints resulting schema
 """
@@ -15,7 +17,6 @@ EXPECTED_COLUMNS = {
     "name": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS name VARCHAR(100)"),
     "email": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS email VARCHAR(255)"),
     "phone": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR(20)"),
-    "password_hash": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS password_hash TEXT"),
     "role": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR(50) DEFAULT 'user'"),
     "is_active": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE"),
     "is_approved": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS is_approved BOOLEAN DEFAULT FALSE"),
@@ -24,6 +25,13 @@ EXPECTED_COLUMNS = {
     "created_at": ("ALTER TABLE users ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
 }
 
+# Values for NULLs left in columns that existed before the migration
+NULL_DEFAULTS = {
+    "role": "'user'",
+    "is_active": "TRUE",
+    "is_approved": "FALSE",
+}
+
 
 async def get_existing_columns(conn: asyncpg.Connection) -> Set[str]:
     rows = await conn.fetch(
@@ -47,16 +55,13 @@ async def migrate():
             if col not in existing:
                 print(f"Adding missing column: {col}")
                 await conn.execute(ddl)
-            else:
-                # ensure default for role/is_active/is_approved if column exists without default
-                if col in ("role", "is_active", "is_approved"):
-                    # Set defaults explicitly for existing rows where NULL
-                    if col == "role":
-                        await conn.execute("UPDATE users SET role='user' WHERE role IS NULL")
-                    elif col == "is_active":
-                        await conn.execute("UPDATE users SET is_active=TRUE WHERE is_active IS NULL")
-                    elif col == "is_approved":
-                        await conn.execute("UPDATE users SET is_approved=FALSE WHERE is_approved IS NULL")
+
+        # New columns were filled by their DEFAULT; backfill NULLs in pre-existing ones in one pass
+        backfill = [col for col in NULL_DEFAULTS if col in existing]
+        if backfill:
+            assignments = ", ".join(f"{col} = COALESCE({col}, {NULL_DEFAULTS[col]})" for col in backfill)
+            conditions = " OR ".join(f"{col} IS NULL" for col in backfill)
+            await conn.execute(f"UPDATE users SET {assignments} WHERE {conditions}")
 
         # Backfill 'name' from legacy 'full_name' if present
         try:
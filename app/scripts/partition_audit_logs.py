@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Non-interactive migration that converts audit_logs into a table partitioned by month.
+- Renames the existing table to audit_logs_unpartitioned
+- Creates audit_logs PARTITION BY RANGE (timestamp) with PRIMARY KEY (id, timestamp)
+- Creates one partition per month that has rows, plus the current and next month,
+  and a DEFAULT partition
+- Copies the rows across and drops the old table
+Run it after database_schema.sql, which defines the uuidv7() id default used here.
+Afterwards the app creates and drops monthly partitions itself (AuditLogger.maintain_partitions)
+"""
+import asyncio
+from datetime import datetime
+
+import asyncpg
+
+from app.core.config import DATABASE_URL
+
+AUDIT_COLUMNS = """
+    id UUID NOT NULL DEFAULT uuidv7(),
+    project_id UUID REFERENCES projects(id) ON DELETE SET NULL,
+    actor_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    action VARCHAR(50) NOT NULL CHECK (action IN (
+        'CREATE', 'UPDATE', 'DELETE',
+        'STATUS_CHANGE', 'MEMBER_ADDED', 'MEMBER_REMOVED',
+        'BATCH_CREATE'
+    )),
+    entity_type VARCHAR(30) NOT NULL CHECK (entity_type IN (
+        'PROJECT', 'WINDFARM', 'TURBINE', 'PROJECT_MEMBER', 'INSPECTION', 'INSPECTION_IMAGE'
+    )),
+    entity_id UUID NOT NULL,
+    entity_name VARCHAR(255),
+    description TEXT,
+    before_data JSONB,
+    after_data JSONB,
+    changes JSONB,
+    metadata JSONB,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE DEFAULT (CURRENT_TIMESTAMP + INTERVAL '30 days'),
+    ip_address INET,
+    user_agent TEXT,
+    PRIMARY KEY (id, timestamp)
+"""
+
+AUDIT_INDEXES = {
+    "idx_audit_logs_project_id": "project_id",
+    "idx_audit_logs_entity_id": "entity_id",
+    "idx_audit_logs_time_id": "timestamp DESC, id DESC",
+    "idx_audit_logs_project_time": "project_id, timestamp DESC",
+    "idx_audit_logs_actor_time": "actor_id, timestamp DESC",
+    "idx_audit_logs_entity_action_time": "entity_type, action, timestamp DESC",
+}
+# Older single-column indexes superseded by the composite ones above
+OBSOLETE_AUDIT_INDEXES = ("idx_audit_logs_actor_id", "idx_audit_logs_entity_type", "idx_audit_logs_timestamp")
+
+
+def month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+
+async def is_partitioned(conn: asyncpg.Connection) -> bool:
+    return await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit_logs'))"
+    )
+
+
+async def migrate():
+    print("Connecting to database...")
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if await is_partitioned(conn):
+            print("audit_logs already partitioned, skipping")
+            return
+
+        async with conn.transaction():
+            print("Renaming audit_logs to audit_logs_unpartitioned...")
+            await conn.execute("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned")
+            for index_name in (*AUDIT_INDEXES, *OBSOLETE_AUDIT_INDEXES):
+                await conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+            print("Creating partitioned audit_logs...")
+            await conn.execute(f"CREATE TABLE audit_logs ({AUDIT_COLUMNS}) PARTITION BY RANGE (timestamp)")
+            await conn.execute("ALTER TABLE audit_logs ALTER COLUMN before_data SET STORAGE EXTERNAL")
+            await conn.execute("ALTER TABLE audit_logs ALTER COLUMN after_data SET STORAGE EXTERNAL")
+
+            months = {
+                (row["month"].year, row["month"].month)
+                for row in await conn.fetch(
+                    """
+                    SELECT DISTINCT date_trunc('month', timestamp AT TIME ZONE 'UTC') AS month
+                    FROM audit_logs_unpartitioned
+                    WHERE timestamp IS NOT NULL
+                    """
+                )
+            }
+            now = datetime.utcnow()
+            months.add((now.year, now.month))
+            next_month = month_start(now.year, now.month + 1)
+            months.add((next_month.year, next_month.month))
+
+            for year, month in sorted(months):
+                start = month_start(year, month)
+                end = month_start(year, month + 1)
+                print(f"Creating partition audit_logs_{start:%Y_%m}...")
+                await conn.execute(
+                    f"CREATE TABLE audit_logs_{start:%Y_%m} PARTITION OF audit_logs "
+                    f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+                )
+            await conn.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+            for index_name, columns in AUDIT_INDEXES.items():
+                await conn.execute(f"CREATE INDEX {index_name} ON audit_logs({columns})")
+
+            print("Copying audit rows...")
+            await conn.execute(
+                """
+                INSERT INTO audit_logs
+                SELECT id, project_id, actor_id, action, entity_type, entity_id, entity_name,
+                       description, before_data, after_data, changes, metadata,
+                       COALESCE(timestamp, CURRENT_TIMESTAMP), expires_at, ip_address, user_agent
+                FROM audit_logs_unpartitioned
+                """
+            )
+            await conn.execute("DROP TABLE audit_logs_unpartitioned")
+
+        print("✅ Migration complete")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
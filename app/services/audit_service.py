@@ -3,14 +3,165 @@ Unified Audit logging service for tracking all user actions
 Records all CRUD operations and system events with auto-cleanup after 30 days
 """
 
+import asyncio
+import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
-import uuid
+from typing import AsyncIterator, Optional, Dict, Any, List
 import sqlalchemy
 from fastapi import Request
 
-from app.db.database import database, audit_logs_table, users_table
+from app.db.database import database, audit_logs_table, json_serializer, users_table
+from app.db import prepared_queries
 from app.db.models import AuditAction, EntityType
+from app.utilities.ids import uuid7
+
+logger = logging.getLogger(__name__)
+
+# Lowercase entity type names used in descriptions, computed once
+_ENTITY_LOWER: Dict[EntityType, str] = {et: et.value.lower() for et in EntityType}
+
+# Description templates for actions whose text depends only on the entity
+_DESCRIPTION_TEMPLATES: Dict[AuditAction, str] = {
+    AuditAction.CREATE: "Created {et} '{en}'",
+    AuditAction.UPDATE: "Updated {et} '{en}'",
+    AuditAction.DELETE: "Deleted {et} '{en}'",
+    AuditAction.MEMBER_ADDED: "Added member to {et} '{en}'",
+    AuditAction.MEMBER_REMOVED: "Removed member from {et} '{en}'",
+}
+
+# Planner row estimate for audit_logs (summed over partitions; a partitioned parent has no
+# stats of its own). -1 means "never analyzed" and counts as 0
+ESTIMATED_AUDIT_ROWS_SQL = """
+SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+FROM pg_class c
+WHERE (c.oid = 'audit_logs'::regclass AND c.relkind = 'r')
+   OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'audit_logs'::regclass)
+"""
+# Below this many estimated rows an exact COUNT(*) is cheap enough to run
+EXACT_AUDIT_COUNT_THRESHOLD = 10000
+
+# Columns of get_all_logs with ids and IP cast to text and missing names filled in by SQL
+_audit = audit_logs_table.c
+AUDIT_LOG_COLUMNS = (
+    sqlalchemy.cast(_audit.id, sqlalchemy.Text).label("id"),
+    sqlalchemy.cast(_audit.project_id, sqlalchemy.Text).label("project_id"),
+    sqlalchemy.cast(_audit.actor_id, sqlalchemy.Text).label("actor_id"),
+    _audit.action,
+    _audit.entity_type,
+    sqlalchemy.cast(_audit.entity_id, sqlalchemy.Text).label("entity_id"),
+    sqlalchemy.func.coalesce(
+        _audit.entity_name,
+        _audit.entity_type + " " + sqlalchemy.func.left(sqlalchemy.cast(_audit.entity_id, sqlalchemy.Text), 8),
+    ).label("entity_name"),
+    sqlalchemy.func.coalesce(
+        _audit.description, "Action " + _audit.action + " on " + _audit.entity_type
+    ).label("description"),
+    _audit.before_data,
+    _audit.after_data,
+    _audit.changes,
+    _audit.metadata,
+    _audit.timestamp,
+    _audit.expires_at,
+    sqlalchemy.func.host(_audit.ip_address).label("ip_address"),
+    _audit.user_agent,
+    users_table.c.name.label("actor_name"),
+    users_table.c.email.label("actor_email"),
+)
+
+# Audit rows are queued by AuditLogger.log and written by a background task with one
+# binary COPY per batch
+AUDIT_BATCH_SIZE = 1000
+AUDIT_FLUSH_INTERVAL_SECONDS = 0.1
+# When this many rows are waiting, AuditLogger.log inserts directly instead of queueing
+AUDIT_QUEUE_MAXSIZE = 10000
+
+# None on the queue tells the writer to flush what it has and exit
+_audit_queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=AUDIT_QUEUE_MAXSIZE)
+_audit_writer_task: Optional[asyncio.Task] = None
+
+
+# Column order of the records the writer COPYs into audit_logs (keys of AuditLogger.log's insert_data)
+AUDIT_COPY_COLUMNS = [
+    "id", "actor_id", "action", "entity_type", "entity_id", "entity_name", "description",
+    "project_id", "before_data", "after_data", "changes", "ip_address", "user_agent", "metadata",
+]
+AUDIT_JSON_COLUMNS = frozenset(("before_data", "after_data", "changes", "metadata"))
+
+
+def _json_text(data: Optional[Dict[str, Any]]) -> Optional[str]:
+    return json_serializer(data) if data is not None else None
+
+
+def _audit_record(row: Dict[str, Any]) -> tuple:
+    """Values of an audit row in AUDIT_COPY_COLUMNS order (also INSERT_AUDIT_LOG's parameter order)"""
+    return tuple(_json_text(row[col]) if col in AUDIT_JSON_COLUMNS else row[col] for col in AUDIT_COPY_COLUMNS)
+
+
+async def _insert_audit_row(row: Dict[str, Any]) -> None:
+    # Prepared statement on the raw connection: no per-call SQLAlchemy build/compile
+    await prepared_queries.execute(prepared_queries.INSERT_AUDIT_LOG, *_audit_record(row))
+
+
+async def _write_audit_rows(rows: List[Dict[str, Any]]) -> None:
+    try:
+        await prepared_queries.copy_records("audit_logs", AUDIT_COPY_COLUMNS, [_audit_record(row) for row in rows])
+        return
+    except Exception:
+        if len(rows) == 1:
+            logger.error("failed to write audit log row %s", rows[0]["id"], exc_info=True)
+            return
+        logger.warning("COPY of %s audit log rows failed, inserting them one by one", len(rows), exc_info=True)
+    
+    # COPY is all-or-nothing; one bad row (e.g. an actor hard-deleted since it was queued)
+    # must not take the rest of the batch with it
+    for row in rows:
+        try:
+            await _insert_audit_row(row)
+        except Exception:
+            logger.error("failed to write audit log row %s", row["id"], exc_info=True)
+
+
+async def _audit_writer_loop() -> None:
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        row = await _audit_queue.get()
+        if row is None:
+            return
+        rows = [row]
+        deadline = loop.time() + AUDIT_FLUSH_INTERVAL_SECONDS
+        while len(rows) < AUDIT_BATCH_SIZE:
+            if _audit_queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(_audit_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                row = _audit_queue.get_nowait()
+            if row is None:
+                stopping = True
+                break
+            rows.append(row)
+        await _write_audit_rows(rows)
+
+
+def start_audit_writer() -> None:
+    """Start the background audit writer (call on startup)"""
+    global _audit_writer_task
+    if _audit_writer_task is None:
+        _audit_writer_task = asyncio.create_task(_audit_writer_loop())
+
+
+async def stop_audit_writer() -> None:
+    """Flush queued audit rows and stop the writer (call on shutdown, before disconnecting)"""
+    global _audit_writer_task
+    if _audit_writer_task is not None:
+        task, _audit_writer_task = _audit_writer_task, None
+        await _audit_queue.put(None)
+        await task
 
 
 class AuditLogger:
@@ -28,11 +179,16 @@ class AuditLogger:
         after_data: Optional[Dict[str, Any]] = None,
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        durable: bool = False
     ) -> str:
         """
         Log any user action to the unified audit log
         
+        The row is queued for the background writer and written within
+        AUDIT_FLUSH_INTERVAL_SECONDS; with durable=True (or when the writer is not
+        running, e.g. in scripts, or its queue is full) it is inserted before returning.
+        
         Args:
             actor_id: ID of user performing the action
             action: Type of action performed  
@@ -45,31 +201,34 @@ class AuditLogger:
             ip_address: IP address of the actor
             user_agent: User agent string
             metadata: Additional context information
+            durable: Insert immediately instead of queueing
             
         Returns:
-            ID of the created audit log entry
+            ID of the created audit log entry (UPDATEs without any changed field
+            are not written)
         """
         
-        log_id = str(uuid.uuid4())
+        log_id = str(uuid7())
         
-        # Generate human-readable description
-        description = AuditLogger._generate_description(
-            action, entity_type, entity_name, before_data, after_data
-        )
+        # Empty payloads are stored as NULL rather than serialized as {}
+        before_data = before_data or None
+        after_data = after_data or None
+        metadata = metadata or None
         
         # Calculate changes if both before and after data exist
         changes = None
         if before_data and after_data:
-            changes = AuditLogger._calculate_changes(before_data, after_data)
+            changes = AuditLogger._calculate_changes(before_data, after_data) or None
+            # An update that changed nothing is not recorded
+            if changes is None and action == AuditAction.UPDATE:
+                return log_id
         
-        # Clean data for JSON serialization
-        def clean_for_json(data):
-            if data is None:
-                return None
-            import json
-            return json.loads(json.dumps(data, default=str))
+        # Generate human-readable description
+        description = AuditLogger._generate_description(
+            action, entity_type, entity_name, before_data, after_data
+        )
         
-        # Insert audit log
+        # Insert audit log (JSONB values are serialized once, as orjson text, when the row is written)
         insert_data = {
             "id": log_id,
             "actor_id": actor_id,
@@ -79,16 +238,27 @@ class AuditLogger:
             "entity_name": entity_name,
             "description": description,
             "project_id": project_id,
-            "before_data": clean_for_json(before_data),
-            "after_data": clean_for_json(after_data),
-            "changes": clean_for_json(changes),
+            "before_data": before_data,
+            "after_data": after_data,
+            "changes": changes,
             "ip_address": ip_address,
             "user_agent": user_agent,
-            "metadata": clean_for_json(metadata)
+            "metadata": metadata
         }
         
-        query = audit_logs_table.insert().values(**insert_data)
-        await database.execute(query)
+        if not durable and _audit_writer_task is not None:
+            # Queued rows are serialized later, so snapshot the caller's dicts now
+            for key in ("before_data", "after_data", "metadata"):
+                if insert_data[key] is not None:
+                    insert_data[key] = dict(insert_data[key])
+            try:
+                _audit_queue.put_nowait(insert_data)
+                return log_id
+            except asyncio.QueueFull:
+                # The writer is falling behind; write this row ourselves rather than grow the backlog
+                pass
+        
+        await _insert_audit_row(insert_data)
         
         return log_id
     
@@ -102,62 +272,57 @@ class AuditLogger:
     ) -> str:
         """Generate human-readable description of the action"""
         
-        entity_display = entity_name or f"{entity_type.value}"
+        entity_display = entity_name or entity_type.value
+        et_lower = _ENTITY_LOWER[entity_type]
+        
+        template = _DESCRIPTION_TEMPLATES.get(action)
+        if template is not None:
+            return template.format(et=et_lower, en=entity_display)
         
-        if action == AuditAction.CREATE:
-            return f"Created {entity_type.value.lower()} '{entity_display}'"
-        elif action == AuditAction.UPDATE:
-            return f"Updated {entity_type.value.lower()} '{entity_display}'"  
-        elif action == AuditAction.DELETE:
-            return f"Deleted {entity_type.value.lower()} '{entity_display}'"
-        elif action == AuditAction.STATUS_CHANGE:
+        if action == AuditAction.STATUS_CHANGE:
             if before_data and after_data:
                 old_status = before_data.get('status', 'unknown')
                 new_status = after_data.get('status', 'unknown')
-                return f"Changed status of {entity_type.value.lower()} '{entity_display}' from {old_status} to {new_status}"
-            return f"Changed status of {entity_type.value.lower()} '{entity_display}'"
-        elif action == AuditAction.MEMBER_ADDED:
-            return f"Added member to {entity_type.value.lower()} '{entity_display}'"
-        elif action == AuditAction.MEMBER_REMOVED:
-            return f"Removed member from {entity_type.value.lower()} '{entity_display}'"
-        else:
-            return f"Performed {action.value.lower()} on {entity_type.value.lower()} '{entity_display}'"
+                return f"Changed status of {et_lower} '{entity_display}' from {old_status} to {new_status}"
+            return f"Changed status of {et_lower} '{entity_display}'"
+        return f"Performed {action.value.lower()} on {et_lower} '{entity_display}'"
     
     @staticmethod 
     def _calculate_changes(before_data: Dict[str, Any], after_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate what fields changed between before and after data"""
         
-        changes = {}
-        all_keys = set(before_data.keys()) | set(after_data.keys())
-        
-        for key in all_keys:
-            old_value = before_data.get(key)
-            new_value = after_data.get(key)
-            
-            if old_value != new_value:
-                changes[key] = {
-                    "from": old_value,
-                    "to": new_value
-                }
+        # Walk after_data once (identity check first skips unchanged references),
+        # then only the keys that were removed
+        changes = {
+            key: {"from": old_value, "to": new_value}
+            for key, new_value in after_data.items()
+            if (old_value := before_data.get(key)) is not new_value and old_value != new_value
+        }
+        for key in before_data.keys() - after_data.keys():
+            if before_data[key] is not None:
+                changes[key] = {"from": before_data[key], "to": None}
                 
         return changes
     
     @staticmethod
     def get_client_ip(request: Request) -> Optional[str]:
-        """Extract client IP from request"""
+        """Extract client IP from request (read from the ASGI scope, no Address wrapper)"""
         if request:
-            return request.client.host if request.client else None
+            client = request.scope.get("client")
+            return client[0] if client else None
         return None
     
     @staticmethod
     def get_user_agent(request: Request) -> Optional[str]:
-        """Extract user agent from request"""
+        """Extract user agent from request (scans the raw ASGI headers, no Headers object)"""
         if request:
-            return request.headers.get("user-agent")
+            for key, value in request.scope.get("headers", ()):
+                if key == b"user-agent":
+                    return value.decode("latin-1")
         return None
     
     @staticmethod
-    async def get_all_logs(
+    def _logs_query(
         limit: int = 100,
         offset: int = 0,
         actor_id: Optional[str] = None,
@@ -165,18 +330,19 @@ class AuditLogger:
         entity_type: Optional[str] = None,
         action: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> List[Dict[str, Any]]:
+        end_date: Optional[datetime] = None,
+        after_ts: Optional[datetime] = None,
+        after_id: Optional[str] = None
+    ):
         """
-        Get all audit logs with optional filtering (Admin only)
+        SELECT for one page of audit logs, newest first
+        With after_ts/after_id (timestamp and id of the last row already seen) the page
+        is found by keyset on (timestamp, id) and offset is ignored
         """
         
-        # Base query with user information
-        query = sqlalchemy.select(
-            audit_logs_table,
-            users_table.c.name.label("actor_name"),
-            users_table.c.email.label("actor_email")
-        ).select_from(
+        # Base query with user information; ids, IP and the description/entity_name
+        # fallbacks are rendered by the SELECT
+        query = sqlalchemy.select(*AUDIT_LOG_COLUMNS).select_from(
             audit_logs_table.join(users_table, audit_logs_table.c.actor_id == users_table.c.id)
         )
         
@@ -195,43 +361,69 @@ class AuditLogger:
             conditions.append(audit_logs_table.c.timestamp >= start_date)
         if end_date:
             conditions.append(audit_logs_table.c.timestamp <= end_date)
+        keyset = after_ts is not None and after_id is not None
+        if keyset:
+            conditions.append(
+                sqlalchemy.tuple_(audit_logs_table.c.timestamp, audit_logs_table.c.id)
+                < sqlalchemy.tuple_(after_ts, after_id)
+            )
             
         if conditions:
             query = query.where(sqlalchemy.and_(*conditions))
         
-        # Order by timestamp descending
-        query = query.order_by(audit_logs_table.c.timestamp.desc())
+        # Order by timestamp descending (id breaks ties, so keyset pages are stable)
+        query = query.order_by(audit_logs_table.c.timestamp.desc(), audit_logs_table.c.id.desc())
         
         # Apply pagination
-        query = query.limit(limit).offset(offset)
-        
+        query = query.limit(limit)
+        return query if keyset else query.offset(offset)
+    
+    @staticmethod
+    async def get_all_logs(
+        limit: int = 100,
+        offset: int = 0,
+        actor_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        entity_type: Optional[str] = None,
+        action: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after_ts: Optional[datetime] = None,
+        after_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all audit logs with optional filtering (Admin only)
+        """
+        query = AuditLogger._logs_query(
+            limit, offset, actor_id, project_id, entity_type, action, start_date, end_date,
+            after_ts, after_id
+        )
         results = await database.fetch_all(query)
-        
-        # Convert results to proper format
-        formatted_results = []
-        for row in results:
-            data = dict(row)
-            
-            # Convert UUID fields to strings
-            for field in ['id', 'actor_id', 'entity_id', 'project_id']:
-                if data.get(field):
-                    data[field] = str(data[field])
-            
-            # Convert IP address to string
-            if data.get('ip_address'):
-                data['ip_address'] = str(data['ip_address'])
-            
-            # Ensure description is not None
-            if data.get('description') is None:
-                data['description'] = f"Action {data.get('action', 'UNKNOWN')} on {data.get('entity_type', 'UNKNOWN')}"
-            
-            # Ensure entity_name has default value
-            if data.get('entity_name') is None:
-                data['entity_name'] = f"{data.get('entity_type', 'Unknown')} {data.get('entity_id', '')[:8]}"
-            
-            formatted_results.append(data)
-            
-        return formatted_results
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    async def iter_logs(
+        limit: int = 100,
+        offset: int = 0,
+        actor_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        entity_type: Optional[str] = None,
+        action: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after_ts: Optional[datetime] = None,
+        after_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Same rows as get_all_logs, yielded one at a time from a server-side cursor
+        (large pages are never held in memory as a list)
+        """
+        query = AuditLogger._logs_query(
+            limit, offset, actor_id, project_id, entity_type, action, start_date, end_date,
+            after_ts, after_id
+        )
+        async for row in database.iterate(query):
+            yield dict(row)
     
     @staticmethod
     async def count_logs(
@@ -244,8 +436,14 @@ class AuditLogger:
     ) -> int:
         """
         Count audit logs with optional filtering
+        Unfiltered counts of large tables use the planner's row estimate instead of a full scan
         """
         
+        if not any((actor_id, project_id, entity_type, action, start_date, end_date)):
+            estimate = await database.fetch_val(ESTIMATED_AUDIT_ROWS_SQL)
+            if estimate >= EXACT_AUDIT_COUNT_THRESHOLD:
+                return estimate
+        
         query = sqlalchemy.select(sqlalchemy.func.count()).select_from(audit_logs_table)
         
         # Apply same filters as get_all_logs
@@ -270,19 +468,92 @@ class AuditLogger:
         return await database.fetch_val(query)
     
     @staticmethod
-    async def cleanup_old_logs() -> int:
+    async def cleanup_old_logs(retention_days: int = 30) -> int:
         """
-        Delete audit logs older than 30 days (expired logs)
+        Delete audit logs older than retention_days (expired logs)
+        Whole months past retention are dropped as partitions first, so the row
+        DELETE only touches the partition that straddles the cutoff
         Returns number of deleted records
         """
         
+        await AuditLogger.drop_expired_partitions(retention_days)
+        
+        # expires_at defaults to timestamp + retention, so the timestamp bound lets the
+        # planner prune every partition newer than the cutoff
+        now = datetime.utcnow()
         query = audit_logs_table.delete().where(
-            audit_logs_table.c.expires_at < datetime.utcnow()
+            audit_logs_table.c.timestamp < now - timedelta(days=retention_days),
+            audit_logs_table.c.expires_at < now
         )
         
         result = await database.execute(query)
         return result
     
+    # ===============================
+    # MONTHLY PARTITIONS
+    # ===============================
+    
+    @staticmethod
+    async def is_partitioned() -> bool:
+        """Check whether audit_logs is a partitioned table (older databases may not be migrated yet)"""
+        return bool(await database.fetch_val(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit_logs'))"
+        ))
+    
+    @staticmethod
+    def _month_start(year: int, month: int) -> datetime:
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        return datetime(year, month, 1)
+    
+    @staticmethod
+    async def ensure_partitions(months_ahead: int = 1) -> None:
+        """Create the monthly partitions for the current month and the next months_ahead months"""
+        now = datetime.utcnow()
+        for offset in range(months_ahead + 1):
+            start = AuditLogger._month_start(now.year, now.month + offset)
+            end = AuditLogger._month_start(start.year, start.month + 1)
+            await database.execute(
+                f"CREATE TABLE IF NOT EXISTS audit_logs_{start:%Y_%m} PARTITION OF audit_logs "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+            )
+    
+    @staticmethod
+    async def drop_expired_partitions(retention_days: int = 30) -> List[str]:
+        """
+        Drop monthly partitions whose whole range is older than retention_days
+        Returns names of dropped partitions
+        """
+        if not await AuditLogger.is_partitioned():
+            return []
+        
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        rows = await database.fetch_all(
+            """
+            SELECT c.relname AS name
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'audit_logs'::regclass
+              AND c.relname ~ '^audit_logs_[0-9]{4}_[0-9]{2}$'
+            """
+        )
+        
+        dropped = []
+        for row in rows:
+            name = row["name"]
+            year, month = int(name[-7:-3]), int(name[-2:])
+            if AuditLogger._month_start(year, month + 1) <= cutoff:
+                await database.execute(f"DROP TABLE IF EXISTS {name}")
+                dropped.append(name)
+        return dropped
+    
+    @staticmethod
+    async def maintain_partitions() -> None:
+        """Create upcoming monthly partitions and drop the expired ones"""
+        if not await AuditLogger.is_partitioned():
+            return
+        await AuditLogger.ensure_partitions()
+        await AuditLogger.drop_expired_partitions()
+    
     # ===============================
     # COMPATIBILITY METHODS (for existing code)
     # ===============================
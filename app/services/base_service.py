@@ -5,15 +5,55 @@ Provides reusable methods for database operations and validation
 
 from typing import Dict, Any, List, Optional, Type
 from datetime import datetime
-import uuid
 import sqlalchemy
 from sqlalchemy import Table
 from pydantic import BaseModel
 from fastapi import HTTPException, status
 
-from app.db.database import database
+from app.db.database import database, users_table
+from app.db import prepared_queries
 from app.services.audit_service import AuditLogger
 from app.db.models import EntityType, AuditAction
+from app.utilities.cache import TTLCache
+from app.utilities.ids import uuid7
+
+# Rendered list pages (windfarms per project, turbines per windfarm) keyed by route and
+# query arguments. Cleared on every create/update/delete made through BaseService.
+list_page_cache = TTLCache(ttl_seconds=30, maxsize=256)
+
+# Creator rows (id, name, email) per str(user_id) for created_by enhancement.
+# Entries are dropped by invalidate_creator_cache whenever a user changes.
+creator_cache = TTLCache(ttl_seconds=60, maxsize=2048)
+
+
+def invalidate_creator_cache(user_id: Any) -> None:
+    """Drop the cached creator info of a user"""
+    creator_cache.delete(str(user_id))
+
+# Creator columns for list queries; pair with created_by_join() and fold back with attach_created_by()
+CREATED_BY_COLUMNS = "cu.name AS created_by_name, cu.email AS created_by_email"
+
+
+def created_by_join(alias: str) -> str:
+    """LEFT JOIN of the creator user for the table aliased as alias"""
+    return f"LEFT JOIN users cu ON cu.id = {alias}.created_by"
+
+
+def attach_created_by(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace created_by UUID with {id, name, email} from the joined CREATED_BY_COLUMNS
+    
+    Args:
+        row: Row dict selected with CREATED_BY_COLUMNS
+        
+    Returns:
+        The same dict, shaped like enhance_created_by_info output
+    """
+    name = row.pop("created_by_name", None)
+    email = row.pop("created_by_email", None)
+    if row.get("created_by") and email is not None:
+        row["created_by"] = {"id": str(row["created_by"]), "name": name, "email": email}
+    return row
 
 
 class BaseService:
@@ -22,13 +62,54 @@ class BaseService:
     def __init__(self, table: Table, entity_type: EntityType):
         self.table = table
         self.entity_type = entity_type
+        # Column lookups resolved once; filters/order_by are matched against this map
+        self._columns = {column.key: column for column in table.c}
+        self._has_deleted_at = "deleted_at" in self._columns
+        self._has_created_at = "created_at" in self._columns
+        self._has_created_by = "created_by" in self._columns
+        # Point lookup by id, compiled once per service
+        self._select_by_id_sql = prepared_queries.compile_statement(
+            sqlalchemy.select(table).where(table.c.id == sqlalchemy.bindparam("entity_id"))
+        )
+        # Point lookup with the creator joined in (get_by_id_enhanced), compiled once per service
+        self._select_enhanced_by_id_sql = prepared_queries.compile_statement(
+            self._enhanced_select().where(table.c.id == sqlalchemy.bindparam("entity_id"))
+        ) if self._has_created_by else None
+        # Existence checks keyed by include_deleted, compiled once per service
+        self._exists_sql = {
+            include_deleted: prepared_queries.compile_statement(
+                sqlalchemy.select(sqlalchemy.exists().where(
+                    *self._id_conditions(sqlalchemy.bindparam("entity_id"), include_deleted)
+                ))
+            )
+            for include_deleted in (False, True)
+        }
+
+    def _enhanced_select(self):
+        """SELECT of the table plus the creator's name/email (CREATED_BY_COLUMNS labels)"""
+        creator = users_table.alias("cu")
+        return sqlalchemy.select(
+            self.table,
+            creator.c.name.label("created_by_name"),
+            creator.c.email.label("created_by_email")
+        ).select_from(
+            self.table.outerjoin(creator, creator.c.id == self.table.c.created_by)
+        )
+
+    def _id_conditions(self, entity_id: Any, include_deleted: bool) -> List[Any]:
+        """Conditions matching one entity by id (skipping soft-deleted rows unless asked)"""
+        conditions = [self.table.c.id == entity_id]
+        if not include_deleted and self._has_deleted_at:
+            conditions.append(self.table.c.deleted_at.is_(None))
+        return conditions
     
     async def create(
         self,
         data: Dict[str, Any],
         actor_id: str,
         project_id: Optional[str] = None,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        extra_returning: Optional[List[Any]] = None
     ) -> Dict[str, Any]:
         """
         Create a new entity
@@ -38,6 +119,8 @@ class BaseService:
             actor_id: ID of user creating the entity
             project_id: Project context
             ip_address: IP address of actor
+            extra_returning: Labeled expressions evaluated by INSERT ... RETURNING
+                (e.g. related names) and merged into the returned data
             
         Returns:
             Created entity data
@@ -45,11 +128,12 @@ class BaseService:
         
         # Generate ID if not provided
         if "id" not in data:
-            data["id"] = str(uuid.uuid4())
+            data["id"] = str(uuid7())
         
         # Add timestamps
-        data["created_at"] = datetime.utcnow()
-        data["updated_at"] = datetime.utcnow()
+        now = datetime.utcnow()
+        data["created_at"] = now
+        data["updated_at"] = now
         
         # Add created_by if not provided and actor_id is available
         if "created_by" not in data and actor_id:
@@ -57,7 +141,13 @@ class BaseService:
         
         # Insert into database
         query = self.table.insert().values(data)
-        await database.execute(query)
+        extra_data = {}
+        if extra_returning:
+            row = await database.fetch_one(query.returning(*extra_returning))
+            extra_data = dict(row) if row else {}
+        else:
+            await database.execute(query)
+        list_page_cache.clear()
         
         # Log the creation
         await AuditLogger.log_create(
@@ -69,7 +159,7 @@ class BaseService:
             ip_address=ip_address
         )
         
-        return data
+        return {**data, **extra_data} if extra_data else data
     
     async def get_by_id(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -82,18 +172,52 @@ class BaseService:
             Entity data if found
         """
         
-        query = sqlalchemy.select(self.table).where(
-            self.table.c.id == entity_id
-        )
-        result = await database.fetch_one(query)
+        result = await prepared_queries.fetchrow(self._select_by_id_sql, str(entity_id))
         return dict(result) if result else None
     
-    async def enhance_created_by_info(self, entity: Dict[str, Any]) -> Dict[str, Any]:
+    async def get_created_by_users(self, entities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Batch-load creator info for a list of entities in a single query
+        
+        Args:
+            entities: Entity data with created_by UUIDs
+            
+        Returns:
+            Map of str(user_id) -> user row (id, name, email)
+        """
+        creator_ids = {
+            str(entity['created_by']) for entity in entities
+            if entity and entity.get('created_by') and not isinstance(entity['created_by'], dict)
+        }
+        users_map = {}
+        missing_ids = []
+        for creator_id in creator_ids:
+            user = creator_cache.get(creator_id)
+            if user is None:
+                missing_ids.append(creator_id)
+            else:
+                users_map[creator_id] = user
+        
+        if missing_ids:
+            users = await prepared_queries.fetch(prepared_queries.SELECT_USERS_BY_IDS, missing_ids)
+            for user in users:
+                users_map[str(user["id"])] = user
+                creator_cache.set(str(user["id"]), user)
+        return users_map
+    
+    async def enhance_created_by_info(
+        self,
+        entity: Dict[str, Any],
+        users_map: Optional[Dict[str, Any]] = None,
+        copy: bool = True
+    ) -> Dict[str, Any]:
         """
         Enhance entity with full created_by information (id, name, email)
         
         Args:
             entity: Entity data with created_by UUID
+            users_map: Preloaded creators from get_created_by_users (skips the per-entity query)
+            copy: Return a copy; pass False for a fresh dict the caller owns to update it in place
             
         Returns:
             Enhanced entity with created_by as {id, name, email}
@@ -104,27 +228,56 @@ class BaseService:
         # Check if already enhanced (created_by is dict instead of UUID)
         if isinstance(entity['created_by'], dict):
             return entity
-            
-        from app.db.database import users_table
         
-        # Get user info for created_by
-        user_query = sqlalchemy.select(users_table).where(
-            users_table.c.id == entity['created_by']
-        )
-        user = await database.fetch_one(user_query)
+        creator_id = str(entity['created_by'])
+        if users_map is not None:
+            user = users_map.get(creator_id)
+        else:
+            # Get user info for created_by (cached for 60s)
+            user = creator_cache.get(creator_id)
+            if user is None:
+                user = await prepared_queries.fetchrow(prepared_queries.SELECT_USER_BRIEF, creator_id)
+                if user:
+                    creator_cache.set(creator_id, user)
         
         if user:
             # Replace created_by UUID with full info
-            enhanced_entity = entity.copy()
+            enhanced_entity = entity.copy() if copy else entity
             enhanced_entity['created_by'] = {
-                'id': str(user.id),
-                'name': user.name,
-                'email': user.email
+                'id': str(user['id']),
+                'name': user['name'],
+                'email': user['email']
             }
             return enhanced_entity
         
         return entity
     
+    async def enhance_created_by_info_many(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enhance a list of entities with created_by info from one batched creator lookup
+        
+        Args:
+            entities: Entity data with created_by UUIDs
+            
+        Returns:
+            Enhanced entities, in the same order
+        """
+        users_map = await self.get_created_by_users(entities)
+        # One created_by dict per creator, shared by all of their rows
+        creators = {
+            user_id: {'id': str(user['id']), 'name': user['name'], 'email': user['email']}
+            for user_id, user in users_map.items()
+        }
+        # Spliced in place from the map; no per-entity coroutine or query
+        enhanced = []
+        for entity in entities:
+            creator = entity.get('created_by') if entity else None
+            created_by = creators.get(str(creator)) if creator and not isinstance(creator, dict) else None
+            if created_by:
+                entity = {**entity, 'created_by': created_by}
+            enhanced.append(entity)
+        return enhanced
+    
     async def get_by_id_enhanced(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """
         Get entity by ID with enhanced created_by information
@@ -135,11 +288,11 @@ class BaseService:
         Returns:
             Enhanced entity data if found
         """
-        entity = await self.get_by_id(entity_id)
-        if not entity:
-            return None
-            
-        return await self.enhance_created_by_info(entity)
+        if self._select_enhanced_by_id_sql is None:
+            return await self.get_by_id(entity_id)
+        
+        row = await prepared_queries.fetchrow(self._select_enhanced_by_id_sql, str(entity_id))
+        return attach_created_by(dict(row)) if row else None
     
     async def update(
         self,
@@ -147,7 +300,9 @@ class BaseService:
         update_data: Dict[str, Any],
         actor_id: str,
         project_id: Optional[str] = None,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        current_data: Optional[Dict[str, Any]] = None,
+        extra_returning: Optional[List[Any]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Update an entity
@@ -158,13 +313,17 @@ class BaseService:
             actor_id: ID of user updating the entity
             project_id: Project context
             ip_address: IP address of actor
+            current_data: Entity data already fetched by the caller (skips the re-fetch)
+            extra_returning: Labeled expressions evaluated by UPDATE ... RETURNING
+                (e.g. related names, counts) and merged into the returned data
             
         Returns:
             Updated entity data
         """
         
         # Get current data for audit log
-        current_data = await self.get_by_id(entity_id)
+        if current_data is None:
+            current_data = await self.get_by_id(entity_id)
         if not current_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -174,15 +333,21 @@ class BaseService:
         # Add update timestamp
         update_data["updated_at"] = datetime.utcnow()
         
-        # Update in database
+        # Update in database and read back the new row in the same statement
         query = self.table.update().where(
             self.table.c.id == entity_id
-        ).values(update_data)
+        ).values(update_data).returning(*self.table.c, *(extra_returning or []))
         
-        await database.execute(query)
+        row = await database.fetch_one(query)
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{self.entity_type.value.title()} not found"
+            )
+        list_page_cache.clear()
         
-        # Get updated data
-        updated_data = await self.get_by_id(entity_id)
+        returned_data = dict(row)
+        updated_data = {key: returned_data[key] for key in self._columns}
         
         # Log the update
         await AuditLogger.log_update(
@@ -195,7 +360,7 @@ class BaseService:
             ip_address=ip_address
         )
         
-        return updated_data
+        return returned_data
     
     async def delete(
         self,
@@ -203,7 +368,8 @@ class BaseService:
         actor_id: str,
         project_id: Optional[str] = None,
         ip_address: Optional[str] = None,
-        soft_delete: bool = True
+        soft_delete: bool = True,
+        current_data: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
         Delete an entity
@@ -214,34 +380,45 @@ class BaseService:
             project_id: Project context
             ip_address: IP address of actor
             soft_delete: Whether to perform soft delete
+            current_data: Entity data already fetched by the caller (skips the re-fetch)
             
         Returns:
             True if deleted successfully
         """
         
-        # Get current data for audit log
-        current_data = await self.get_by_id(entity_id)
-        if not current_data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"{self.entity_type.value.title()} not found"
-            )
-        
-        if soft_delete and "deleted_at" in self.table.c:
+        if soft_delete and self._has_deleted_at:
             # Soft delete
+            now = datetime.utcnow()
             query = self.table.update().where(
                 self.table.c.id == entity_id
             ).values(
-                deleted_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                deleted_at=now,
+                updated_at=now
             )
+            if current_data is None:
+                # Return the row as it was before the update (a CTE reads the pre-statement snapshot)
+                before = sqlalchemy.select(self.table).where(self.table.c.id == entity_id).cte("before_delete")
+                query = query.where(self.table.c.id == before.c.id).returning(*before.c)
         else:
             # Hard delete
             query = self.table.delete().where(
                 self.table.c.id == entity_id
             )
-        
-        await database.execute(query)
+            if current_data is None:
+                query = query.returning(*self.table.c)
+        
+        if current_data is None:
+            # Delete and read the row for the audit log in one round-trip
+            row = await database.fetch_one(query)
+            if not row:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"{self.entity_type.value.title()} not found"
+                )
+            current_data = dict(row)
+        else:
+            await database.execute(query)
+        list_page_cache.clear()
         
         # Log the deletion
         await AuditLogger.log_delete(
@@ -255,6 +432,57 @@ class BaseService:
         
         return True
     
+    def _filter_conditions(
+        self,
+        filters: Optional[Dict[str, Any]],
+        include_deleted: bool
+    ) -> List[Any]:
+        """WHERE conditions shared by list_entities and count_entities"""
+        conditions = []
+        
+        # Exclude soft-deleted entities by default
+        if not include_deleted and self._has_deleted_at:
+            conditions.append(self.table.c.deleted_at.is_(None))
+        
+        if filters:
+            for key, value in filters.items():
+                column = self._columns.get(key)
+                if column is not None:
+                    if isinstance(value, list):
+                        conditions.append(column.in_(value))
+                    else:
+                        conditions.append(column == value)
+        return conditions
+    
+    def _page_query(
+        self,
+        query,
+        filters: Optional[Dict[str, Any]],
+        order_by: Optional[str],
+        order_desc: bool,
+        limit: int,
+        offset: int,
+        include_deleted: bool
+    ):
+        """Apply filters, ordering and pagination to a SELECT over self.table"""
+        conditions = self._filter_conditions(filters, include_deleted)
+        if conditions:
+            query = query.where(sqlalchemy.and_(*conditions))
+        
+        # Apply ordering
+        order_column = self._columns.get(order_by) if order_by else None
+        if order_column is not None:
+            if order_desc:
+                order_column = order_column.desc()
+            query = query.order_by(order_column)
+        else:
+            # Default ordering by created_at descending
+            if self._has_created_at:
+                query = query.order_by(self.table.c.created_at.desc())
+        
+        # Apply pagination
+        return query.limit(limit).offset(offset)
+    
     async def list_entities(
         self,
         filters: Optional[Dict[str, Any]] = None,
@@ -279,39 +507,9 @@ class BaseService:
             List of entities
         """
         
-        query = sqlalchemy.select(self.table)
-        
-        # Apply filters
-        conditions = []
-        
-        # Exclude soft-deleted entities by default
-        if not include_deleted and "deleted_at" in self.table.c:
-            conditions.append(self.table.c.deleted_at.is_(None))
-        
-        if filters:
-            for key, value in filters.items():
-                if hasattr(self.table.c, key):
-                    if isinstance(value, list):
-                        conditions.append(getattr(self.table.c, key).in_(value))
-                    else:
-                        conditions.append(getattr(self.table.c, key) == value)
-        
-        if conditions:
-            query = query.where(sqlalchemy.and_(*conditions))
-        
-        # Apply ordering
-        if order_by and hasattr(self.table.c, order_by):
-            order_column = getattr(self.table.c, order_by)
-            if order_desc:
-                order_column = order_column.desc()
-            query = query.order_by(order_column)
-        else:
-            # Default ordering by created_at descending
-            if "created_at" in self.table.c:
-                query = query.order_by(self.table.c.created_at.desc())
-        
-        # Apply pagination
-        query = query.limit(limit).offset(offset)
+        query = self._page_query(
+            sqlalchemy.select(self.table), filters, order_by, order_desc, limit, offset, include_deleted
+        )
         
         results = await database.fetch_all(query)
         return [dict(row) for row in results]
@@ -328,22 +526,23 @@ class BaseService:
         """
         List entities with enhanced created_by information
         """
-        entities = await self.list_entities(
-            filters=filters,
-            order_by=order_by,
-            order_desc=order_desc,
-            limit=limit,
-            offset=offset,
-            include_deleted=include_deleted
+        if not self._has_created_by:
+            return await self.list_entities(
+                filters=filters,
+                order_by=order_by,
+                order_desc=order_desc,
+                limit=limit,
+                offset=offset,
+                include_deleted=include_deleted
+            )
+        
+        # Creator joined into the page query; each row dict is reshaped in place
+        query = self._page_query(
+            self._enhanced_select(), filters, order_by, order_desc, limit, offset, include_deleted
         )
         
-        # Enhance each entity
-        enhanced_entities = []
-        for entity in entities:
-            enhanced_entity = await self.enhance_created_by_info(entity)
-            enhanced_entities.append(enhanced_entity)
-            
-        return enhanced_entities
+        results = await database.fetch_all(query)
+        return [attach_created_by(dict(row)) for row in results]
     
     async def count_entities(
         self,
@@ -363,21 +562,7 @@ class BaseService:
         
         query = sqlalchemy.select(sqlalchemy.func.count(self.table.c.id))
         
-        # Apply filters
-        conditions = []
-        
-        # Exclude soft-deleted entities by default
-        if not include_deleted and "deleted_at" in self.table.c:
-            conditions.append(self.table.c.deleted_at.is_(None))
-        
-        if filters:
-            for key, value in filters.items():
-                if hasattr(self.table.c, key):
-                    if isinstance(value, list):
-                        conditions.append(getattr(self.table.c, key).in_(value))
-                    else:
-                        conditions.append(getattr(self.table.c, key) == value)
-        
+        conditions = self._filter_conditions(filters, include_deleted)
         if conditions:
             query = query.where(sqlalchemy.and_(*conditions))
         
@@ -395,18 +580,7 @@ class BaseService:
         Returns:
             True if entity exists
         """
-        
-        conditions = [self.table.c.id == entity_id]
-        
-        if not include_deleted and "deleted_at" in self.table.c:
-            conditions.append(self.table.c.deleted_at.is_(None))
-        
-        query = sqlalchemy.select(
-            sqlalchemy.func.count(self.table.c.id)
-        ).where(sqlalchemy.and_(*conditions))
-        
-        count = await database.fetch_val(query)
-        return count > 0
+        return await prepared_queries.fetchval(self._exists_sql[include_deleted], str(entity_id))
     
     async def validate_entity_access(
         self,
@@ -448,7 +622,8 @@ class BaseService:
             HTTPException if required fields are missing
         """
         
-        missing_fields = [field for field in required_fields if field not in data or data[field] is None]
+        # One lookup per field; a missing key and an explicit None both count as missing
+        missing_fields = [field for field in required_fields if data.get(field) is None]
         
         if missing_fields:
             raise HTTPException(
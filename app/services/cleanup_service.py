@@ -0,0 +1,76 @@
+"""
+Background cleanup of expired temporary rows
+One periodic batch DELETE per table replaces per-request cleanup queries
+Also keeps the monthly audit_logs partitions rolling
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+import sqlalchemy
+
+from app.db.database import (auth_sessions_table, database,
+                             temp_registrations_table)
+from app.services.audit_service import AuditLogger
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_INTERVAL_SECONDS = 60
+AUDIT_PARTITION_INTERVAL_SECONDS = 3600
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def cleanup_expired_rows() -> None:
+    """Delete expired registrations and auth sessions"""
+    now = datetime.utcnow()
+    await database.execute(
+        sqlalchemy.delete(temp_registrations_table).where(temp_registrations_table.c.otp_expires_at < now)
+    )
+    await database.execute(
+        sqlalchemy.delete(auth_sessions_table).where(auth_sessions_table.c.expires_at < now)
+    )
+
+
+async def _maintain_audit_partitions() -> None:
+    try:
+        await AuditLogger.maintain_partitions()
+    except Exception:
+        logger.warning("audit partition maintenance failed", exc_info=True)
+
+
+async def _cleanup_loop() -> None:
+    # Partitions first, so the current month exists before the first audit insert
+    await _maintain_audit_partitions()
+    last_partition_run = time.monotonic()
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+        try:
+            await cleanup_expired_rows()
+        except Exception:
+            logger.warning("expired row cleanup failed", exc_info=True)
+        if time.monotonic() - last_partition_run >= AUDIT_PARTITION_INTERVAL_SECONDS:
+            await _maintain_audit_partitions()
+            last_partition_run = time.monotonic()
+
+
+def start_cleanup_task() -> None:
+    """Start the periodic cleanup task (call on startup)"""
+    global _cleanup_task
+    if _cleanup_task is None:
+        _cleanup_task = asyncio.create_task(_cleanup_loop())
+
+
+async def stop_cleanup_task() -> None:
+    """Cancel the periodic cleanup task (call on shutdown)"""
+    global _cleanup_task
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
+        try:
+            await _cleanup_task
+        except asyncio.CancelledError:
+            pass
+        _cleanup_task = None
@@ -1,21 +1,124 @@
+import asyncio
+import logging
+import string
+from contextlib import asynccontextmanager
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from typing import Optional
 
 import aiosmtplib
 
 from app.core.config import (ADMIN_EMAIL, FROM_EMAIL, SMTP_PASSWORD, SMTP_PORT,
                              SMTP_SERVER, SMTP_USERNAME)
 
+logger = logging.getLogger(__name__)
+
+# SMTP connection pool - reuse authenticated STARTTLS sessions across sends
+SMTP_POOL_SIZE = 4
+SMTP_KEEPALIVE_SECONDS = 30
+
+_smtp_pool: Optional[asyncio.Queue] = None
+_smtp_keepalive_task: Optional[asyncio.Task] = None
+
+
+def _get_smtp_pool() -> asyncio.Queue:
+    """Get the pool, creating it with empty slots (connections open lazily)"""
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = asyncio.Queue(maxsize=SMTP_POOL_SIZE)
+        for _ in range(SMTP_POOL_SIZE):
+            _smtp_pool.put_nowait(None)
+    return _smtp_pool
+
+
+async def _open_smtp_connection() -> aiosmtplib.SMTP:
+    """Open a new SMTP connection (connect performs STARTTLS and login)"""
+    smtp = aiosmtplib.SMTP(
+        hostname=SMTP_SERVER,
+        port=SMTP_PORT,
+        start_tls=True,
+        username=SMTP_USERNAME,
+        password=SMTP_PASSWORD,
+    )
+    await smtp.connect()
+    return smtp
+
+
+def _discard_smtp_connection(smtp: Optional[aiosmtplib.SMTP]) -> None:
+    """Close a connection that can no longer be reused"""
+    if smtp is not None:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
+@asynccontextmanager
+async def smtp_connection():
+    """Borrow a pooled SMTP connection, reconnecting if it was dropped"""
+    pool = _get_smtp_pool()
+    smtp = await pool.get()
+    try:
+        if smtp is None or not smtp.is_connected:
+            _discard_smtp_connection(smtp)
+            smtp = None
+            smtp = await _open_smtp_connection()
+        yield smtp
+    except BaseException:
+        _discard_smtp_connection(smtp)
+        smtp = None
+        raise
+    finally:
+        pool.put_nowait(smtp)
+
+
+async def _smtp_keepalive_loop():
+    """Send NOOP on idle pooled connections so the server does not drop them"""
+    while True:
+        await asyncio.sleep(SMTP_KEEPALIVE_SECONDS)
+        pool = _get_smtp_pool()
+        for _ in range(pool.qsize()):
+            smtp = pool.get_nowait()
+            if smtp is not None:
+                try:
+                    await smtp.noop()
+                except Exception:
+                    _discard_smtp_connection(smtp)
+                    smtp = None
+            pool.put_nowait(smtp)
+
+
+async def init_smtp_pool():
+    """Create the SMTP pool and start its keepalive task (call on startup)"""
+    global _smtp_keepalive_task
+    _get_smtp_pool()
+    if _smtp_keepalive_task is None:
+        _smtp_keepalive_task = asyncio.create_task(_smtp_keepalive_loop())
+
+
+async def close_smtp_pool():
+    """Stop keepalive and close pooled connections (call on shutdown)"""
+    global _smtp_keepalive_task
+    if _smtp_keepalive_task is not None:
+        _smtp_keepalive_task.cancel()
+        _smtp_keepalive_task = None
+
+    pool = _get_smtp_pool()
+    for _ in range(pool.qsize()):
+        smtp = pool.get_nowait()
+        if smtp is not None:
+            try:
+                await smtp.quit()
+            except Exception:
+                _discard_smtp_connection(smtp)
+        pool.put_nowait(None)
+
 
 async def send_email(to_email: str, subject: str, body: str) -> bool:
     """Send email using SMTP"""
     try:
-        print(f"🔧 DEBUG: Attempting to send email")
-        print(f"🔧 DEBUG: To: {to_email}")
-        print(f"🔧 DEBUG: Subject: {subject}")
-        print(f"🔧 DEBUG: SMTP Server: {SMTP_SERVER}:{SMTP_PORT}")
-        print(f"🔧 DEBUG: Username: {SMTP_USERNAME}")
-        print(f"🔧 DEBUG: From Email: {FROM_EMAIL}")
+        logger.debug("Sending email to %s (subject %r) via %s:%s as %s from %s",
+                     to_email, subject, SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, FROM_EMAIL)
         
         # Create message
         message = MIMEMultipart()
@@ -25,38 +128,30 @@ async def send_email(to_email: str, subject: str, body: str) -> bool:
 
         # Add body to email
         message.attach(MIMEText(body, "plain"))
+
+        # Send email over a pooled connection
+        async with smtp_connection() as smtp:
+            await smtp.send_message(message)
         
-        print(f"🔧 DEBUG: Message created, sending...")
-
-        # Send email
-        await aiosmtplib.send(
-            message,
-            hostname=SMTP_SERVER,
-            port=SMTP_PORT,
-            start_tls=True,
-            username=SMTP_USERNAME,
-            password=SMTP_PASSWORD,
-        )
-        
-        print(f"✅ DEBUG: Email sent successfully to {to_email}")
+        logger.debug("Email sent to %s", to_email)
         return True
-    except Exception as e:
-        print(f"❌ ERROR: Failed to send email to {to_email}")
-        print(f"❌ ERROR: {str(e)}")
-        print(f"❌ ERROR Type: {type(e).__name__}")
-        import traceback
-        print(f"❌ TRACEBACK: {traceback.format_exc()}")
+    except Exception:
+        logger.exception("Failed to send email to %s", to_email)
         return False
 
 
-async def send_otp_email(to_email: str, otp: str, purpose: str = "verification") -> bool:
-    """Send OTP via email"""
-    if purpose == "registration":
-        subject = "Mã xác thực đăng ký"
-        body = f"""
+# OTP email subjects/bodies by purpose, built once; only the OTP is substituted per send
+_OTP_SUBJECTS = {
+    "registration": "Mã xác thực đăng ký",
+    "approval": "Tài khoản của bạn đã được phê duyệt",
+    "login": "Mã xác thực đăng nhập",
+}
+
+_OTP_TEMPLATES = {
+    "registration": string.Template("""
         Chào bạn,
 
-        Mã OTP để hoàn thành đăng ký tài khoản của bạn là: {otp}
+        Mã OTP để hoàn thành đăng ký tài khoản của bạn là: $otp
 
         Mã này sẽ hết hạn sau 5 phút.
 
@@ -64,10 +159,8 @@ async def send_otp_email(to_email: str, otp: str, purpose: str = "verification")
 
         Trân trọng,
         Đội ngũ hỗ trợ
-        """
-    elif purpose == "approval":
-        subject = "Tài khoản của bạn đã được phê duyệt"
-        body = f"""
+        """),
+    "approval": string.Template("""
         Chào bạn,
 
         Chúc mừng! Tài khoản của bạn đã được admin phê duyệt.
@@ -76,13 +169,11 @@ async def send_otp_email(to_email: str, otp: str, purpose: str = "verification")
 
         Trân trọng,
         Đội ngũ hỗ trợ
-        """
-    else:  # login
-        subject = "Mã xác thực đăng nhập"
-        body = f"""
+        """),
+    "login": string.Template("""
         Chào bạn,
 
-        Mã OTP để đăng nhập vào tài khoản của bạn là: {otp}
+        Mã OTP để đăng nhập vào tài khoản của bạn là: $otp
 
         Mã này sẽ hết hạn sau 5 phút.
 
@@ -90,9 +181,16 @@ async def send_otp_email(to_email: str, otp: str, purpose: str = "verification")
 
         Trân trọng,
         Đội ngũ hỗ trợ
-        """
+        """),
+}
+
 
-    return await send_email(to_email, subject, body)
+async def send_otp_email(to_email: str, otp: str, purpose: str = "verification") -> bool:
+    """Send OTP via email"""
+    if purpose not in _OTP_TEMPLATES:  # any other purpose gets the login email
+        purpose = "login"
+    body = _OTP_TEMPLATES[purpose].substitute(otp=otp)
+    return await send_email(to_email, _OTP_SUBJECTS[purpose], body)
 
 # Mock SMS function (you would integrate with a real SMS service)
 
@@ -134,6 +232,6 @@ async def send_admin_notification(user_data: dict) -> bool:
 
     try:
         return await send_email(ADMIN_EMAIL, subject, body)
-    except Exception as e:
-        print(f"Error sending admin notification: {e}")
+    except Exception:
+        logger.exception("Failed to send admin notification")
         return False
\ No newline at end of file
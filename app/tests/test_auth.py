@@ -8,9 +8,11 @@ import sqlalchemy
 from httpx import AsyncClient
 from app.main import app
 
+from app.api.v1.users_admin import auth_routes
 from app.db.database import (auth_sessions_table, database,
                              temp_registrations_table, temp_sessions_table,
-                             users_table)
+                             user_credentials_table, users_table)
+from app.utils import hash_password, verify_password
 
 
 @pytest.fixture
@@ -108,6 +110,112 @@ class TestLogin:
         assert data["detail"]["status"] == "error"
 
 
+@pytest.fixture
+async def approved_user(setup_database):
+    """Approved user with password123 as password"""
+    user_id = await database.execute(
+        sqlalchemy.insert(users_table).values(
+            name="Reset User",
+            email="reset@example.com",
+            phone="0987654329",
+            is_approved=True
+        ).returning(users_table.c.id)
+    )
+    await database.execute(sqlalchemy.insert(user_credentials_table).values(
+        user_id=user_id,
+        password_hash=hash_password("password123")
+    ))
+    return user_id
+
+
+@pytest.fixture
+def sent_otps(monkeypatch):
+    """Capture the OTPs the reset endpoints would email"""
+    otps = []
+
+    async def fake_send_otp_email(email, otp, purpose):
+        otps.append(otp)
+
+    monkeypatch.setattr(auth_routes, "send_otp_email", fake_send_otp_email)
+    return otps
+
+
+async def get_password_hash(user_id) -> str:
+    return await database.fetch_val(
+        sqlalchemy.select(user_credentials_table.c.password_hash)
+        .where(user_credentials_table.c.user_id == user_id)
+    )
+
+
+class TestPasswordReset:
+
+    @pytest.mark.asyncio
+    async def test_reset_password_round_trip(self, client: AsyncClient, approved_user, sent_otps):
+        """Test forgot -> verify OTP -> reset"""
+        response = await client.post("/api/v1/auth/forgot-password", json={"email": "reset@example.com"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert "temp_password_reset_id" in response.cookies
+        assert len(sent_otps) == 1
+
+        response = await client.post("/api/v1/auth/verify-reset-otp", json={"otp": sent_otps[0]})
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+
+        response = await client.post("/api/v1/auth/reset-password", json={
+            "password": "newpassword123",
+            "confirm_password": "newpassword123"
+        })
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert verify_password("newpassword123", await get_password_hash(approved_user))
+
+    @pytest.mark.asyncio
+    async def test_verify_reset_otp_wrong_code(self, client: AsyncClient, approved_user, sent_otps):
+        """Test OTP verification with a wrong code"""
+        await client.post("/api/v1/auth/forgot-password", json={"email": "reset@example.com"})
+        wrong_otp = "000000" if sent_otps[0] != "000000" else "111111"
+
+        response = await client.post("/api/v1/auth/verify-reset-otp", json={"otp": wrong_otp})
+
+        assert response.status_code == 400
+        data = response.json()
+        assert data["detail"]["status"] == "error"
+        assert "không hợp lệ" in data["detail"]["message"]
+
+        # An unverified token cannot set a password
+        response = await client.post("/api/v1/auth/reset-password", json={
+            "password": "newpassword123",
+            "confirm_password": "newpassword123"
+        })
+        assert response.status_code == 400
+        assert verify_password("password123", await get_password_hash(approved_user))
+
+    @pytest.mark.asyncio
+    async def test_reset_token_reuse_after_password_change(self, client: AsyncClient, approved_user, sent_otps):
+        """Test that a verified reset token stops working once the password changed"""
+        await client.post("/api/v1/auth/forgot-password", json={"email": "reset@example.com"})
+        await client.post("/api/v1/auth/verify-reset-otp", json={"otp": sent_otps[0]})
+        verified_token = client.cookies["temp_password_reset_id"]
+
+        response = await client.post("/api/v1/auth/reset-password", json={
+            "password": "newpassword123",
+            "confirm_password": "newpassword123"
+        })
+        assert response.status_code == 200
+
+        # Replay the same token: the password hash fingerprint no longer matches
+        response = await client.post("/api/v1/auth/reset-password", json={
+            "password": "otherpassword123",
+            "confirm_password": "otherpassword123"
+        }, headers={"Cookie": f"temp_password_reset_id={verified_token}"})
+
+        assert response.status_code == 400
+        data = response.json()
+        assert data["detail"]["status"] == "error"
+        assert verify_password("newpassword123", await get_password_hash(approved_user))
+
+
 class TestHealthCheck:
 
     @pytest.mark.asyncio
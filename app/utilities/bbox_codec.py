@@ -0,0 +1,78 @@
+"""
+Binary packing of AI bounding boxes
+Compact BYTEA form of damage_assessments.ai_bounding_boxes for the AI pipeline
+
+Layout (little-endian):
+    uint16 box_count, uint16 label_count
+    box_count x 5 float32   (x, y, width, height, confidence)
+    box_count x uint16      (index into the label table)
+    label_count x (uint16 length + UTF-8 bytes)
+"""
+
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_HEADER = struct.Struct("<HH")
+_LABEL_LEN = struct.Struct("<H")
+BOX_FIELDS = ("x", "y", "width", "height", "confidence")
+
+
+def pack_bounding_boxes(boxes: Optional[List[Dict[str, Any]]]) -> Optional[bytes]:
+    """Pack [{x, y, width, height, type, confidence}] into bytes (None stays None)"""
+    if boxes is None:
+        return None
+
+    labels: Dict[str, int] = {}
+    label_ids = []
+    values = []
+    for box in boxes:
+        values.extend(float(box[field]) for field in BOX_FIELDS)
+        label_ids.append(labels.setdefault(str(box["type"]), len(labels)))
+
+    count = len(boxes)
+    parts = [
+        _HEADER.pack(count, len(labels)),
+        struct.pack(f"<{count * len(BOX_FIELDS)}f", *values),
+        struct.pack(f"<{count}H", *label_ids),
+    ]
+    for label in labels:
+        encoded = label.encode("utf-8")
+        parts.append(_LABEL_LEN.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def bounding_boxes_array(data: bytes) -> np.ndarray:
+    """View the packed numbers as a (box_count, 5) float32 array without building dicts"""
+    count, _ = _HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype="<f4", count=count * len(BOX_FIELDS),
+                         offset=_HEADER.size).reshape(-1, len(BOX_FIELDS))
+
+
+def unpack_bounding_boxes(data: Optional[bytes]) -> Optional[List[Dict[str, Any]]]:
+    """Unpack bytes from pack_bounding_boxes back into box dicts"""
+    if data is None:
+        return None
+
+    count, label_count = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    values = struct.unpack_from(f"<{count * len(BOX_FIELDS)}f", data, offset)
+    offset += 4 * count * len(BOX_FIELDS)
+    label_ids = struct.unpack_from(f"<{count}H", data, offset)
+    offset += 2 * count
+
+    labels = []
+    for _ in range(label_count):
+        (length,) = _LABEL_LEN.unpack_from(data, offset)
+        offset += _LABEL_LEN.size
+        labels.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+
+    boxes = []
+    for i in range(count):
+        box = dict(zip(BOX_FIELDS, values[i * len(BOX_FIELDS):(i + 1) * len(BOX_FIELDS)]))
+        box["type"] = labels[label_ids[i]]
+        boxes.append(box)
+    return boxes
@@ -0,0 +1,44 @@
+"""
+ID generation utilities
+Time-ordered UUIDv7 for rows generated in the app, matching the uuidv7() column default
+"""
+
+import os
+import threading
+import time
+import uuid
+
+_TIMESTAMP_MASK = (1 << 48) - 1
+_RANDOM_MASK = (1 << 74) - 1
+
+# Random bits for 4096 ids are read with one urandom call and handed out 10 bytes at a time
+_RANDOM_BYTES_PER_ID = 10
+_RANDOM_POOL_IDS = 4096
+_random_pool = b""
+_random_offset = 0
+_random_lock = threading.Lock()
+
+
+def _random_bits() -> int:
+    global _random_pool, _random_offset
+    with _random_lock:
+        if _random_offset >= len(_random_pool):
+            _random_pool = os.urandom(_RANDOM_BYTES_PER_ID * _RANDOM_POOL_IDS)
+            _random_offset = 0
+        start = _random_offset
+        _random_offset += _RANDOM_BYTES_PER_ID
+        return int.from_bytes(_random_pool[start:start + _RANDOM_BYTES_PER_ID], "big")
+
+
+def uuid7() -> uuid.UUID:
+    """UUIDv7: 48-bit unix milliseconds, version 7, RFC 4122 variant, 74 random bits"""
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = _random_bits() & _RANDOM_MASK
+    value = (
+        (timestamp_ms & _TIMESTAMP_MASK) << 80
+        | 0x7 << 76
+        | (rand >> 62) << 64
+        | 0b10 << 62
+        | rand & ((1 << 62) - 1)
+    )
+    return uuid.UUID(int=value)
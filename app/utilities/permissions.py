@@ -3,33 +3,156 @@ Permission utilities for project management
 Handles authorization logic for different user roles
 """
 
-from typing import Optional, Dict, Any
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
 from fastapi import HTTPException, Request, status
-import sqlalchemy
-from app.db.database import database, project_members_table, projects_table
+from app.db import prepared_queries
 from app.db.models import ProjectRole
+from app.utilities.cache import TTLCache
 
+# Membership ({"role", "can_invite"}) per (user_id, project_id).
+# Entries are dropped by invalidate_project_membership whenever a membership changes.
+project_membership_cache = TTLCache(ttl_seconds=60, maxsize=10000)
 
-async def get_user_project_role(user_id: str, project_id: str) -> Optional[ProjectRole]:
-    """Get user's role in a specific project"""
-    query = sqlalchemy.select(project_members_table).where(
-        sqlalchemy.and_(
-            project_members_table.c.user_id == user_id,
-            project_members_table.c.project_id == project_id
-        )
+# is_admin_user result per user_id; dropped by invalidate_admin_cache when a user changes
+admin_user_cache = TTLCache(ttl_seconds=60, maxsize=4096)
+
+# (project data, membership) per (user_id, project_id) for the current request only, so
+# repeated access checks in one request share one lookup. Set by ProjectAccessCacheMiddleware.
+_request_access_cache: ContextVar[Optional[Dict[tuple, tuple]]] = ContextVar(
+    "request_access_cache", default=None
+)
+
+# Role tables shared by every access check. ProjectRole is a str enum, so the level
+# table also answers lookups by plain role name ("viewer", "editor", "owner").
+ROLE_LEVELS = {
+    ProjectRole.VIEWER: 1,
+    ProjectRole.EDITOR: 2,
+    ProjectRole.OWNER: 3
+}
+ROLE_PERMISSIONS = {
+    ProjectRole.OWNER: ('read', 'write', 'delete', 'invite', 'manage_members'),
+    ProjectRole.EDITOR: ('read', 'write'),  # No delete permission
+    ProjectRole.VIEWER: ('read',)
+}
+_ROLE_PERMISSION_SETS = {role: frozenset(perms) for role, perms in ROLE_PERMISSIONS.items()}
+_DEFAULT_REQUIRED_PERMISSIONS = frozenset({'read'})
+
+# Error details with fixed messages, built once instead of per raise
+NOT_A_MEMBER_DETAIL = {"status": "error", "message": "Access denied: Not a project member"}
+INSUFFICIENT_ROLE_DETAIL = {"status": "error", "message": "Insufficient role level"}
+CANNOT_INVITE_DETAIL = {"status": "error", "message": "Not authorized to invite members"}
+PROJECT_NOT_FOUND_DETAIL = {"status": "error", "message": "Project not found"}
+MISSING_PARAMETERS_DETAIL = {"status": "error", "message": "Missing required parameters"}
+TURBINE_NOT_FOUND_DETAIL = {"status": "error", "message": "Turbine không tồn tại"}
+
+
+@lru_cache(maxsize=64)
+def role_required_detail(min_role: str) -> Dict[str, str]:
+    """Error detail for a turbine access check that needs min_role (one dict per role)"""
+    return {"status": "error", "message": f"Access denied: Requires {min_role} role or higher"}
+
+
+async def get_project_membership(user_id: str, project_id: str) -> Optional[Dict[str, Any]]:
+    """Get user's membership (role, can_invite) in a project, cached for 60s"""
+    cache_key = (str(user_id), str(project_id))
+    membership = project_membership_cache.get(cache_key)
+    if membership is not None:
+        return membership
+
+    member = await prepared_queries.fetchrow(
+        prepared_queries.SELECT_PROJECT_MEMBERSHIP, str(user_id), str(project_id)
     )
-    member = await database.fetch_one(query)
 
     if not member:
         return None
 
-    return ProjectRole(member["role"])
+    membership = {"role": ProjectRole(member["role"]), "can_invite": bool(member["can_invite"])}
+    project_membership_cache.set(cache_key, membership)
+    return membership
+
+
+async def get_project_with_membership(
+    user_id: str, project_id: str
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Get project data and the user's membership; one query when the membership is not cached"""
+    cache_key = (str(user_id), str(project_id))
+    request_cache = _request_access_cache.get()
+    if request_cache is not None and cache_key in request_cache:
+        project_data, membership = request_cache[cache_key]
+        return dict(project_data), membership
+
+    project_data, membership = await _load_project_with_membership(cache_key)
+    if request_cache is not None:
+        request_cache[cache_key] = (dict(project_data), membership)
+    return project_data, membership
+
+
+async def _load_project_with_membership(
+    cache_key: Tuple[str, str]
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    user_id, project_id = cache_key
+    membership = project_membership_cache.get(cache_key)
+    if membership is not None:
+        return await check_project_exists(project_id), membership
+
+    row = await prepared_queries.fetchrow(
+        prepared_queries.SELECT_PROJECT_WITH_MEMBERSHIP, user_id, project_id
+    )
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=PROJECT_NOT_FOUND_DETAIL
+        )
+
+    project_data = dict(row)
+    role = project_data.pop("member_role")
+    can_invite = project_data.pop("member_can_invite")
+    if role is None:
+        return project_data, None
+
+    membership = {"role": ProjectRole(role), "can_invite": bool(can_invite)}
+    project_membership_cache.set(cache_key, membership)
+    return project_data, membership
+
+
+def invalidate_project_membership(user_id: str, project_id: str) -> None:
+    """Drop the cached membership after it is added, changed or removed"""
+    cache_key = (str(user_id), str(project_id))
+    project_membership_cache.delete(cache_key)
+    request_cache = _request_access_cache.get()
+    if request_cache is not None:
+        request_cache.pop(cache_key, None)
+
+
+class ProjectAccessCacheMiddleware:
+    """ASGI middleware giving each HTTP request its own project access cache"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_access_cache.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_access_cache.reset(token)
+
+
+async def get_user_project_role(user_id: str, project_id: str) -> Optional[ProjectRole]:
+    """Get user's role in a specific project"""
+    membership = await get_project_membership(user_id, project_id)
+    return membership["role"] if membership else None
 
 
 async def check_project_access(
     user_id: str, 
     project_id: str, 
-    required_permissions: list = None,
+    required_permissions: Optional[Iterable[str]] = None,
     required_role_level: int = None
 ) -> Dict[str, Any]:
     """
@@ -47,57 +170,35 @@ async def check_project_access(
     Raises:
         HTTPException: If user doesn't have required access
     """
-    # First check if project exists
-    project_data = await check_project_exists(project_id)
-    
-    # Get user role in project
-    role = await get_user_project_role(user_id, project_id)
+    # Check project exists and load the membership together
+    project_data, membership = await get_project_with_membership(user_id, project_id)
     
-    if not role:
+    if not membership:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail={"status": "error", "message": "Access denied: Not a project member"}
+            detail=NOT_A_MEMBER_DETAIL
         )
     
+    role = membership["role"]
+    
     # Check role level if specified
     if required_role_level is not None:
-        role_levels = {
-            ProjectRole.VIEWER: 1,
-            ProjectRole.EDITOR: 2, 
-            ProjectRole.OWNER: 3
-        }
-        user_level = role_levels.get(role, 0)
-        
-        if user_level < required_role_level:
+        if ROLE_LEVELS.get(role, 0) < required_role_level:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail={"status": "error", "message": "Insufficient role level"}
+                detail=INSUFFICIENT_ROLE_DETAIL
             )
     
     # Check specific permissions if specified
+    user_permissions = ROLE_PERMISSIONS.get(role, ())
     if required_permissions is None:
-        required_permissions = ['read']
-    
-    # Get user role in project
-    role = await get_user_project_role(user_id, project_id)
-    
-    if not role:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"status": "error", "message": "Access denied: Not a project member"}
-        )
-    
-    # Define role permissions
-    role_permissions = {
-        ProjectRole.OWNER: ['read', 'write', 'delete', 'invite', 'manage_members'],
-        ProjectRole.EDITOR: ['read', 'write'],  # No delete permission
-        ProjectRole.VIEWER: ['read']
-    }
-    
-    user_permissions = role_permissions.get(role, [])
-    
-    # Check if user has all required permissions
-    missing_permissions = set(required_permissions) - set(user_permissions)
+        # Default requirement is 'read', which every project role has
+        required_permissions = _DEFAULT_REQUIRED_PERMISSIONS
+        missing_permissions = ()
+    else:
+        # Check if user has all required permissions
+        required_permissions = frozenset(required_permissions)
+        missing_permissions = required_permissions - _ROLE_PERMISSION_SETS.get(role, frozenset())
     
     if missing_permissions:
         raise HTTPException(
@@ -111,19 +212,12 @@ async def check_project_access(
     # Check can_invite permission separately (it's a specific field)
     can_invite = False
     if 'invite' in required_permissions:
-        member_query = sqlalchemy.select(project_members_table).where(
-            sqlalchemy.and_(
-                project_members_table.c.user_id == user_id,
-                project_members_table.c.project_id == project_id
-            )
-        )
-        member = await database.fetch_one(member_query)
-        can_invite = member["can_invite"] if member else False
+        can_invite = membership["can_invite"]
         
         if role != ProjectRole.OWNER and not can_invite:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail={"status": "error", "message": "Not authorized to invite members"}
+                detail=CANNOT_INVITE_DETAIL
             )
     
     # Add role info to project data
@@ -138,26 +232,33 @@ async def check_project_access(
 
 async def check_project_exists(project_id: str) -> Dict[str, Any]:
     """Check if project exists and return project info"""
-    query = sqlalchemy.select(projects_table).where(projects_table.c.id == project_id)
-    project = await database.fetch_one(query)
+    project = await prepared_queries.fetchrow(prepared_queries.PROJECT_BY_ID, str(project_id))
     
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail={"status": "error", "message": "Project not found"}
+            detail=PROJECT_NOT_FOUND_DETAIL
         )
     
     return dict(project)
 
 
 async def is_admin_user(user_id: str) -> bool:
-    """Check if user is a system admin"""
-    from app.db.database import users_table
-    
-    query = sqlalchemy.select(users_table).where(users_table.c.id == user_id)
-    user = await database.fetch_one(query)
-    
-    return user and user.role == 'admin'
+    """Check if user is a system admin (cached for 60s)"""
+    cache_key = str(user_id)
+    is_admin = admin_user_cache.get(cache_key)
+    if is_admin is not None:
+        return is_admin
+
+    user = await prepared_queries.fetchrow(prepared_queries.SELECT_USER_ROLE, cache_key)
+    is_admin = bool(user and user["role"] == 'admin')
+    admin_user_cache.set(cache_key, is_admin)
+    return is_admin
+
+
+def invalidate_admin_cache(user_id: str) -> None:
+    """Drop the cached admin flag after a user's role changes or the user is removed"""
+    admin_user_cache.delete(str(user_id))
 
 
 def require_project_permission(required_permissions: list):
@@ -181,7 +282,7 @@ def require_project_permission(required_permissions: list):
             if not current_user or not project_id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail={"status": "error", "message": "Missing required parameters"}
+                    detail=MISSING_PARAMETERS_DETAIL
                 )
             
             # Check permissions
@@ -236,20 +337,9 @@ class PermissionChecker:
 
 
 async def get_user_projects_with_role(user_id: str) -> list:
-    """Get all projects user is member of with their roles"""
-    query = sqlalchemy.select(
-        projects_table,
-        project_members_table.c.role,
-        project_members_table.c.joined_at
-    ).select_from(
-        projects_table.join(
-            project_members_table,
-            projects_table.c.id == project_members_table.c.project_id
-        )
-    ).where(project_members_table.c.user_id == user_id)
-    
-    results = await database.fetch_all(query)
-    return [dict(row) for row in results]
+    """Get all projects user is member of with their roles (id, name, created_at, role, joined_at)"""
+    rows = await prepared_queries.fetch(prepared_queries.SELECT_USER_PROJECTS_WITH_ROLE, str(user_id))
+    return [dict(row) for row in rows]
 
 
 async def require_project_role(
@@ -271,13 +361,7 @@ async def require_project_role(
     Raises:
         HTTPException: If user doesn't have required role
     """
-    role_levels = {
-        ProjectRole.VIEWER: 1,
-        ProjectRole.EDITOR: 2,
-        ProjectRole.OWNER: 3
-    }
-    
-    required_level = role_levels.get(required_role, 0)
+    required_level = ROLE_LEVELS.get(required_role, 0)
     return await check_project_access(user_id, project_id, required_role_level=required_level)
 
 
@@ -302,58 +386,38 @@ async def check_turbine_access(
     Raises:
         HTTPException: If user doesn't have access or turbine not found
     """
-    from app.db.database import turbines_table, windfarms_table
+    required_level = ROLE_LEVELS.get(min_role.lower(), 1)
+    user_id = str(current_user['id'])
     
-    # Get turbine with windfarm and project info
-    query = sqlalchemy.select(
-        turbines_table.c.id,
-        turbines_table.c.name,
-        turbines_table.c.windfarm_id,
-        windfarms_table.c.name.label('windfarm_name'),
-        windfarms_table.c.project_id
-    ).select_from(
-        turbines_table.join(
-            windfarms_table,
-            turbines_table.c.windfarm_id == windfarms_table.c.id
-        )
-    ).where(turbines_table.c.id == turbine_id)
-    
-    turbine = await database.fetch_one(query)
+    # Turbine, windfarm, project and the caller's membership in one query
+    turbine = await prepared_queries.fetchrow(
+        prepared_queries.SELECT_TURBINE_ACCESS, str(turbine_id), user_id
+    )
     
     if not turbine:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail={"status": "error", "message": "Turbine không tồn tại"}
+            detail=TURBINE_NOT_FOUND_DETAIL
         )
     
-    # Check project access with required role
-    role_levels = {
-        "viewer": 1,
-        "editor": 2,
-        "owner": 3
-    }
-    
-    required_level = role_levels.get(min_role.lower(), 1)
-    
-    try:
-        await check_project_access(
-            user_id=current_user['id'],
-            project_id=str(turbine['project_id']),
-            required_role_level=required_level
-        )
-    except HTTPException:
+    # Check project role level
+    role = turbine['member_role']
+    if role is None or ROLE_LEVELS.get(role, 0) < required_level:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "status": "error", 
-                "message": f"Access denied: Requires {min_role} role or higher"
-            }
+            detail=role_required_detail(min_role)
         )
     
+    project_id = str(turbine['project_id'])
+    project_membership_cache.set(
+        (user_id, project_id),
+        {"role": ProjectRole(role), "can_invite": bool(turbine['member_can_invite'])}
+    )
+    
     return {
         'turbine_id': str(turbine['id']),
         'turbine_name': turbine['name'],
         'windfarm_id': str(turbine['windfarm_id']),
         'windfarm_name': turbine['windfarm_name'],
-        'project_id': str(turbine['project_id'])
+        'project_id': project_id
     }
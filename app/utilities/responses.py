@@ -0,0 +1,26 @@
+"""
+JSON response helpers
+Serialize response models straight to JSON bytes with pydantic-core, skipping FastAPI's
+response_model re-validation and the intermediate dict pass
+"""
+
+from typing import Any, Iterable
+
+from fastapi import Response, status
+from pydantic import BaseModel, TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def model_response(model: BaseModel, status_code: int = status.HTTP_200_OK) -> Response:
+    """Return an already-built response model as JSON"""
+    return Response(content=model.model_dump_json(), media_type=JSON_MEDIA_TYPE, status_code=status_code)
+
+
+def list_response(adapter: TypeAdapter, rows: Iterable[Any], status_code: int = status.HTTP_200_OK) -> Response:
+    """Validate plain rows against a module-level list adapter and return them as JSON"""
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(rows)),
+        media_type=JSON_MEDIA_TYPE,
+        status_code=status_code,
+    )
@@ -1,17 +1,23 @@
-import random
+import hashlib
+import hmac
 import re
-import string
+import secrets
+import time
 from datetime import datetime, timedelta
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import (ALGORITHM, AUTH_SESSION_EXPIRE_MINUTES,
-                             OTP_EXPIRE_MINUTES, SECRET_KEY,
-                             SESSION_EXPIRE_MINUTES)
+                             OTP_EXPIRE_MINUTES, PASSWORD_RESET_EXPIRE_MINUTES,
+                             SECRET_KEY, SESSION_EXPIRE_MINUTES)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Identifier pattern, compiled once at import
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Password hashing; cost pinned explicitly (passlib's bcrypt default), callers in
+# request handlers run hash/verify via asyncio.to_thread
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=12, deprecated="auto")
 
 
 def hash_password(password: str) -> str:
@@ -26,34 +32,38 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def generate_otp() -> str:
     """Generate a 6-digit OTP"""
-    return ''.join(random.choices(string.digits, k=6))
+    return f"{secrets.randbelow(1_000_000):06d}"
 
 
 def is_email(identifier: str) -> bool:
     """Check if identifier is an email"""
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(email_pattern, identifier) is not None
+    return _EMAIL_RE.match(identifier) is not None
 
 
 def is_phone(identifier: str) -> bool:
-    """Check if identifier is a phone number"""
-    phone_pattern = r'^[0-9]{10,11}$'
-    return re.match(phone_pattern, identifier) is not None
+    """Check if identifier is a phone number (10-11 ASCII digits)"""
+    return len(identifier) in (10, 11) and identifier.isascii() and identifier.isdigit()
+
+
+# Expiry windows, built once from config
+_OTP_EXPIRY = timedelta(minutes=OTP_EXPIRE_MINUTES)
+_SESSION_EXPIRY = timedelta(minutes=SESSION_EXPIRE_MINUTES)
+_AUTH_SESSION_EXPIRY = timedelta(minutes=AUTH_SESSION_EXPIRE_MINUTES)
 
 
 def get_otp_expiry() -> datetime:
     """Get OTP expiry time"""
-    return datetime.utcnow() + timedelta(minutes=OTP_EXPIRE_MINUTES)
+    return datetime.utcnow() + _OTP_EXPIRY
 
 
 def get_session_expiry() -> datetime:
     """Get session expiry time"""
-    return datetime.utcnow() + timedelta(minutes=SESSION_EXPIRE_MINUTES)
+    return datetime.utcnow() + _SESSION_EXPIRY
 
 
 def get_auth_session_expiry() -> datetime:
     """Get auth session expiry time"""
-    return datetime.utcnow() + timedelta(minutes=AUTH_SESSION_EXPIRE_MINUTES)
+    return datetime.utcnow() + _AUTH_SESSION_EXPIRY
 
 
 def is_expired(expires_at: datetime) -> bool:
@@ -64,7 +74,7 @@ def is_expired(expires_at: datetime) -> bool:
 def create_access_token(data: dict) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=AUTH_SESSION_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + _AUTH_SESSION_EXPIRY
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -81,4 +91,45 @@ def verify_token(token: str) -> dict:
 
 def generate_session_token() -> str:
     """Generate a unique session token"""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=64))
+    return secrets.token_urlsafe(32)
+
+
+def hash_session_token(session_token: str) -> str:
+    """SHA-256 hex digest of a session token (what the database stores)"""
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+
+def hmac_digest(value: str) -> str:
+    """HMAC-SHA256 hex digest of a value keyed with the app secret"""
+    return hmac.new(SECRET_KEY.encode(), value.encode(), hashlib.sha256).hexdigest()
+
+
+def create_password_reset_token(user_id, email: str, password_fingerprint: str,
+                                otp: str = None, verified: bool = False) -> str:
+    """
+    Create signed password reset token
+
+    The token replaces the password_resets row: it carries the HMAC of the
+    OTP (never the OTP itself), the OTP expiry and a fingerprint of the
+    current password hash so the token stops working once it has been used.
+    """
+    now = int(time.time())
+    to_encode = {
+        "type": "password_reset",
+        "uid": str(user_id),
+        "email": email,
+        "pwh": password_fingerprint,
+        "otp_hmac": hmac_digest(otp) if otp else None,
+        "otp_exp": now + OTP_EXPIRE_MINUTES * 60,
+        "verified": verified,
+        "exp": now + PASSWORD_RESET_EXPIRE_MINUTES * 60
+    }
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def verify_password_reset_token(token: str) -> dict:
+    """Verify password reset token, return its claims or None"""
+    payload = verify_token(token)
+    if not payload or payload.get("type") != "password_reset":
+        return None
+    return payload
@@ -1,16 +1,32 @@
 """
-Example usage of the Authentication API
+Example usage of the Authentication API with Admin Approval
 """
 
-import requests
-import json
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
 
 BASE_URL = "http://localhost:8000"
 
+# One pooled client for the whole demo, so calls reuse keep-alive connections.
+# Cookies are sent explicitly per call, so the client itself stores none
+# (user and admin sessions must not leak into each other's requests).
+client = httpx.Client(
+    base_url=BASE_URL,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=5),
+    cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+)
+
+
+def cookie_header(cookies: dict) -> dict:
+    """Cookie request header for one call (httpx deprecates per-request cookies=)"""
+    return {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())}
+
 
 def register_user():
     """Example: Register a new user"""
-    url = f"{BASE_URL}/auth/register"
+    url = "/auth/register"
     data = {
         "name": "Nguyen Van A",
         "email": "user@example.com",
@@ -19,7 +35,7 @@ def register_user():
         "confirm_password": "mypassword123"
     }
 
-    response = requests.post(url, json=data)
+    response = client.post(url, json=data)
     print(f"Register Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print(f"Cookies: {response.cookies}")
@@ -29,138 +45,51 @@ def register_user():
 
 def verify_registration(temp_registration_id, otp):
     """Example: Verify registration with OTP"""
-    url = f"{BASE_URL}/auth/verify-registration"
+    url = "/auth/verify-registration"
     data = {"otp": otp}
     cookies = {"temp_registration_id": temp_registration_id}
 
-    response = requests.post(url, json=data, cookies=cookies)
+    response = client.post(url, json=data, headers=cookie_header(cookies))
     print(f"Verify Registration Response: {response.status_code}")
     print(f"Body: {response.json()}")
-
-    if response.status_code == 201:
-        print("✅ Registration completed successfully!")
-        print("📧 Admin has been notified via email")
-        print("⏳ User needs to wait for admin approval")
-
-    return response
-
-
-def login_user():
-    """Example: Login user"""
-    url = f"{BASE_URL}/auth/login"
-    data = {
-        "identifier": "user@example.com",  # or phone number
-        "password": "mypassword123"
-    }
-
-    response = requests.post(url, json=data)
-    print(f"Login Response: {response.status_code}")
-    print(f"Body: {response.json()}")
-    print(f"Cookies: {response.cookies}")
-
-    return response.cookies.get('temp_session_id')
-
-
-def verify_login_otp(temp_session_id, otp):
-    """Example: Verify login OTP"""
-    url = f"{BASE_URL}/auth/verify-otp"
-    data = {"otp": otp}
-    cookies = {"temp_session_id": temp_session_id}
-
-    response = requests.post(url, json=data, cookies=cookies)
-    print(f"Verify OTP Response: {response.status_code}")
-    print(f"Body: {response.json()}")
-    print(f"Cookies: {response.cookies}")
-
-    return response.cookies.get('auth_session_id')
+    print("🎉 Registration successful! Now waiting for admin approval...")
 
 
 def resend_registration_otp(temp_registration_id):
     """Example: Resend registration OTP"""
-    url = f"{BASE_URL}/auth/resend-registration-otp"
+    url = "/auth/resend-registration-otp"
     cookies = {"temp_registration_id": temp_registration_id}
 
-    response = requests.post(url, cookies=cookies)
+    response = client.post(url, headers=cookie_header(cookies))
     print(f"Resend Registration OTP Response: {response.status_code}")
     print(f"Body: {response.json()}")
 
 
-def resend_login_otp(temp_session_id):
-    """Example: Resend login OTP"""
-    url = f"{BASE_URL}/auth/resend-otp"
-    cookies = {"temp_session_id": temp_session_id}
-
-    response = requests.post(url, cookies=cookies)
-    print(f"Resend Login OTP Response: {response.status_code}")
-    print(f"Body: {response.json()}")
-
-
-def logout_user(auth_session_id):
-    """Example: Logout user"""
-    url = f"{BASE_URL}/auth/logout"
-    cookies = {"auth_session_id": auth_session_id}
-
-    response = requests.post(url, cookies=cookies)
-    print(f"Logout Response: {response.status_code}")
-    print(f"Body: {response.json()}")
-
-
-def check_health():
-    """Example: Check API health"""
-    url = f"{BASE_URL}/health"
-    response = requests.get(url)
-    print(f"Health Check Response: {response.status_code}")
-    print(f"Body: {response.json()}")
-
-
-if __name__ == "__main__":
-    """
-Example usage of the Authentication API with Admin Approval
-"""
-
-BASE_URL = "http://localhost:8000"
-
-
-def register_user():
-    """Example: Register a new user"""
-    url = f"{BASE_URL}/auth/register"
+def login_user():
+    """Example: Login user"""
+    url = "/auth/login"
     data = {
-        "name": "Nguyen Van A",
-        "email": "user@example.com",
-        "phone": "0987654321",
-        "password": "mypassword123",
-        "confirm_password": "mypassword123"
+        "identifier": "user@example.com",  # or phone number
+        "password": "mypassword123"
     }
 
-    response = requests.post(url, json=data)
-    print(f"Register Response: {response.status_code}")
+    response = client.post(url, json=data)
+    print(f"Login Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print(f"Cookies: {response.cookies}")
 
-    return response.cookies.get('temp_registration_id')
-
-
-def verify_registration(temp_registration_id, otp):
-    """Example: Verify registration with OTP"""
-    url = f"{BASE_URL}/auth/verify-registration"
-    data = {"otp": otp}
-    cookies = {"temp_registration_id": temp_registration_id}
-
-    response = requests.post(url, json=data, cookies=cookies)
-    print(f"Verify Registration Response: {response.status_code}")
-    print(f"Body: {response.json()}")
-    print("🎉 Registration successful! Now waiting for admin approval...")
+    return response.cookies.get('temp_session_id')
 
 
 def login_user_before_approval():
     """Example: Try to login before admin approval (should fail)"""
-    url = f"{BASE_URL}/auth/login"
+    url = "/auth/login"
     data = {
         "identifier": "user@example.com",
         "password": "mypassword123"
     }
 
-    response = requests.post(url, json=data)
+    response = client.post(url, json=data)
     print(f"Login Before Approval Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print("❌ Login failed: User not approved yet")
@@ -168,13 +97,13 @@ def login_user_before_approval():
 
 def admin_login():
     """Example: Admin login"""
-    url = f"{BASE_URL}/auth/login"
+    url = "/auth/login"
     data = {
         "identifier": "admin@example.com",  # Use your admin email
         "password": "admin123"  # Use your admin password
     }
 
-    response = requests.post(url, json=data)
+    response = client.post(url, json=data)
     print(f"Admin Login Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print(f"Cookies: {response.cookies}")
@@ -184,11 +113,11 @@ def admin_login():
 
 def admin_verify_otp(temp_session_id, otp):
     """Example: Admin verify login OTP"""
-    url = f"{BASE_URL}/auth/verify-otp"
+    url = "/auth/verify-otp"
     data = {"otp": otp}
     cookies = {"temp_session_id": temp_session_id}
 
-    response = requests.post(url, json=data, cookies=cookies)
+    response = client.post(url, json=data, headers=cookie_header(cookies))
     print(f"Admin Verify OTP Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print(f"Cookies: {response.cookies}")
@@ -198,10 +127,10 @@ def admin_verify_otp(temp_session_id, otp):
 
 def get_pending_users(admin_session_id):
     """Example: Admin get pending users"""
-    url = f"{BASE_URL}/auth/admin/pending-users"
+    url = "/auth/admin/pending-users"
     cookies = {"auth_session_id": admin_session_id}
 
-    response = requests.get(url, cookies=cookies)
+    response = client.get(url, headers=cookie_header(cookies))
     print(f"Pending Users Response: {response.status_code}")
     print(f"Body: {response.json()}")
 
@@ -214,11 +143,11 @@ def get_pending_users(admin_session_id):
 
 def approve_user(admin_session_id, user_id):
     """Example: Admin approve user"""
-    url = f"{BASE_URL}/auth/admin/approve-user"
+    url = "/auth/admin/approve-user"
     data = {"user_id": user_id}
     cookies = {"auth_session_id": admin_session_id}
 
-    response = requests.post(url, json=data, cookies=cookies)
+    response = client.post(url, json=data, headers=cookie_header(cookies))
     print(f"Approve User Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print("✅ User approved successfully!")
@@ -226,13 +155,13 @@ def approve_user(admin_session_id, user_id):
 
 def login_user_after_approval():
     """Example: Login user after approval (should work)"""
-    url = f"{BASE_URL}/auth/login"
+    url = "/auth/login"
     data = {
         "identifier": "user@example.com",
         "password": "mypassword123"
     }
 
-    response = requests.post(url, json=data)
+    response = client.post(url, json=data)
     print(f"Login After Approval Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print(f"Cookies: {response.cookies}")
@@ -242,11 +171,11 @@ def login_user_after_approval():
 
 def verify_login_otp(temp_session_id, otp):
     """Example: Verify login OTP"""
-    url = f"{BASE_URL}/auth/verify-otp"
+    url = "/auth/verify-otp"
     data = {"otp": otp}
     cookies = {"temp_session_id": temp_session_id}
 
-    response = requests.post(url, json=data, cookies=cookies)
+    response = client.post(url, json=data, headers=cookie_header(cookies))
     print(f"Verify Login OTP Response: {response.status_code}")
     print(f"Body: {response.json()}")
     print(f"Cookies: {response.cookies}")
@@ -254,30 +183,40 @@ def verify_login_otp(temp_session_id, otp):
     return response.cookies.get('auth_session_id')
 
 
+def resend_login_otp(temp_session_id):
+    """Example: Resend login OTP"""
+    url = "/auth/resend-otp"
+    cookies = {"temp_session_id": temp_session_id}
+
+    response = client.post(url, headers=cookie_header(cookies))
+    print(f"Resend Login OTP Response: {response.status_code}")
+    print(f"Body: {response.json()}")
+
+
 def get_all_users(admin_session_id):
     """Example: Admin get all users"""
-    url = f"{BASE_URL}/auth/admin/all-users"
+    url = "/auth/admin/all-users"
     cookies = {"auth_session_id": admin_session_id}
 
-    response = requests.get(url, cookies=cookies)
+    response = client.get(url, headers=cookie_header(cookies))
     print(f"All Users Response: {response.status_code}")
     print(f"Body: {response.json()}")
 
 
 def logout_user(auth_session_id):
     """Example: Logout user"""
-    url = f"{BASE_URL}/auth/logout"
+    url = "/auth/logout"
     cookies = {"auth_session_id": auth_session_id}
 
-    response = requests.post(url, cookies=cookies)
+    response = client.post(url, headers=cookie_header(cookies))
     print(f"Logout Response: {response.status_code}")
     print(f"Body: {response.json()}")
 
 
 def check_health():
     """Example: Check API health"""
-    url = f"{BASE_URL}/health"
-    response = requests.get(url)
+    url = "/health"
+    response = client.get(url)
     print(f"Health Check Response: {response.status_code}")
     print(f"Body: {response.json()}")
 